@@ -0,0 +1,10 @@
+-- Compact Assessment Logging Migration
+-- Run this in Supabase SQL Editor
+-- Needed when ASSESSMENT_LOG_COMPACT=true: key factors are logged as the ids
+-- from factor_ids in triage_rules.json instead of their names, and
+-- recommendations (which follow from triage_level) are left NULL. The API
+-- fills both back in when rows are read.
+
+ALTER TABLE assessments ADD COLUMN IF NOT EXISTS factor_ids SMALLINT[];
+
+-- Existing records keep their key_factors and recommendations; factor_ids stays NULL
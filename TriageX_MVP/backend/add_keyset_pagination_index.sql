@@ -0,0 +1,13 @@
+-- Keyset Pagination Migration
+-- Run this in Supabase SQL Editor
+-- /admin/assessments pages by (timestamp, id) newest first; these indexes let
+-- every page start with an index seek instead of skipping OFFSET rows.
+
+CREATE INDEX IF NOT EXISTS idx_assessments_timestamp_id
+    ON assessments (timestamp DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_assessments_level_timestamp_id
+    ON assessments (triage_level, timestamp DESC, id DESC);
+
+-- Refresh planner statistics (used by count=planned / count=estimated)
+ANALYZE assessments;
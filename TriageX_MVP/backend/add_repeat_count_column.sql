@@ -0,0 +1,8 @@
+-- Coalesced Request Logging Migration
+-- Run this in Supabase SQL Editor
+-- Needed when ANALYZE_COALESCE_LOG_REPEATS=true: duplicate /analyze requests
+-- that were served by one computation are logged as a single row.
+
+ALTER TABLE assessments ADD COLUMN IF NOT EXISTS repeat_count INTEGER NOT NULL DEFAULT 1;
+
+-- Existing records default to a repeat count of 1
@@ -2,8 +2,21 @@
 import logging
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
-from app.db.database import get_assessments, get_analytics
+from app.core.config import settings
+from app.db.database import (
+    ASSESSMENT_COLUMNS, get_assessments_page, get_analytics, get_analytics_timeseries, parse_fields,
+    get_assessment_cache_stats, iter_assessment_chunks,
+)
+from app.db.assessment_log import assessment_log
+from app.db.outbox import assessment_outbox
+from app.services.assessment_export import EXPORT_FORMATS, stream_export
+from app.services.live_analytics import live_analytics
+from app.services.parquet_export import ExportInProgress, ParquetExportUnavailable, parquet_exporter
+from app.services.triage_rules import rule_store
+from app.utils.cache import get_cache_stats
+from app.api.v1.endpoints.analyze import get_body_cache_stats, get_coalescing_stats
 
 logger = logging.getLogger(__name__)
 
@@ -16,23 +29,109 @@ async def get_assessments_endpoint(
     end_date: Optional[str] = Query(None, description="End date filter (ISO format)"),
     triage_level: Optional[str] = Query(None, description="Filter by triage level"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of results"),
-    offset: int = Query(0, ge=0, description="Offset for pagination")
+    offset: int = Query(0, ge=0, description="Offset for pagination (ignored when cursor is set)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    count: Optional[str] = Query(
+        None,
+        pattern="^(exact|planned|estimated)$",
+        description="Include a total count: exact, planned or estimated",
+    ),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated columns to return (id and timestamp are always included)"
+    ),
 ):
-    """Get assessments with filtering (Admin Panel)."""
+    """Get assessments with filtering and cursor pagination (Admin Panel)."""
     try:
-        assessments = get_assessments(
+        page = await get_assessments_page(
             start_date=start_date,
             end_date=end_date,
             triage_level=triage_level,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor,
+            count=count,
+            fields=parse_fields(fields),
         )
-        return {"assessments": assessments, "count": len(assessments)}
+        return {
+            "assessments": page["assessments"],
+            "count": len(page["assessments"]),
+            "next_cursor": page["next_cursor"],
+            "total": page["total"],
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching assessments: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@router.get("/admin/assessments/export")
+async def export_assessments_endpoint(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Export format: ndjson or csv"),
+    gzip: bool = Query(False, description="Compress the stream (Content-Encoding: gzip)"),
+    start_date: Optional[str] = Query(None, description="Start date filter (ISO format)"),
+    end_date: Optional[str] = Query(None, description="End date filter (ISO format)"),
+    triage_level: Optional[str] = Query(None, description="Filter by triage level"),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated columns to export (id and timestamp are always included)"
+    ),
+):
+    """Stream every matching assessment as NDJSON or CSV (Admin Panel)."""
+    try:
+        columns = parse_fields(fields)
+        chunks = iter_assessment_chunks(
+            start_date=start_date,
+            end_date=end_date,
+            triage_level=triage_level,
+            fields=columns,
+            chunk_size=settings.ADMIN_EXPORT_CHUNK_SIZE,
+        )
+        # Fetch the first page up front so query errors still get a proper status
+        first = await anext(chunks, None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error exporting assessments: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+    async def rows():
+        if first is None:
+            return
+        yield first
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except Exception as e:
+            # Headers are already sent; the client sees a truncated stream
+            logger.error(f"Error exporting assessments mid-stream: {str(e)}")
+            raise
+
+    media_type, extension = EXPORT_FORMATS[format]
+    headers = {"Content-Disposition": f'attachment; filename="assessments.{extension}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(
+        stream_export(rows(), format, columns=columns, compress=gzip, default_columns=ASSESSMENT_COLUMNS),
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+@router.post("/admin/assessments/export/parquet")
+async def export_assessments_parquet_endpoint():
+    """Append assessments newer than the last export to the Parquet dataset (Admin Panel)."""
+    try:
+        return await parquet_exporter.run()
+    except ParquetExportUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ExportInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error exporting assessments to Parquet: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
 @router.get("/admin/analytics")
 async def get_analytics_endpoint(
     start_date: Optional[str] = Query(None, description="Start date filter (ISO format)"),
@@ -40,9 +139,53 @@ async def get_analytics_endpoint(
 ):
     """Get analytics summary (Admin Panel)."""
     try:
-        analytics = get_analytics(start_date=start_date, end_date=end_date)
+        analytics = await get_analytics(start_date=start_date, end_date=end_date)
         return analytics
     except Exception as e:
         logger.error(f"Error fetching analytics: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+
+@router.get("/admin/analytics/timeseries")
+async def get_analytics_timeseries_endpoint(
+    bucket: str = Query("day", pattern="^(hour|day|week)$", description="Bucket size: hour, day or week"),
+    start_date: Optional[str] = Query(None, description="Start date filter (ISO format)"),
+    end_date: Optional[str] = Query(None, description="End date filter (ISO format)")
+):
+    """Get per-bucket volume and acuity trends (Admin Panel)."""
+    try:
+        series = await get_analytics_timeseries(bucket=bucket, start_date=start_date, end_date=end_date)
+        return {"bucket": bucket, "series": series}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error fetching analytics timeseries: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.get("/admin/analytics/live")
+async def get_live_analytics_endpoint():
+    """Get live in-process analytics: level counts, top symptoms and quantiles (Admin Panel)."""
+    try:
+        return live_analytics.summary()
+    except Exception as e:
+        logger.error(f"Error fetching live analytics: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.get("/admin/metrics")
+async def get_metrics_endpoint():
+    """Get runtime metrics for background subsystems (Admin Panel)."""
+    try:
+        return {
+            "assessment_log": assessment_log.stats(),
+            "outbox": assessment_outbox.stats() if assessment_outbox is not None else None,
+            "cache": get_cache_stats(),
+            "encoded_bodies": get_body_cache_stats(),
+            "coalescing": get_coalescing_stats(),
+            "assessment_cache": get_assessment_cache_stats(),
+            "triage_rules": rule_store.stats(),
+        }
+    except Exception as e:
+        logger.error(f"Error fetching metrics: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -1,69 +1,162 @@
 """Health analysis endpoint."""
 import logging
-from fastapi import APIRouter, HTTPException
+from typing import Any, Dict, NamedTuple, Optional, Tuple
 
-from app.schemas.health import HealthData, HealthResponse, ExplanationTag
-from app.services.triage_logic import analyze_health
-from app.db.database import log_assessment
-from app.utils.cache import generate_cache_key, get_cached, set_cached
+from fastapi import APIRouter, HTTPException, Response
+from starlette.concurrency import run_in_threadpool
+
+from app.schemas.health import HealthData, HealthResponse
+from app.services.triage_logic import TriageOutcome, assess_health, expand_outcome
+from app.db.database import build_assessment_payload
+from app.db.assessment_log import assessment_log
+from app.core.config import settings
+from app.services.cache_keys import canonical_cache_key
+from app.services.triage_features import TriageFeatures, extract_features
+from app.services.triage_rules import TRIAGE_LEVELS, RuleSet, current_rules
+from app.services.live_analytics import live_analytics
+from app.utils.cache import LRUCache, generate_cache_key, get_cached, set_cached, track_legacy_key
+from app.utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+JSON_MEDIA_TYPE = "application/json"
+
+# In-flight /analyze computations keyed by cache key
+_inflight = SingleFlight()
+
+# Encoded JSON bodies by (rule set version, outcome). Many cache keys share
+# one outcome, so the response cache holds compact outcomes and only the
+# bodies of recent outcomes are kept.
+_bodies = LRUCache(
+    max_entries=settings.CACHE_BODY_MAX_ENTRIES,
+    max_bytes=settings.CACHE_BODY_MAX_BYTES,
+)
+
+
+class CachedAnalysis(NamedTuple):
+    """Cache entry: the compact triage outcome and the rule set that produced it."""
+    outcome: TriageOutcome
+    rules: RuleSet
+
+    @property
+    def level(self) -> str:
+        return TRIAGE_LEVELS[self.outcome.level]
+
+    @property
+    def confidence(self) -> float:
+        return self.outcome.confidence
+
+    @property
+    def low_confidence_warning(self) -> bool:
+        return self.outcome.low_confidence_warning
+
+
+def encode_health_response(result: Dict[str, Any]) -> bytes:
+    """Validate a triage result against HealthResponse and encode it as JSON bytes."""
+    try:
+        response = HealthResponse(**result)
+    except ValueError as tag_error:
+        logger.warning(f"Error converting explanation tags: {str(tag_error)}")
+        response = HealthResponse(**{**result, "explanation_tags": []})
+    return response.model_dump_json().encode()
+
+
+def response_body(entry: CachedAnalysis, result: Optional[Dict[str, Any]] = None) -> bytes:
+    """Encoded JSON for a cached outcome, expanded and encoded only when not already known."""
+    key = (entry.rules.version, entry.outcome)
+    body = _bodies.get(key)
+    if body is None:
+        body = encode_health_response(result or expand_outcome(entry.outcome, entry.rules))
+        _bodies.set(key, body)
+    return body
+
+
+async def _analyze_and_cache(
+    features: TriageFeatures, rules: RuleSet, cache_key: str
+) -> Tuple[CachedAnalysis, bytes, Dict[str, Any]]:
+    # Run the engine off the event loop so duplicates can join while it computes
+    outcome = await run_in_threadpool(assess_health, features, rules)
+    entry = CachedAnalysis(outcome, rules)
+    result = expand_outcome(outcome, rules)
+    logger.info(f"Analysis result: {result['level']} - {result['message']}")
+    
+    # The cache keeps the compact outcome; the encoded body is shared by outcome
+    body = response_body(entry, result)
+    set_cached(cache_key, entry)
+    logger.info(f"Cached result with key: {cache_key[:8]}...")
+    return entry, body, result
+
+
+def get_coalescing_stats() -> Dict[str, Any]:
+    """Single-flight statistics for /analyze."""
+    return _inflight.stats()
+
+
+def get_body_cache_stats() -> Dict[str, Any]:
+    """Statistics for the encoded response bodies shared by cache entries."""
+    return _bodies.stats()
+
+
+def _record_live(data: HealthData, entry: CachedAnalysis) -> None:
+    """Feed live analytics; a metrics failure never changes the response."""
+    try:
+        live_analytics.record(data, entry.level, entry.confidence, entry.low_confidence_warning)
+    except Exception as analytics_error:
+        logger.error(f"Failed to record live analytics: {str(analytics_error)}")
+
 
 @router.post("/analyze", response_model=HealthResponse)
 async def analyze_health_risk(data: HealthData):
     """Analyze health risk based on symptoms and vitals."""
     try:
-        # Generate cache key from input data
-        cache_key = generate_cache_key(data.dict())
+        # Parse the request once; the cache key and the engine share the record
+        # and the same rule set, even if the rules are reloaded mid-request
+        features = extract_features(data)
+        rules = current_rules()
+        cache_key = canonical_cache_key(features, rules)
+        if settings.CACHE_SHADOW_LEGACY_KEYS:
+            track_legacy_key(generate_cache_key(data.dict()))
         
-        # Check cache first
-        cached_result = get_cached(cache_key)
-        if cached_result:
+        # Check cache first: hits return the outcome's encoded JSON bytes
+        cached = get_cached(cache_key)
+        if cached is not None:
             logger.info(f"Cache HIT for key: {cache_key[:8]}...")
-            # Convert explanation_tags dicts to ExplanationTag objects for response
-            try:
-                if cached_result.get("explanation_tags"):
-                    explanation_tags = [ExplanationTag(**tag) for tag in cached_result.get("explanation_tags", [])]
-                    cached_result["explanation_tags"] = explanation_tags
-                else:
-                    cached_result["explanation_tags"] = []
-            except Exception as tag_error:
-                logger.warning(f"Error converting cached explanation tags: {str(tag_error)}")
-                cached_result["explanation_tags"] = []
-            return HealthResponse(**cached_result)
+            _record_live(data, cached)
+            return Response(content=response_body(cached), media_type=JSON_MEDIA_TYPE)
         
         logger.info(f"Cache MISS - Processing: {data.symptom[:50]}..., HR: {data.heart_rate}, Temp: {data.temperature}, SpO2: {data.spo2}")
         
-        # Process the request
-        result = analyze_health(data)
-        
-        logger.info(f"Analysis result: {result['level']} - {result['message']}")
+        # Concurrent identical requests share one computation. When one row
+        # stands for every duplicate, only byte-identical payloads may share
+        # it, otherwise the log would record patients who were never submitted
+        flight_key = cache_key
+        if settings.ANALYZE_COALESCE_LOG_REPEATS:
+            flight_key = f"{cache_key}:{generate_cache_key(data.dict())}"
+        (entry, body, result), shared, duplicates = await _inflight.do(
+            flight_key, lambda: _analyze_and_cache(features, rules, cache_key)
+        )
+        if shared:
+            logger.info(f"Coalesced request for key: {cache_key[:8]}...")
+        _record_live(data, entry)
         
-        # Log assessment to database (before converting to ExplanationTag objects)
+        # Queue assessment for write-behind logging
         try:
-            form_data = data.dict()
-            log_assessment(form_data, result)
+            if not settings.ANALYZE_COALESCE_LOG_REPEATS:
+                assessment_log.enqueue(
+                    build_assessment_payload(data.dict(), result, factor_ids=entry.outcome.factor_ids)
+                )
+            elif not shared:
+                # One row stands for the leader and its identical duplicates
+                assessment_log.enqueue(build_assessment_payload(
+                    data.dict(), result, repeat_count=1 + duplicates, factor_ids=entry.outcome.factor_ids
+                ))
         except Exception as log_error:
             logger.error(f"Failed to log assessment: {str(log_error)}")
             # Don't fail the request if logging fails
         
-        # Convert explanation_tags dicts to ExplanationTag objects for response
-        try:
-            explanation_tags = [ExplanationTag(**tag) for tag in result.get("explanation_tags", [])]
-            result["explanation_tags"] = explanation_tags
-        except Exception as tag_error:
-            logger.warning(f"Error converting explanation tags: {str(tag_error)}")
-            result["explanation_tags"] = []
-        
-        # Cache the result (before converting ExplanationTag objects)
-        # result already contains dicts, so we can cache it directly
-        set_cached(cache_key, result)
-        logger.info(f"Cached result with key: {cache_key[:8]}...")
-        
-        return HealthResponse(**result)
+        return Response(content=body, media_type=JSON_MEDIA_TYPE)
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,166 @@
+"""Batch health analysis endpoint."""
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from app.api.v1.endpoints.analyze import encode_health_response
+from app.core.config import settings
+from app.schemas.health import HealthData
+from app.services.triage_batch import analyze_health_batch, columns_from_records
+from app.db.database import build_assessment_payload
+from app.db.assessment_log import assessment_log
+from app.services.live_analytics import live_analytics
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _parse_body(body: bytes, content_type: str) -> List[Tuple[Any, Optional[str]]]:
+    """
+    Split a JSON array or NDJSON body into (item, error) pairs.
+    Lines that are not valid JSON are kept as per-item errors.
+    """
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Request body must be UTF-8: {str(e)}")
+    if "ndjson" not in content_type and text.lstrip().startswith("["):
+        try:
+            items = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON array: {str(e)}")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Request body must be a JSON array or NDJSON")
+        return [(item, None) for item in items]
+
+    parsed = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            parsed.append((json.loads(line), None))
+        except json.JSONDecodeError as e:
+            parsed.append((None, f"Invalid JSON: {str(e)}"))
+    return parsed
+
+
+def _validate(item: Any) -> Tuple[Optional[HealthData], Optional[str]]:
+    if not isinstance(item, dict):
+        return None, "Each record must be a JSON object"
+    try:
+        return HealthData(**item), None
+    except ValidationError as e:
+        return None, "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        )
+
+
+ChunkOutcome = Tuple[Optional[Dict[str, Any]], bytes, Tuple[int, ...], Optional[str]]
+
+
+def _evaluate_chunk(records: List[HealthData]) -> List[ChunkOutcome]:
+    """
+    Score a chunk with one vectorized call, as (result, encoded HealthResponse,
+    factor_ids, error) per record. If the vectorized call fails, each record
+    is scored alone so only the records that actually fail are reported as
+    errors.
+    """
+    try:
+        batch = analyze_health_batch(columns_from_records(records))
+    except Exception as e:
+        if len(records) == 1:
+            return [(None, b"", (), f"Internal server error: {str(e)}")]
+        logger.error(f"Error analyzing batch chunk, retrying records one by one: {str(e)}")
+        return [outcome for record in records for outcome in _evaluate_chunk([record])]
+
+    outcomes: List[ChunkOutcome] = []
+    for index in range(len(batch)):
+        try:
+            result = batch.to_result(index)
+            outcomes.append((result, encode_health_response(result), batch.factor_ids(index), None))
+        except Exception as e:
+            outcomes.append((None, b"", (), f"Internal server error: {str(e)}"))
+    return outcomes
+
+
+def _error_line(index: int, error: str) -> bytes:
+    return (json.dumps({"index": index, "error": error}, separators=(",", ":")) + "\n").encode()
+
+
+def _record_live(data: HealthData, result: Dict[str, Any]) -> None:
+    """Feed live analytics; a metrics failure never changes the response."""
+    try:
+        live_analytics.record(
+            data, result["level"], result["confidence"], result.get("low_confidence_warning", False)
+        )
+    except Exception as analytics_error:
+        logger.error(f"Failed to record live analytics: {str(analytics_error)}")
+
+
+@router.post("/analyze/batch")
+async def analyze_health_batch_endpoint(request: Request):
+    """
+    Analyze many health records in one request.
+
+    Accepts a JSON array or NDJSON body of HealthData records and streams one
+    NDJSON line per record (``{"index", "result"}`` or ``{"index", "error"}``)
+    followed by a summary line. Invalid records do not fail the batch.
+    """
+    items = _parse_body(await request.body(), request.headers.get("content-type", ""))
+    if len(items) > settings.ANALYZE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(items)} records (max {settings.ANALYZE_BATCH_MAX_ITEMS})",
+        )
+
+    async def stream() -> AsyncIterator[bytes]:
+        chunk_size = max(settings.ANALYZE_BATCH_CHUNK_SIZE, 1)
+        succeeded = failed = 0
+
+        for start in range(0, len(items), chunk_size):
+            lines: Dict[int, bytes] = {}
+            valid: List[Tuple[int, HealthData]] = []
+            for index, (item, error) in enumerate(items[start:start + chunk_size], start):
+                data, error = (None, error) if error else _validate(item)
+                if error:
+                    lines[index] = _error_line(index, error)
+                    failed += 1
+                else:
+                    valid.append((index, data))
+
+            if valid:
+                outcomes = await run_in_threadpool(_evaluate_chunk, [data for _, data in valid])
+                payloads: List[Dict[str, Any]] = []
+                for (index, data), (result, body, factor_ids, error) in zip(valid, outcomes):
+                    if error:
+                        logger.error(f"Error analyzing batch record {index}: {error}")
+                        lines[index] = _error_line(index, error)
+                        failed += 1
+                        continue
+                    lines[index] = b'{"index":%d,"result":%s}\n' % (index, body)
+                    succeeded += 1
+                    _record_live(data, result)
+                    try:
+                        payloads.append(build_assessment_payload(data.dict(), result, factor_ids=factor_ids))
+                    except Exception as log_error:
+                        logger.error(f"Failed to log batch record {index}: {str(log_error)}")
+                        # Don't fail the record if logging fails
+                # Log the chunk before streaming it, so a client that disconnects
+                # mid-stream never leaves scored records unlogged
+                assessment_log.enqueue_many(payloads)
+
+            for index in sorted(lines):
+                yield lines[index]
+
+        logger.info(f"Batch analysis complete: {succeeded} succeeded, {failed} failed")
+        yield (json.dumps({"summary": {"total": len(items), "succeeded": succeeded, "failed": failed}}) + "\n").encode()
+
+    return StreamingResponse(stream(), media_type=NDJSON_MEDIA_TYPE)
@@ -1,9 +1,8 @@
 """Explanation endpoint."""
-import json
 import logging
 from fastapi import APIRouter, HTTPException
 
-from app.db.database import get_assessments
+from app.db.database import get_assessment_by_id
 
 logger = logging.getLogger(__name__)
 
@@ -14,34 +13,18 @@ router = APIRouter()
 async def get_explanation(assessment_id: int):
     """Get detailed explanation for a specific assessment."""
     try:
-        # Fetch assessment from database
-        assessments = get_assessments(limit=1000)
-        assessment = next((a for a in assessments if a.get("id") == assessment_id), None)
+        # Fetch the assessment by primary key
+        assessment = await get_assessment_by_id(assessment_id)
         
         if not assessment:
             raise HTTPException(status_code=404, detail=f"Assessment {assessment_id} not found")
         
-        # Parse explanation tags if stored as JSON string
-        explanation_tags = assessment.get("explanation_tags", [])
-        if isinstance(explanation_tags, str):
-            try:
-                explanation_tags = json.loads(explanation_tags)
-            except json.JSONDecodeError:
-                explanation_tags = []
-        
-        key_factors = assessment.get("key_factors", [])
-        if isinstance(key_factors, str):
-            try:
-                key_factors = json.loads(key_factors)
-            except json.JSONDecodeError:
-                key_factors = []
-        
         return {
             "assessment_id": assessment_id,
             "triage_level": assessment.get("triage_level"),
             "confidence": assessment.get("confidence"),
-            "key_factors": key_factors,
-            "explanation_tags": explanation_tags,
+            "key_factors": assessment.get("key_factors", []),
+            "explanation_tags": assessment.get("explanation_tags", []),
             "data_quality": assessment.get("data_quality"),
             "low_confidence_warning": assessment.get("low_confidence_warning", False)
         }
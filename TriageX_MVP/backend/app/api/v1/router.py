@@ -3,6 +3,7 @@ from fastapi import APIRouter
 
 from app.api.v1.endpoints import (
     analyze,
+    analyze_batch,
     consent,
     info,
     questions,
@@ -18,6 +19,7 @@ api_router = APIRouter()
 # Include all endpoint routers
 api_router.include_router(health.router, tags=["Health"])
 api_router.include_router(analyze.router, prefix="/api/v1", tags=["Analysis"])
+api_router.include_router(analyze_batch.router, prefix="/api/v1", tags=["Analysis"])
 api_router.include_router(consent.router, prefix="/api/v1", tags=["Consent"])
 api_router.include_router(info.router, prefix="/api/v1", tags=["Info"])
 api_router.include_router(questions.router, prefix="/api/v1", tags=["Questions"])
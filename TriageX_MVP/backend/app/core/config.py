@@ -38,7 +38,80 @@ class Settings:
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_SERVICE_ROLE_KEY: str = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
     SUPABASE_ASSESSMENTS_TABLE: str = os.getenv("SUPABASE_ASSESSMENTS_TABLE", "assessments")
+    # Pooled async HTTP client for the Supabase REST API
+    SUPABASE_HTTP2: bool = os.getenv("SUPABASE_HTTP2", "true").lower() == "true"
+    SUPABASE_POOL_MAX_CONNECTIONS: int = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "100"))
+    SUPABASE_POOL_MAX_KEEPALIVE: int = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "20"))
+    SUPABASE_KEEPALIVE_EXPIRY: float = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30.0"))
+    SUPABASE_TIMEOUT: float = float(os.getenv("SUPABASE_TIMEOUT", "10.0"))
+    SUPABASE_CONNECT_TIMEOUT: float = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5.0"))
     
+    # Assessment write-behind logging
+    ASSESSMENT_LOG_QUEUE_SIZE: int = int(os.getenv("ASSESSMENT_LOG_QUEUE_SIZE", "10000"))
+    ASSESSMENT_LOG_BATCH_SIZE: int = int(os.getenv("ASSESSMENT_LOG_BATCH_SIZE", "100"))
+    ASSESSMENT_LOG_FLUSH_INTERVAL: float = float(os.getenv("ASSESSMENT_LOG_FLUSH_INTERVAL", "1.0"))
+
+    # Response cache
+    CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", "3600"))
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    # Also compute the legacy full-payload key to report the hit-rate difference.
+    # Hashes the whole payload on every request, so only enable it to measure
+    CACHE_SHADOW_LEGACY_KEYS: bool = os.getenv("CACHE_SHADOW_LEGACY_KEYS", "false").lower() == "true"
+    CACHE_SHADOW_LEGACY_MAX_ENTRIES: int = int(os.getenv("CACHE_SHADOW_LEGACY_MAX_ENTRIES", "10000"))
+    # Encoded response bodies, shared by cache entries with the same outcome
+    CACHE_BODY_MAX_ENTRIES: int = int(os.getenv("CACHE_BODY_MAX_ENTRIES", "1024"))
+    CACHE_BODY_MAX_BYTES: int = int(os.getenv("CACHE_BODY_MAX_BYTES", str(4 * 1024 * 1024)))
+
+    # By-id assessment cache for /explain
+    ASSESSMENT_CACHE_MAX_ENTRIES: int = int(os.getenv("ASSESSMENT_CACHE_MAX_ENTRIES", "2048"))
+    ASSESSMENT_CACHE_MAX_BYTES: int = int(os.getenv("ASSESSMENT_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+    # Log coalesced duplicate /analyze requests as one row with a repeat_count.
+    # Only requests with identical payloads are coalesced while this is on
+    # (requires add_repeat_count_column.sql)
+    ANALYZE_COALESCE_LOG_REPEATS: bool = os.getenv("ANALYZE_COALESCE_LOG_REPEATS", "false").lower() == "true"
+
+    # Log key factors as rule table ids instead of names, and leave the
+    # per-level recommendations out of each row (requires add_factor_ids_column.sql)
+    ASSESSMENT_LOG_COMPACT: bool = os.getenv("ASSESSMENT_LOG_COMPACT", "false").lower() == "true"
+
+    # Live in-process analytics (sketches over every /analyze call)
+    LIVE_ANALYTICS_TOP_K: int = int(os.getenv("LIVE_ANALYTICS_TOP_K", "20"))
+    LIVE_ANALYTICS_RELATIVE_ACCURACY: float = float(os.getenv("LIVE_ANALYTICS_RELATIVE_ACCURACY", "0.01"))
+    # Empty path disables snapshots
+    LIVE_ANALYTICS_SNAPSHOT_PATH: str = os.getenv("LIVE_ANALYTICS_SNAPSHOT_PATH", "live_analytics.json")
+    LIVE_ANALYTICS_SNAPSHOT_INTERVAL: float = float(os.getenv("LIVE_ANALYTICS_SNAPSHOT_INTERVAL", "60.0"))
+
+    # Streaming admin export: rows fetched per keyset page
+    ADMIN_EXPORT_CHUNK_SIZE: int = int(os.getenv("ADMIN_EXPORT_CHUNK_SIZE", "1000"))
+    # Incremental Parquet export (requires pyarrow)
+    PARQUET_EXPORT_DIR: str = os.getenv("PARQUET_EXPORT_DIR", "exports/assessments")
+    PARQUET_EXPORT_ROWS_PER_FILE: int = int(os.getenv("PARQUET_EXPORT_ROWS_PER_FILE", "100000"))
+    # Ids skipped below the watermark are re-read for this long in case their
+    # insert commits late; after that the gap is considered permanent
+    PARQUET_EXPORT_GAP_TTL_SECONDS: float = float(os.getenv("PARQUET_EXPORT_GAP_TTL_SECONDS", "3600"))
+
+    # Declarative triage rules, reloaded in the background when the file
+    # changes; the interval is how often it is checked (0 disables reload)
+    TRIAGE_RULES_PATH: str = os.getenv(
+        "TRIAGE_RULES_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), "services", "triage_rules.json"),
+    )
+    TRIAGE_RULES_RELOAD_INTERVAL: float = float(os.getenv("TRIAGE_RULES_RELOAD_INTERVAL", "2.0"))
+
+    # Batch analysis
+    ANALYZE_BATCH_MAX_ITEMS: int = int(os.getenv("ANALYZE_BATCH_MAX_ITEMS", "5000"))
+    ANALYZE_BATCH_CHUNK_SIZE: int = int(os.getenv("ANALYZE_BATCH_CHUNK_SIZE", "500"))
+
+    # Durable local outbox for assessments (SQLite, WAL mode)
+    ASSESSMENT_OUTBOX_ENABLED: bool = os.getenv("ASSESSMENT_OUTBOX_ENABLED", "true").lower() == "true"
+    ASSESSMENT_OUTBOX_PATH: str = os.getenv("ASSESSMENT_OUTBOX_PATH", "assessment_outbox.db")
+    ASSESSMENT_OUTBOX_BATCH_SIZE: int = int(os.getenv("ASSESSMENT_OUTBOX_BATCH_SIZE", "200"))
+    ASSESSMENT_OUTBOX_POLL_INTERVAL: float = float(os.getenv("ASSESSMENT_OUTBOX_POLL_INTERVAL", "1.0"))
+    ASSESSMENT_OUTBOX_BACKOFF_BASE: float = float(os.getenv("ASSESSMENT_OUTBOX_BACKOFF_BASE", "1.0"))
+    ASSESSMENT_OUTBOX_BACKOFF_MAX: float = float(os.getenv("ASSESSMENT_OUTBOX_BACKOFF_MAX", "300.0"))
+
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     
@@ -0,0 +1,184 @@
+"""
+Write-behind queue for assessment logging.
+
+Request handlers enqueue assessment rows in memory and return immediately.
+A background task flushes the queue as multi-row inserts whenever a batch
+fills up or the flush interval elapses, and drains it on shutdown. When the
+durable outbox is enabled, batches are flushed to it instead of Supabase.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.db.database import log_assessments
+from app.db.outbox import assessment_outbox
+
+logger = logging.getLogger(__name__)
+
+Sink = Callable[[List[Dict[str, Any]]], Any]
+
+
+class AssessmentLogQueue:
+    """Bounded in-memory queue that batches assessment rows into bulk inserts."""
+
+    def __init__(
+        self,
+        sink: Sink,
+        max_size: int,
+        batch_size: int,
+        flush_interval: float,
+    ):
+        self._sink = sink
+        self._sink_is_async = asyncio.iscoroutinefunction(sink)
+        self.max_size = max(max_size, 1)
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = max(flush_interval, 0.0)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_size)
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+        # Rows taken off the queue for the batch being assembled
+        self._batch: List[Dict[str, Any]] = []
+        self._closing = False
+
+        # Metrics
+        self._enqueued = 0
+        self._dropped = 0
+        self._flushed = 0
+        self._failed = 0
+        self._batches = 0
+        self._high_water = 0
+        self._last_flush_ms: Optional[float] = None
+
+    def enqueue(self, payload: Dict[str, Any]) -> bool:
+        """
+        Queue one assessment row without blocking.
+        Returns False (and counts a drop) when the queue is full.
+        """
+        try:
+            self._queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self._dropped += 1
+            logger.warning("Assessment log queue full (%d); dropping row", self.max_size)
+            return False
+        self._enqueued += 1
+        depth = self._queue.qsize()
+        if depth > self._high_water:
+            self._high_water = depth
+        return True
+
+    def enqueue_many(self, payloads: List[Dict[str, Any]]) -> int:
+        """Queue several rows. Returns how many were accepted."""
+        return sum(1 for payload in payloads if self.enqueue(payload))
+
+    async def start(self) -> None:
+        """Start the background flush task."""
+        if self._worker is None or self._worker.done():
+            self._closing = False
+            self._worker = asyncio.create_task(self._run())
+            logger.info(
+                "Assessment write-behind logging started (batch=%d, interval=%.2fs, max=%d)",
+                self.batch_size, self.flush_interval, self.max_size,
+            )
+
+    async def stop(self) -> None:
+        """Stop the background task and flush everything still queued."""
+        # wait_for can swallow a cancel that races with a completed get, so
+        # the worker also checks this flag between waits
+        self._closing = True
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._inflight is not None:
+            await self._inflight
+            self._inflight = None
+
+        batch, self._batch = self._batch, []
+        await self._flush(batch)
+        while not self._queue.empty():
+            await self._flush(self._take(self.batch_size))
+        logger.info("Assessment write-behind logging drained")
+
+    def _take(self, limit: int, batch: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        batch = batch if batch is not None else []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._closing:
+            self._batch = batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            self._take(self.batch_size, batch)
+            while len(batch) < self.batch_size and not self._closing:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+                self._take(self.batch_size, batch)
+            if self._closing:
+                # stop() flushes the partial batch
+                return
+            self._batch = []
+            # Shield the insert so shutdown never abandons a batch mid-flight
+            self._inflight = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self._inflight)
+            self._inflight = None
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            if self._sink_is_async:
+                await self._sink(batch)
+            else:
+                # Blocking sinks (the SQLite outbox) run off the event loop
+                await asyncio.to_thread(self._sink, batch)
+            self._flushed += len(batch)
+        except Exception as exc:
+            self._failed += len(batch)
+            logger.error("Failed to flush %d assessments: %s", len(batch), exc)
+        finally:
+            self._batches += 1
+            self._last_flush_ms = (time.perf_counter() - started) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and backpressure metrics."""
+        depth = self._queue.qsize()
+        return {
+            "queue_depth": depth,
+            "max_size": self.max_size,
+            "utilization": round(depth / self.max_size, 4),
+            "high_water_mark": self._high_water,
+            "enqueued": self._enqueued,
+            "dropped": self._dropped,
+            "flushed": self._flushed,
+            "failed": self._failed,
+            "batches": self._batches,
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+            "last_flush_ms": round(self._last_flush_ms, 2) if self._last_flush_ms is not None else None,
+            "running": self._worker is not None and not self._worker.done(),
+        }
+
+
+# Global write-behind queue instance
+assessment_log = AssessmentLogQueue(
+    sink=assessment_outbox.append if assessment_outbox is not None else log_assessments,
+    max_size=settings.ASSESSMENT_LOG_QUEUE_SIZE,
+    batch_size=settings.ASSESSMENT_LOG_BATCH_SIZE,
+    flush_interval=settings.ASSESSMENT_LOG_FLUSH_INTERVAL,
+)
@@ -1,72 +1,107 @@
 """
 Supabase-backed data access layer for the TriageX admin panel.
 """
+import asyncio
+import base64
+import binascii
 import json
 import logging
-from collections import Counter
+import math
 from datetime import datetime
-from statistics import mean
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
 from app.core.config import settings
-
-Client = Any  # Supabase client type (set dynamically at runtime)
+from app.db.postgrest import PostgrestClient, PostgrestError
+from app.services.triage_logic import TRIAGE_LEVEL_TEMPLATES
+from app.services.triage_rules import current_rules
+from app.utils.cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
 SUPABASE_URL = settings.SUPABASE_URL
 SUPABASE_SERVICE_ROLE_KEY = settings.SUPABASE_SERVICE_ROLE_KEY
 ASSESSMENTS_TABLE = settings.SUPABASE_ASSESSMENTS_TABLE
-
-_supabase_client: Optional[Client] = None
-_supabase_create_client = None
+ANALYTICS_FUNCTION = "assessment_analytics"
+ROLLUP_BACKFILL_FUNCTION = "backfill_assessment_rollups"
+BLOOD_PRESSURE_BACKFILL_FUNCTION = "backfill_blood_pressure"
+TIMESERIES_FUNCTION = "assessment_timeseries"
+TIMESERIES_BUCKETS = ("hour", "day", "week")
+
+# Selectable columns of the assessments table
+ASSESSMENT_COLUMNS = (
+    "id", "timestamp", "age", "gender", "symptom",
+    "temperature", "heart_rate", "respiratory_rate", "blood_pressure",
+    "bp_systolic", "bp_diastolic", "spo2",
+    "level_of_consciousness", "duration", "onset", "pain_level",
+    "leg_redness", "leg_warmth", "leg_duration",
+    "head_dizziness", "head_vomiting", "head_loss_consciousness",
+    "chest_radiation", "chest_shortness_breath", "chest_nausea",
+    "has_medical_conditions", "medical_conditions", "medical_conditions_other",
+    "has_medications", "medications", "medications_other",
+    "is_pregnant", "pregnancy_trimester", "pregnancy_weeks", "is_trauma_related",
+    "triage_level", "confidence", "recommendations", "key_factors", "explanation_tags",
+    "data_quality", "low_confidence_warning", "ai_enabled", "ai_model_type", "repeat_count",
+    "factor_ids",
+)
+
+# JSONB list columns (JSON-encoded text before migrate_typed_columns.sql)
+JSON_COLUMNS = ("recommendations", "key_factors", "explanation_tags")
+
+# Columns needed by the explanation endpoint
+EXPLANATION_COLUMNS = (
+    "id,triage_level,confidence,key_factors,explanation_tags,"
+    "data_quality,low_confidence_warning"
+) + (",factor_ids" if settings.ASSESSMENT_LOG_COMPACT else "")
+
+# Columns left empty by compact logging, and the column each is expanded from
+COMPACT_SOURCES = {"key_factors": "factor_ids", "recommendations": "triage_level"}
+
+_client: Optional[PostgrestClient] = None
+
+# By-id assessment lookups (rows never change once written)
+_assessment_cache = LRUCache(
+    max_entries=settings.ASSESSMENT_CACHE_MAX_ENTRIES,
+    max_bytes=settings.ASSESSMENT_CACHE_MAX_BYTES,
+)
 
 
 class SupabaseNotConfigured(RuntimeError):
     """Raised when Supabase credentials are missing."""
 
 
-def _ensure_client() -> Client:
-    global _supabase_client
-    if _supabase_client is None:
+def _ensure_client() -> PostgrestClient:
+    global _client
+    if _client is None:
         if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
             raise SupabaseNotConfigured(
                 "Supabase credentials are missing. "
                 "Set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY environment variables."
             )
-        _supabase_client = _create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-    return _supabase_client
-
-
-def _create_client(url: str, key: str) -> Client:
-    global _supabase_create_client
-    if _supabase_create_client is None:
-        try:
-            from supabase import create_client as supabase_create_client  # type: ignore
-        except ImportError as exc:  # pragma: no cover
-            raise RuntimeError(
-                "supabase-py is not installed. Install dependencies from backend/requirements.txt."
-            ) from exc
-        _supabase_create_client = supabase_create_client
-    return _supabase_create_client(url, key)
+        _client = PostgrestClient(
+            SUPABASE_URL,
+            SUPABASE_SERVICE_ROLE_KEY,
+            http2=settings.SUPABASE_HTTP2,
+            max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.SUPABASE_KEEPALIVE_EXPIRY,
+            timeout=settings.SUPABASE_TIMEOUT,
+            connect_timeout=settings.SUPABASE_CONNECT_TIMEOUT,
+        )
+    return _client
 
 
-def init_database():
+async def init_database():
     """
     Validate Supabase connectivity. (Table creation is expected to be done via Supabase.)
     """
     try:
         client = _ensure_client()
-        response = (
-            client.table(ASSESSMENTS_TABLE)
-            .select("id")
-            .limit(1)
-            .execute()
+        await client.select(
+            ASSESSMENTS_TABLE, {"select": "id", "limit": 1}, action="verify Supabase connection"
+        )
+        logger.info(
+            "Connected to Supabase table '%s' (http2=%s)", ASSESSMENTS_TABLE, client.http2
         )
-        # New supabase-py version doesn't have response.error, check data instead
-        if hasattr(response, 'error') and response.error:
-            raise RuntimeError(response.error.message)
-        logger.info("Connected to Supabase table '%s'", ASSESSMENTS_TABLE)
     except SupabaseNotConfigured as exc:
         logger.error(str(exc))
         raise
@@ -75,26 +110,109 @@ def init_database():
         raise
 
 
-def _serialize_recommendations(triage_result: Dict[str, Any]) -> str:
-    return json.dumps(triage_result.get("recommendations", []))
+async def close_database():
+    """Close the pooled Supabase connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _to_number(value: Any) -> Optional[float]:
+    """Parse a free-text number; None when it is not a finite one."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    try:
+        number = value if isinstance(value, float) else float(str(value).strip())
+    except ValueError:
+        return None
+    # NaN is not valid JSON and PostgREST would reject the whole insert
+    return number if math.isfinite(number) else None
+
+
+def _to_int(value: Any) -> Optional[int]:
+    """
+    Parse a whole number the way the triage engine does: "12" is 12 but
+    "12.0" is not a whole number, so the stored value matches what was scored.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value) if math.isfinite(value) and value.is_integer() else None
+    try:
+        return int(str(value))
+    except ValueError:
+        return None
+
+
+def _parse_blood_pressure(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """Split "120/80" into (systolic, diastolic)."""
+    if not value:
+        return None, None
+    parts = value.split('/')
+    if len(parts) != 2:
+        return None, None
+    try:
+        return int(parts[0]), int(parts[1])
+    except ValueError:
+        return None, None
 
 
-def _serialize_list(data: List[Any]) -> str:
-    """Serialize list to JSON string"""
-    return json.dumps(data if data else [])
+def _normalize_legacy_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a row built before the typed-column migration (e.g. replayed
+    from the outbox) to native types: JSON text becomes lists and free-text
+    numbers become numbers.
+    """
+    for column in JSON_COLUMNS:
+        value = payload.get(column)
+        if isinstance(value, str):
+            try:
+                payload[column] = json.loads(value)
+            except json.JSONDecodeError:
+                payload[column] = []
+    payload["age"] = _to_number(payload.get("age"))
+    payload["respiratory_rate"] = _to_int(payload.get("respiratory_rate"))
+    payload["pain_level"] = _to_int(payload.get("pain_level"))
+    if "bp_systolic" not in payload:
+        payload["bp_systolic"], payload["bp_diastolic"] = _parse_blood_pressure(
+            payload.get("blood_pressure")
+        )
+    return payload
 
 
-def _serialize_explanation_tags(tags: List[Dict[str, Any]]) -> str:
-    """Serialize explanation tags to JSON string"""
-    return json.dumps(tags if tags else [])
+def expand_compact_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fill in the key factors and recommendations of a row logged in compact
+    form: factor names come from the rule table's factor ids and
+    recommendations from the triage level's template.
+    """
+    if row.get("key_factors") is None and row.get("factor_ids") is not None:
+        names = current_rules().factor_names
+        row["key_factors"] = [names.get(factor_id, f"factor {factor_id}") for factor_id in row["factor_ids"]]
+    if "recommendations" in row and row["recommendations"] is None:
+        template = TRIAGE_LEVEL_TEMPLATES.get(row.get("triage_level"))
+        if template is not None:
+            row["recommendations"] = list(template["recommendations"])
+    return row
 
 
-def log_assessment(
+def build_assessment_payload(
     form_data: Dict[str, Any],
     triage_result: Dict[str, Any],
-) -> int:
-    client = _ensure_client()
-    
+    repeat_count: int = 1,
+    factor_ids: Optional[Sequence[int]] = None,
+) -> Dict[str, Any]:
+    """
+    Build the row inserted into the assessments table for one triage.
+    repeat_count is only written when coalesced-request logging is enabled.
+    With compact logging, rows whose factor_ids are given store those
+    instead of the factor names and recommendations (see expand_compact_row).
+    """
     # Helper function to convert "yes"/"no" strings or bools to bool
     def _to_bool(value):
         if value is None:
@@ -120,20 +238,24 @@ def log_assessment(
         elif isinstance(pregnancy_weeks, str) and pregnancy_weeks.strip().isdigit():
             pregnancy_weeks_int = int(pregnancy_weeks.strip())
     
+    bp_systolic, bp_diastolic = _parse_blood_pressure(form_data.get("blood_pressure"))
+
     payload = {
         "timestamp": datetime.now().isoformat(),
-        "age": form_data.get("age"),
+        "age": _to_number(form_data.get("age")),
         "gender": form_data.get("gender"),
         "symptom": form_data.get("symptom"),
         "temperature": form_data.get("temperature"),
         "heart_rate": form_data.get("heart_rate"),
-        "respiratory_rate": form_data.get("respiratory_rate"),
+        "respiratory_rate": _to_int(form_data.get("respiratory_rate")),
         "blood_pressure": form_data.get("blood_pressure"),
+        "bp_systolic": bp_systolic,
+        "bp_diastolic": bp_diastolic,
         "spo2": form_data.get("spo2"),
         "level_of_consciousness": form_data.get("level_of_consciousness"),
         "duration": form_data.get("duration"),
         "onset": form_data.get("onset"),
-        "pain_level": form_data.get("pain_level"),
+        "pain_level": _to_int(form_data.get("pain_level")),
         "leg_redness": form_data.get("leg_redness"),
         "leg_warmth": form_data.get("leg_warmth"),
         "leg_duration": form_data.get("leg_duration"),
@@ -156,143 +278,371 @@ def log_assessment(
         "is_trauma_related": is_trauma_related,
         "triage_level": triage_result.get("level"),
         "confidence": triage_result.get("confidence"),
-        "recommendations": _serialize_recommendations(triage_result),
+        "recommendations": triage_result.get("recommendations") or [],
         # New enhanced fields
-        "key_factors": _serialize_list(triage_result.get("key_factors", [])),
-        "explanation_tags": _serialize_explanation_tags(triage_result.get("explanation_tags", [])),
+        "key_factors": triage_result.get("key_factors") or [],
+        "explanation_tags": triage_result.get("explanation_tags") or [],
         "data_quality": triage_result.get("data_quality", 0.0),
         "low_confidence_warning": triage_result.get("low_confidence_warning", False),
         "ai_enabled": triage_result.get("ai_enabled", False),
         "ai_model_type": triage_result.get("ai_model_type"),
     }
+    if settings.ANALYZE_COALESCE_LOG_REPEATS:
+        # Every row needs the column so multi-row inserts share one key set
+        payload["repeat_count"] = repeat_count
+    if settings.ASSESSMENT_LOG_COMPACT:
+        payload["factor_ids"] = list(factor_ids) if factor_ids is not None else None
+        if factor_ids is not None:
+            payload["key_factors"] = None
+            payload["recommendations"] = None
+    return payload
+
+
+async def log_assessments(payloads: List[Dict[str, Any]]) -> List[int]:
+    """
+    Insert several assessment rows with a single multi-row insert.
+    Returns the IDs of the inserted rows.
+    """
+    if not payloads:
+        return []
+    client = _ensure_client()
+    # Rows queued before an upgrade still carry JSON text columns
+    payloads = [
+        _normalize_legacy_payload(dict(payload))
+        if isinstance(payload.get("key_factors"), str) else payload
+        for payload in payloads
+    ]
+
+    records = await client.insert(ASSESSMENTS_TABLE, payloads, action="log assessments")
+    ids = [record.get("id") for record in records]
+    logger.info("Logged %d assessments in Supabase", len(ids))
+    return ids
 
-    response = client.table(ASSESSMENTS_TABLE).insert(payload).execute()
-    if hasattr(response, 'error') and response.error:
-        raise RuntimeError(f"Failed to log assessment: {response.error.message}")
 
-    record = response.data[0]
-    logger.info("Assessment logged in Supabase with ID: %s", record.get("id"))
-    return record.get("id")
+async def log_assessment(
+    form_data: Dict[str, Any],
+    triage_result: Dict[str, Any],
+) -> int:
+    ids = await log_assessments([build_assessment_payload(form_data, triage_result)])
+    logger.info("Assessment logged in Supabase with ID: %s", ids[0] if ids else None)
+    return ids[0] if ids else None
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Opaque keyset cursor pointing just past row."""
+    raw = json.dumps([row["timestamp"], row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    Decode a cursor into (timestamp, id). The timestamp is parsed and
+    re-serialized, so only a well-formed ISO timestamp ever reaches the
+    PostgREST filter. Raises ValueError if malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(row_id, int) or isinstance(row_id, bool):
+            raise TypeError("cursor id must be an integer")
+        return datetime.fromisoformat(timestamp).isoformat(), row_id
+    except (ValueError, TypeError, binascii.Error) as exc:
+        raise ValueError("Invalid cursor") from exc
 
 
-def get_assessments(
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated column list. id and timestamp are always
+    included since cursors are built from them. Raises ValueError on
+    unknown columns; returns None for all columns.
+    """
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in ASSESSMENT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(["id", "timestamp", *requested]))
+
+
+def _assessment_filters(
+    start_date: Optional[str],
+    end_date: Optional[str],
+    triage_level: Optional[str],
+) -> List[Tuple[str, Any]]:
+    filters: List[Tuple[str, Any]] = []
+    if start_date:
+        filters.append(("timestamp", f"gte.{start_date}"))
+    if end_date:
+        filters.append(("timestamp", f"lte.{end_date}"))
+    if triage_level:
+        filters.append(("triage_level", f"eq.{triage_level}"))
+    return filters
+
+
+async def get_assessments_page(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     triage_level: Optional[str] = None,
     limit: int = 100,
     offset: int = 0,
-) -> List[Dict[str, Any]]:
+    cursor: Optional[str] = None,
+    count: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Fetch one page of assessments, newest first.
+
+    With a cursor the page is read by keyset on (timestamp, id) and offset is
+    ignored. next_cursor is None on the last page. When count is given
+    (exact, planned or estimated) the total for the filters is returned too.
+    fields projects the select.
+    """
     client = _ensure_client()
-    query = (
-        client.table(ASSESSMENTS_TABLE)
-        .select("*")
-        .order("timestamp", desc=True)
+    filters = _assessment_filters(start_date, end_date, triage_level)
+    limit = max(limit, 1)
+    # Compact rows need their source columns to expand the projected ones
+    sources = [
+        source for column, source in COMPACT_SOURCES.items()
+        if settings.ASSESSMENT_LOG_COMPACT and fields and column in fields and source not in fields
+    ]
+    select = ",".join([*fields, *dict.fromkeys(sources)]) if fields else "*"
+
+    params = [("select", select), ("order", "timestamp.desc,id.desc"), *filters]
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        params.append((
+            "or",
+            f'(timestamp.lt."{timestamp}",and(timestamp.eq."{timestamp}",id.lt.{row_id}))',
+        ))
+    elif offset:
+        params.append(("offset", max(offset, 0)))
+    # One extra row tells us whether another page exists
+    params.append(("limit", limit + 1))
+
+    page = client.select(ASSESSMENTS_TABLE, params, action="fetch assessments")
+    if count:
+        response, total = await asyncio.gather(
+            page, client.count(ASSESSMENTS_TABLE, filters, mode=count, action="count assessments")
+        )
+    else:
+        response, total = await page, None
+
+    rows = response.json()
+    if settings.ASSESSMENT_LOG_COMPACT:
+        for row in rows:
+            expand_compact_row(row)
+            for source in sources:
+                row.pop(source, None)
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return {
+        "assessments": rows[:limit],
+        "next_cursor": next_cursor,
+        "total": total,
+    }
+
+
+async def get_assessments(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    triage_level: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    page = await get_assessments_page(
+        start_date=start_date,
+        end_date=end_date,
+        triage_level=triage_level,
+        limit=limit,
+        offset=offset,
+        cursor=cursor,
     )
+    return page["assessments"]
+
+
+async def iter_assessment_chunks(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    triage_level: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+    chunk_size: int = 1000,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield every matching assessment, newest first, one keyset page at a time.
+    Only one page is held in memory however large the range is.
+    """
+    cursor = None
+    while True:
+        page = await get_assessments_page(
+            start_date=start_date,
+            end_date=end_date,
+            triage_level=triage_level,
+            limit=chunk_size,
+            cursor=cursor,
+            fields=fields,
+        )
+        if page["assessments"]:
+            yield page["assessments"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return
+
+
+async def iter_assessments_after(
+    last_id: int = 0,
+    chunk_size: int = 1000,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield every assessment with an id above last_id, oldest first, in keyset pages."""
+    client = _ensure_client()
+    while True:
+        params = [
+            ("select", "*"),
+            ("id", f"gt.{last_id}"),
+            ("order", "id.asc"),
+            ("limit", chunk_size),
+        ]
+        response = await client.select(ASSESSMENTS_TABLE, params, action="fetch assessments for export")
+        rows = response.json()
+        if settings.ASSESSMENT_LOG_COMPACT:
+            rows = [expand_compact_row(row) for row in rows]
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+async def get_assessment_by_id(assessment_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Fetch the explanation columns of one assessment by primary key.
+    Assessments are immutable, so found rows are cached without expiry.
+    """
+    cached = _assessment_cache.get(str(assessment_id))
+    if cached is not None:
+        return cached
+
+    client = _ensure_client()
+    params = {"select": EXPLANATION_COLUMNS, "id": f"eq.{assessment_id}"}
+    response = await client.select(ASSESSMENTS_TABLE, params, action="fetch assessment")
+    rows = response.json()
+    if not rows:
+        return None
+
+    record = expand_compact_row(rows[0]) if settings.ASSESSMENT_LOG_COMPACT else rows[0]
+    _assessment_cache.set(str(assessment_id), record)
+    return record
 
-    if start_date:
-        query = query.gte("timestamp", start_date)
-    if end_date:
-        query = query.lte("timestamp", end_date)
-    if triage_level:
-        query = query.eq("triage_level", triage_level)
-
-    start = max(offset, 0)
-    end = start + max(limit, 1) - 1
-    query = query.range(start, end)
-
-    response = query.execute()
-    if hasattr(response, 'error') and response.error:
-        raise RuntimeError(f"Failed to fetch assessments: {response.error.message}")
-
-    assessments: List[Dict[str, Any]] = []
-    for row in response.data or []:
-        record = dict(row)
-        # Parse JSON fields
-        recommendations = record.get("recommendations")
-        if isinstance(recommendations, str):
-            try:
-                record["recommendations"] = json.loads(recommendations)
-            except json.JSONDecodeError:
-                record["recommendations"] = []
-        
-        key_factors = record.get("key_factors")
-        if isinstance(key_factors, str):
-            try:
-                record["key_factors"] = json.loads(key_factors)
-            except json.JSONDecodeError:
-                record["key_factors"] = []
-        
-        explanation_tags = record.get("explanation_tags")
-        if isinstance(explanation_tags, str):
-            try:
-                record["explanation_tags"] = json.loads(explanation_tags)
-            except json.JSONDecodeError:
-                record["explanation_tags"] = []
-        
-        assessments.append(record)
 
-    return assessments
+def get_assessment_cache_stats() -> Dict[str, Any]:
+    """Statistics for the by-id assessment cache."""
+    return _assessment_cache.stats()
 
 
-def get_analytics(
+def _level_counts(counts: Optional[Dict[str, int]]) -> Dict[str, int]:
+    """Counts for every triage level, filling in levels with no assessments."""
+    counts = counts or {}
+    return {
+        "self_care": counts.get("self_care", 0),
+        "primary_care": counts.get("primary_care", 0),
+        "semi_emergency": counts.get("semi_emergency", 0),
+        "emergency": counts.get("emergency", 0),
+    }
+
+
+async def get_analytics(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
 ) -> Dict[str, Any]:
+    """
+    Dashboard summary for the date range, aggregated in Postgres by the
+    assessment_analytics function. Once create_analytics_rollups.sql is
+    applied it merges hourly/daily rollup rows instead of scanning assessments.
+    """
     client = _ensure_client()
-    query = (
-        client.table(ASSESSMENTS_TABLE)
-        .select("triage_level,symptom,age,confidence")
-        .order("timestamp", desc=True)
-    ).limit(1000)
+    summary = await client.rpc(
+        ANALYTICS_FUNCTION,
+        {"start_ts": start_date, "end_ts": end_date},
+        action="fetch analytics",
+    )
 
-    if start_date:
-        query = query.gte("timestamp", start_date)
-    if end_date:
-        query = query.lte("timestamp", end_date)
-
-    response = query.execute()
-    if hasattr(response, 'error') and response.error:
-        raise RuntimeError(f"Failed to fetch analytics: {response.error.message}")
-
-    rows = response.data or []
-
-    total = len(rows)
-    level_counts = Counter(row.get("triage_level") for row in rows)
-
-    symptoms_counter = Counter()
-    for row in rows:
-        symptom = (row.get("symptom") or "").strip()
-        if symptom:
-            symptoms_counter[symptom] += 1
-
-    numeric_ages = []
-    for row in rows:
-        age = row.get("age")
-        try:
-            numeric_ages.append(float(age))
-        except (TypeError, ValueError):
-            continue
-
-    confidences = [
-        row.get("confidence")
-        for row in rows
-        if isinstance(row.get("confidence"), (int, float))
-    ]
+    average_age = summary.get("average_age")
+    average_confidence = summary.get("average_confidence")
 
     return {
-        "total_assessments": total,
-        "count_by_level": {
-            "self_care": level_counts.get("self_care", 0),
-            "primary_care": level_counts.get("primary_care", 0),
-            "semi_emergency": level_counts.get("semi_emergency", 0),
-            "emergency": level_counts.get("emergency", 0),
-        },
-        "top_symptoms": [
-            {"symptom": symptom, "count": count}
-            for symptom, count in symptoms_counter.most_common(10)
-        ],
-        "average_age": round(mean(numeric_ages), 1) if numeric_ages else None,
-        "average_confidence": round(mean(confidences), 2) if confidences else None,
+        "total_assessments": summary.get("total_assessments", 0),
+        "count_by_level": _level_counts(summary.get("count_by_level")),
+        "top_symptoms": summary.get("top_symptoms") or [],
+        "average_age": round(float(average_age), 1) if average_age is not None else None,
+        "average_confidence": round(float(average_confidence), 2) if average_confidence is not None else None,
     }
 
 
+async def get_analytics_timeseries(
+    bucket: str = "day",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Per-bucket counts by triage level, mean confidence and low-confidence
+    rate, read from the analytics rollups by the assessment_timeseries function.
+    """
+    if bucket not in TIMESERIES_BUCKETS:
+        raise ValueError(f"bucket must be one of: {', '.join(TIMESERIES_BUCKETS)}")
+    client = _ensure_client()
+    try:
+        series = await client.rpc(
+            TIMESERIES_FUNCTION,
+            {"bucket_size": bucket, "start_ts": start_date, "end_ts": end_date},
+            action="fetch analytics timeseries",
+        )
+    except PostgrestError as exc:
+        # Invalid ranges are rejected by the function itself
+        if exc.status_code == 400:
+            raise ValueError(str(exc)) from exc
+        raise
+
+    points = []
+    for point in series or []:
+        mean_confidence = point.get("mean_confidence")
+        low_confidence_rate = point.get("low_confidence_rate")
+        points.append({
+            "bucket": point["bucket"],
+            "total": point.get("total", 0),
+            "count_by_level": _level_counts(point.get("count_by_level")),
+            "mean_confidence": round(float(mean_confidence), 2) if mean_confidence is not None else None,
+            "low_confidence_rate": round(float(low_confidence_rate), 4) if low_confidence_rate is not None else None,
+        })
+    return points
+
+
+async def backfill_rollups(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> int:
+    """
+    Rebuild the analytics rollups for the UTC days overlapping the range
+    (see create_analytics_rollups.sql). Returns the number of assessments rolled up.
+    """
+    client = _ensure_client()
+    processed = await client.rpc(
+        ROLLUP_BACKFILL_FUNCTION,
+        {"start_ts": start_date, "end_ts": end_date},
+        action="backfill analytics rollups",
+    )
+    logger.info("Backfilled analytics rollups for %s assessments", processed)
+    return int(processed or 0)
+
+
+async def backfill_blood_pressure(batch_size: int = 5000) -> int:
+    """
+    Fill bp_systolic/bp_diastolic for one batch of existing rows
+    (see migrate_typed_columns.sql). Returns the number of rows updated.
+    """
+    client = _ensure_client()
+    updated = await client.rpc(
+        BLOOD_PRESSURE_BACKFILL_FUNCTION,
+        {"batch_size": batch_size},
+        action="backfill blood pressure",
+    )
+    return int(updated or 0)
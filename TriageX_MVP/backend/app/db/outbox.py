@@ -0,0 +1,285 @@
+"""
+Durable local outbox for assessment rows.
+
+Rows are appended to a SQLite database in WAL mode before they are sent to
+Supabase. A background replayer pushes them to the assessments table in
+batches and only deletes them once the insert succeeded, retrying with
+exponential backoff while Supabase is slow or unavailable. Rows Supabase
+rejects outright (a 4xx such as a type or missing-column error) are
+isolated by bisecting the batch and moved to a dead-letter table in the
+same file, so one bad row never blocks the rest of the log.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.db.database import log_assessments
+from app.db.postgrest import PostgrestError
+
+logger = logging.getLogger(__name__)
+
+Sink = Callable[[List[Dict[str, Any]]], Awaitable[Any]]
+
+# Client errors that describe the deployment (auth, missing table, rate
+# limits) rather than the rows; these are retried like server errors
+RETRYABLE_CLIENT_STATUSES = frozenset({401, 403, 404, 408, 429})
+
+
+def is_permanent_error(exc: BaseException) -> bool:
+    """True when Supabase rejected the rows themselves, so retrying cannot help."""
+    return (
+        isinstance(exc, PostgrestError)
+        and 400 <= exc.status_code < 500
+        and exc.status_code not in RETRYABLE_CLIENT_STATUSES
+    )
+
+
+class AssessmentOutbox:
+    """Append-only SQLite outbox with a batched, backing-off replayer."""
+
+    def __init__(
+        self,
+        path: str,
+        sink: Sink,
+        batch_size: int,
+        poll_interval: float,
+        backoff_base: float,
+        backoff_max: float,
+    ):
+        self.path = path
+        self._sink = sink
+        self.batch_size = max(batch_size, 1)
+        self.poll_interval = max(poll_interval, 0.01)
+        self.backoff_base = max(backoff_base, 0.01)
+        self.backoff_max = max(backoff_max, self.backoff_base)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+
+        # Metrics
+        self._pending = 0
+        self._high_water = 0
+        self._appended = 0
+        self._replayed = 0
+        self._dead_letter = 0
+        self._failures = 0
+        self._consecutive_failures = 0
+        self._last_error: Optional[str] = None
+        self._last_replay_at: Optional[float] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "payload TEXT NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS dead_letter ("
+                "id INTEGER PRIMARY KEY, "
+                "payload TEXT NOT NULL, "
+                "created_at REAL NOT NULL, "
+                "failed_at REAL NOT NULL, "
+                "error TEXT)"
+            )
+            self._pending = conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+            self._dead_letter = conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+            self._high_water = max(self._high_water, self._pending)
+            self._conn = conn
+        return self._conn
+
+    def append(self, payloads: List[Dict[str, Any]]) -> None:
+        """Durably append assessment rows. Blocking; call from a worker thread."""
+        if not payloads:
+            return
+        now = time.time()
+        rows = [(json.dumps(payload, default=str), now) for payload in payloads]
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany("INSERT INTO outbox (payload, created_at) VALUES (?, ?)", rows)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._appended += len(rows)
+            self._pending += len(rows)
+            if self._pending > self._high_water:
+                self._high_water = self._pending
+
+    def _fetch(self, limit: int) -> List[Tuple[int, str]]:
+        with self._lock:
+            return self._connect().execute(
+                "SELECT id, payload FROM outbox ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+
+    def _delete(self, ids: List[int]) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            conn.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in ids])
+            conn.execute("COMMIT")
+            self._pending -= len(ids)
+
+    def _move_to_dead_letter(self, row_id: int, error: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO dead_letter (id, payload, created_at, failed_at, error) "
+                    "SELECT id, payload, created_at, ?, ? FROM outbox WHERE id = ?",
+                    (time.time(), error, row_id),
+                )
+                conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._pending -= 1
+            self._dead_letter += 1
+
+    async def _send(self, rows: List[Tuple[int, str]]) -> int:
+        """
+        Insert rows and delete them from the outbox. A permanent rejection is
+        narrowed down by bisection until the offending rows are dead-lettered;
+        any other error propagates so the replayer backs off.
+        """
+        try:
+            await self._sink([json.loads(payload) for _, payload in rows])
+        except Exception as exc:
+            if not is_permanent_error(exc):
+                raise
+            if len(rows) == 1:
+                row_id = rows[0][0]
+                logger.error("Outbox row %d rejected by Supabase, moved to dead letter: %s", row_id, exc)
+                await asyncio.to_thread(self._move_to_dead_letter, row_id, str(exc))
+                return 1
+            middle = len(rows) // 2
+            return await self._send(rows[:middle]) + await self._send(rows[middle:])
+        await asyncio.to_thread(self._delete, [row_id for row_id, _ in rows])
+        self._replayed += len(rows)
+        return len(rows)
+
+    async def _replay_batch(self) -> int:
+        """Push the oldest batch to the sink. Returns the number of rows it removed."""
+        rows = await asyncio.to_thread(self._fetch, self.batch_size)
+        if not rows:
+            return 0
+        return await self._send(rows)
+
+    async def start(self) -> None:
+        """Open the outbox and start the background replayer."""
+        await asyncio.to_thread(self._connect)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+            logger.info("Assessment outbox replayer started (%s, %d pending)", self.path, self._pending)
+
+    async def stop(self) -> None:
+        """Stop the replayer after one best-effort pass. Unsent rows stay on disk."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._inflight is not None:
+            try:
+                await self._inflight
+            except Exception:
+                pass
+            self._inflight = None
+        try:
+            while await self._replay_batch():
+                pass
+        except Exception as exc:
+            logger.warning("Outbox not fully drained on shutdown (%d pending): %s", self._pending, exc)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
+
+    def _backoff(self) -> float:
+        delay = min(self.backoff_base * (2 ** (self._consecutive_failures - 1)), self.backoff_max)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _run(self) -> None:
+        while True:
+            # Shield the replay so shutdown never races a batch that is mid-insert
+            self._inflight = asyncio.ensure_future(self._replay_batch())
+            try:
+                replayed = await asyncio.shield(self._inflight)
+                self._inflight = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self._inflight = None
+                self._failures += 1
+                self._consecutive_failures += 1
+                self._last_error = str(exc)
+                delay = self._backoff()
+                logger.error(
+                    "Outbox replay failed (%d pending, attempt %d), retrying in %.1fs: %s",
+                    self._pending, self._consecutive_failures, delay, exc,
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            if self._consecutive_failures:
+                logger.info("Outbox replay recovered after %d failures", self._consecutive_failures)
+            self._consecutive_failures = 0
+            if replayed:
+                self._last_replay_at = time.time()
+            if replayed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        """Outbox backlog and replay metrics."""
+        return {
+            "path": self.path,
+            "pending": self._pending,
+            "high_water_mark": self._high_water,
+            "appended": self._appended,
+            "replayed": self._replayed,
+            "dead_letter": self._dead_letter,
+            "failures": self._failures,
+            "consecutive_failures": self._consecutive_failures,
+            "last_error": self._last_error,
+            "last_replay_at": (
+                datetime.fromtimestamp(self._last_replay_at).isoformat() if self._last_replay_at else None
+            ),
+            "running": self._worker is not None and not self._worker.done(),
+        }
+
+
+# Global outbox instance (None when disabled)
+assessment_outbox: Optional[AssessmentOutbox] = (
+    AssessmentOutbox(
+        path=settings.ASSESSMENT_OUTBOX_PATH,
+        sink=log_assessments,
+        batch_size=settings.ASSESSMENT_OUTBOX_BATCH_SIZE,
+        poll_interval=settings.ASSESSMENT_OUTBOX_POLL_INTERVAL,
+        backoff_base=settings.ASSESSMENT_OUTBOX_BACKOFF_BASE,
+        backoff_max=settings.ASSESSMENT_OUTBOX_BACKOFF_MAX,
+    )
+    if settings.ASSESSMENT_OUTBOX_ENABLED
+    else None
+)
@@ -0,0 +1,139 @@
+"""
+Async PostgREST client for the Supabase REST API.
+
+A single pooled httpx.AsyncClient (keep-alive, optionally HTTP/2) is shared
+by every database call, so handlers can await many queries concurrently
+without blocking the event loop.
+"""
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+Params = Union[Dict[str, Any], Sequence[Tuple[str, Any]]]
+
+
+class PostgrestError(RuntimeError):
+    """Raised when PostgREST answers with an error status."""
+
+    def __init__(self, message: str, status_code: int, code: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+
+class PostgrestClient:
+    """Minimal async client for the PostgREST endpoints the app uses."""
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        http2: bool,
+        max_connections: int,
+        max_keepalive_connections: int,
+        keepalive_expiry: float,
+        timeout: float,
+        connect_timeout: float,
+    ):
+        if http2:
+            try:
+                import h2  # noqa: F401  # type: ignore
+            except ImportError:
+                logger.warning("h2 is not installed; Supabase client falls back to HTTP/1.1")
+                http2 = False
+        self.http2 = http2
+        self._client = httpx.AsyncClient(
+            base_url=f"{url.rstrip('/')}/rest/v1",
+            headers={
+                "apikey": key,
+                "Authorization": f"Bearer {key}",
+                "Accept": "application/json",
+            },
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        )
+
+    @staticmethod
+    def _raise_for_error(response: httpx.Response, action: str) -> None:
+        if response.status_code < 400:
+            return
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        message = body.get("message") if isinstance(body, dict) else None
+        raise PostgrestError(
+            f"Failed to {action}: {message or response.text or response.reason_phrase}",
+            status_code=response.status_code,
+            code=body.get("code") if isinstance(body, dict) else None,
+        )
+
+    async def select(
+        self,
+        table: str,
+        params: Params,
+        headers: Optional[Dict[str, str]] = None,
+        action: str = "fetch rows",
+    ) -> httpx.Response:
+        """GET rows from a table. params are PostgREST query parameters."""
+        response = await self._client.get(f"/{table}", params=params, headers=headers)
+        self._raise_for_error(response, action)
+        return response
+
+    async def count(
+        self,
+        table: str,
+        params: Params,
+        mode: str = "exact",
+        action: str = "count rows",
+    ) -> Optional[int]:
+        """
+        Count rows matching params without fetching them.
+        mode is a PostgREST count strategy: exact, planned or estimated.
+        """
+        response = await self._client.head(
+            f"/{table}", params=params, headers={"Prefer": f"count={mode}"}
+        )
+        self._raise_for_error(response, action)
+        # Content-Range: "0-24/3573" or "*/3573"
+        total = response.headers.get("content-range", "").rpartition("/")[2]
+        return int(total) if total.isdigit() else None
+
+    async def insert(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        returning: str = "id",
+        action: str = "insert rows",
+    ) -> List[Dict[str, Any]]:
+        """Insert rows in one request and return the `returning` columns."""
+        response = await self._client.post(
+            f"/{table}",
+            params={"select": returning},
+            json=rows,
+            headers={"Prefer": "return=representation"},
+        )
+        self._raise_for_error(response, action)
+        return response.json()
+
+    async def rpc(
+        self,
+        function: str,
+        args: Dict[str, Any],
+        action: str = "call function",
+    ) -> Any:
+        """Call a Postgres function exposed by PostgREST and return its JSON result."""
+        response = await self._client.post(f"/rpc/{function}", json=args)
+        self._raise_for_error(response, action)
+        return response.json()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
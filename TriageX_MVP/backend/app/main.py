@@ -1,25 +1,60 @@
 """
 Main FastAPI application entry point.
 """
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.core.logging_config import setup_logging
-from app.db.database import init_database
+from app.db.database import SupabaseNotConfigured, init_database, close_database
+from app.db.assessment_log import assessment_log
+from app.db.outbox import assessment_outbox
+from app.services.live_analytics import live_analytics
+from app.services.triage_rules import rule_store
 from app.api.v1.router import api_router
 
 # Setup logging
 setup_logging()
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers on startup and drain them on shutdown."""
+    # Initialize database on startup
+    try:
+        await init_database()
+    except SupabaseNotConfigured:
+        raise
+    except Exception as exc:
+        # With the outbox, assessments are kept on disk until Supabase is back
+        if assessment_outbox is None:
+            raise
+        logger.warning("Starting without Supabase; assessments are queued in the outbox: %s", exc)
+    if assessment_outbox is not None:
+        await assessment_outbox.start()
+    await assessment_log.start()
+    await live_analytics.start()
+    await rule_store.start()
+    yield
+    await rule_store.stop()
+    await live_analytics.stop()
+    # Drain the in-memory queue into the outbox before stopping the replayer
+    await assessment_log.stop()
+    if assessment_outbox is not None:
+        await assessment_outbox.stop()
+    await close_database()
 
-# Initialize database on startup
-init_database()
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.API_TITLE,
     version=settings.API_VERSION,
-    description=settings.API_DESCRIPTION
+    description=settings.API_DESCRIPTION,
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -3,29 +3,37 @@ Adaptive questioning system for dynamic follow-up questions.
 """
 from typing import Dict, List, Any
 
+from app.services.symptom_lexicon import (
+    SYMPTOM_LEXICON,
+    CHEST_PAIN,
+    SHORTNESS_OF_BREATH,
+    DVT,
+    HEAD_INJURY,
+)
+
 
 def identify_required_questions(symptom: str) -> List[str]:
     """
     Identify which adaptive questions are needed based on symptom.
     Returns list of question type strings.
     """
-    symptom_lower = symptom.lower()
+    hits = SYMPTOM_LEXICON.match(symptom)
     required = []
     
     # DVT questions
-    if any(word in symptom_lower for word in ["swollen leg", "leg swelling", "dvt", "swollen"]):
+    if hits & DVT:
         required.append("dvt_questions")
     
     # Head injury questions
-    if any(word in symptom_lower for word in ["head injury", "head trauma", "hit head", "concussion"]):
+    if hits & HEAD_INJURY:
         required.append("head_injury_questions")
     
     # Chest pain questions
-    if any(word in symptom_lower for word in ["chest pain", "chest discomfort", "pressure"]):
+    if hits & CHEST_PAIN:
         required.append("chest_pain_questions")
     
     # Respiratory questions
-    if any(word in symptom_lower for word in ["shortness of breath", "difficulty breathing", "can't breathe", "dyspnea", "sob"]):
+    if hits & SHORTNESS_OF_BREATH:
         required.append("respiratory_questions")
     
     return required
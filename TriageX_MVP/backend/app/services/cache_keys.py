@@ -0,0 +1,53 @@
+"""
+Canonical cache keys for triage requests.
+
+Two requests that the triage engine scores identically should share a cache
+entry. The key therefore covers only the inputs analyze_health reads, with
+yes/no answers case-folded, free text reduced to lexicon hits and vitals
+reduced to the side of each rule threshold they fall on (thresholds depend on
+the age band, so the key records which compiled band scored the request). The
+rule set version is part of the key, so reloading the rules invalidates
+earlier entries.
+"""
+import hashlib
+from typing import Optional
+
+from app.services.triage_features import extract_features
+from app.services.triage_rules import RuleSet, current_rules
+
+# Bump whenever the key layout changes (rule changes are covered by the rule set version)
+CACHE_KEY_VERSION = 4
+
+
+def canonical_cache_key(data, rules: Optional[RuleSet] = None) -> str:
+    """
+    Return a short digest identifying the triage outcome class of a request.
+    data is a HealthData request or its precomputed TriageFeatures; rules
+    defaults to the active rule set and must be the one used to score it.
+    """
+    f = extract_features(data)
+    rules = rules or current_rules()
+
+    parts = (
+        CACHE_KEY_VERSION,
+        rules.version,
+        f.symptom_hits,
+        f.loc_hits,
+        # Age band, then vitals quantized to that band's thresholds
+        rules.quantize_vitals(f),
+        # Presence only affects data quality; answers and onset are one bitmask
+        f.present,
+        f.answers,
+        f.adaptive_answered,
+        # Medical history
+        f.medical_history_provided,
+        f.has_medication_list,
+        f.medication_hits if f.has_medication_list else 0,
+        f.has_conditions,
+        f.condition_hits if f.has_conditions else 0,
+        f.is_pregnant,
+        f.third_trimester,
+        f.is_trauma_related,
+        f.trauma_type,
+    )
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
@@ -0,0 +1,214 @@
+"""
+In-process live analytics over every /analyze call.
+
+Each call (cache hits included) updates exact per-level counters, a
+Space-Saving top-k of symptoms and DDSketch quantiles for age, confidence
+and vitals. Memory is fixed regardless of traffic, reads take microseconds,
+and snapshots are written to disk periodically so a restart resumes from
+the last snapshot instead of zero.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.services.triage_rules import TRIAGE_LEVELS
+from app.utils.sketches import DDSketch, SpaceSaving
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+# Numeric fields tracked with quantile sketches
+METRICS = ("age", "confidence", "temperature", "heart_rate", "spo2", "respiratory_rate", "pain_level")
+
+QUANTILES = (("p50", 0.5), ("p90", 0.9), ("p99", 0.99))
+
+
+def _to_number(value: Any) -> Optional[float]:
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = float(value) if isinstance(value, (int, float)) else float(str(value).strip())
+    except (ValueError, OverflowError):
+        return None
+    # "nan", "inf" and "1e400" parse as floats but are not measurements
+    return number if math.isfinite(number) else None
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 4) if value is not None else None
+
+
+class LiveAnalytics:
+    """Fixed-memory streaming aggregates of triage traffic."""
+
+    def __init__(
+        self,
+        top_k: int,
+        relative_accuracy: float,
+        snapshot_path: str,
+        snapshot_interval: float,
+    ):
+        self.top_k = max(top_k, 1)
+        self.relative_accuracy = relative_accuracy
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = max(snapshot_interval, 1.0)
+        self._worker: Optional[asyncio.Task] = None
+        self._last_snapshot_at: Optional[float] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.started_at = datetime.now().isoformat()
+        self.total = 0
+        self.level_counts: Dict[str, int] = {level: 0 for level in TRIAGE_LEVELS}
+        self.low_confidence = 0
+        # Track more candidates than we report so the reported top-k is stable
+        self.symptoms = SpaceSaving(self.top_k * 4)
+        self.metrics: Dict[str, DDSketch] = {
+            metric: DDSketch(self.relative_accuracy) for metric in METRICS
+        }
+
+    def record(
+        self,
+        data,
+        level: str,
+        confidence: float,
+        low_confidence_warning: bool = False,
+    ) -> None:
+        """Add one triage outcome. Called on the event loop for every request."""
+        self.total += 1
+        self.level_counts[level] = self.level_counts.get(level, 0) + 1
+        if low_confidence_warning:
+            self.low_confidence += 1
+
+        symptom = (data.symptom or "").strip().lower()
+        if symptom:
+            self.symptoms.add(symptom)
+
+        metrics = self.metrics
+        for metric, value in (
+            ("age", data.age),
+            ("confidence", confidence),
+            ("temperature", data.temperature),
+            ("heart_rate", data.heart_rate),
+            ("spo2", data.spo2),
+            ("respiratory_rate", data.respiratory_rate),
+            ("pain_level", data.pain_level),
+        ):
+            number = _to_number(value)
+            if number is not None:
+                metrics[metric].add(number)
+
+    def summary(self) -> Dict[str, Any]:
+        """Current counters, top symptoms and p50/p90/p99 per metric."""
+        started = time.perf_counter()
+        metrics = {}
+        for metric, sketch in self.metrics.items():
+            metrics[metric] = {
+                "count": sketch.count,
+                "mean": _round(sketch.sum / sketch.count) if sketch.count else None,
+                **{name: _round(sketch.quantile(q)) for name, q in QUANTILES},
+            }
+        return {
+            "since": self.started_at,
+            "total_assessments": self.total,
+            "count_by_level": dict(self.level_counts),
+            "low_confidence_rate": round(self.low_confidence / self.total, 4) if self.total else None,
+            "top_symptoms": [
+                {"symptom": symptom, "count": count, "max_overcount": error}
+                for symptom, count, error in self.symptoms.top(self.top_k)
+            ],
+            "metrics": metrics,
+            "relative_accuracy": self.relative_accuracy,
+            "last_snapshot_at": self._last_snapshot_at,
+            "computed_in_us": round((time.perf_counter() - started) * 1e6, 1),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": SNAPSHOT_VERSION,
+            "started_at": self.started_at,
+            "total": self.total,
+            "level_counts": self.level_counts,
+            "low_confidence": self.low_confidence,
+            "symptoms": self.symptoms.to_dict(),
+            "metrics": {metric: sketch.to_dict() for metric, sketch in self.metrics.items()},
+        }
+
+    def restore(self, data: Dict[str, Any]) -> None:
+        if data.get("version") != SNAPSHOT_VERSION:
+            logger.warning("Ignoring live analytics snapshot with version %s", data.get("version"))
+            return
+        self.started_at = data["started_at"]
+        self.total = data["total"]
+        self.level_counts.update(data["level_counts"])
+        self.low_confidence = data["low_confidence"]
+        self.symptoms = SpaceSaving.from_dict(data["symptoms"], self.top_k * 4)
+        for metric, sketch in data["metrics"].items():
+            if metric in self.metrics:
+                self.metrics[metric] = DDSketch.from_dict(sketch)
+
+    def _load(self) -> None:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path) as f:
+                self.restore(json.load(f))
+            logger.info("Restored live analytics snapshot (%d assessments)", self.total)
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            logger.error("Failed to restore live analytics snapshot: %s", exc)
+
+    def _write(self, snapshot: str) -> None:
+        # Write then rename so a crash never leaves a truncated snapshot
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(snapshot)
+        os.replace(temp_path, self.snapshot_path)
+
+    async def save(self) -> None:
+        """Persist a snapshot (serialized on the loop, written in a thread)."""
+        if not self.snapshot_path:
+            return
+        snapshot = json.dumps(self.to_dict())
+        try:
+            await asyncio.to_thread(self._write, snapshot)
+            self._last_snapshot_at = time.time()
+        except OSError as exc:
+            logger.error("Failed to write live analytics snapshot: %s", exc)
+
+    async def start(self) -> None:
+        """Restore the last snapshot and start periodic snapshots."""
+        await asyncio.to_thread(self._load)
+        if self.snapshot_path and (self._worker is None or self._worker.done()):
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop periodic snapshots and write a final one."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        await self.save()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            await self.save()
+
+
+# Global live analytics instance
+live_analytics = LiveAnalytics(
+    top_k=settings.LIVE_ANALYTICS_TOP_K,
+    relative_accuracy=settings.LIVE_ANALYTICS_RELATIVE_ACCURACY,
+    snapshot_path=settings.LIVE_ANALYTICS_SNAPSHOT_PATH,
+    snapshot_interval=settings.LIVE_ANALYTICS_SNAPSHOT_INTERVAL,
+)
@@ -0,0 +1,340 @@
+"""
+Incremental columnar export of the assessments table.
+
+Rows with an id above the last exported watermark are fetched in keyset
+pages and written as date-partitioned Parquet files
+(<root>/date=YYYY-MM-DD/part-<first id>-<last id>.parquet). Ids are
+assigned at insert but become visible at commit, so a lower id can appear
+after a higher one was exported. Ids skipped below the watermark are kept
+as gaps and re-read on later runs until they show up or age out. symptom and
+triage_level are dictionary-encoded and list columns keep their structure,
+so the directory opens as a memory-mapped Arrow dataset for offline
+analysis. pyarrow is only imported when an export actually runs.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.db.database import ASSESSMENT_COLUMNS, iter_assessments_after
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_FILE = "_watermark.json"
+PARTITION_FIELD = "date"
+# Larger id jumps are not tracked as gaps (e.g. a sequence reset)
+MAX_GAP_IDS = 10000
+# Columns stored as dictionary<int32, string>
+DICTIONARY_COLUMNS = ("symptom", "triage_level")
+
+
+class ParquetExportUnavailable(RuntimeError):
+    """Raised when pyarrow is not installed."""
+
+
+class ExportInProgress(RuntimeError):
+    """Raised when an export is already running in this process."""
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ParquetExportUnavailable(
+            "pyarrow is required for Parquet export (pip install pyarrow)"
+        ) from exc
+    return pa, pq
+
+
+def _column_types(pa) -> Dict[str, Any]:
+    """Arrow types of the typed assessment columns; anything else is a string."""
+    strings = pa.list_(pa.string())
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return {
+        "id": pa.int64(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+        "age": pa.float64(),
+        "symptom": dictionary,
+        "temperature": pa.float64(),
+        "heart_rate": pa.int32(),
+        "respiratory_rate": pa.int32(),
+        "bp_systolic": pa.int16(),
+        "bp_diastolic": pa.int16(),
+        "spo2": pa.int32(),
+        "pain_level": pa.int32(),
+        "has_medical_conditions": pa.bool_(),
+        "medical_conditions": strings,
+        "has_medications": pa.bool_(),
+        "medications": strings,
+        "is_pregnant": pa.bool_(),
+        "pregnancy_weeks": pa.int32(),
+        "is_trauma_related": pa.bool_(),
+        "triage_level": dictionary,
+        "confidence": pa.float64(),
+        "recommendations": strings,
+        "key_factors": strings,
+        "explanation_tags": pa.list_(pa.struct([
+            ("factor", pa.string()),
+            ("weight", pa.float64()),
+            ("category", pa.string()),
+            ("impact", pa.string()),
+        ])),
+        "data_quality": pa.float64(),
+        "low_confidence_warning": pa.bool_(),
+        "ai_enabled": pa.bool_(),
+        "repeat_count": pa.int32(),
+        "factor_ids": pa.list_(pa.int16()),
+    }
+
+
+def _parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _to_float(value: Any) -> Optional[float]:
+    # Numeric columns may still hold text on databases that were not migrated
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return value
+
+
+def _rows_to_table(pa, rows: List[Dict[str, Any]]):
+    """Build an Arrow table from assessment rows, column by column."""
+    types = _column_types(pa)
+    present = [column for column in ASSESSMENT_COLUMNS if column in rows[0]]
+    present += [column for column in rows[0] if column not in ASSESSMENT_COLUMNS]
+
+    arrays, fields = [], []
+    for column in present:
+        arrow_type = types.get(column, pa.string())
+        values = [row.get(column) for row in rows]
+        if column == "timestamp":
+            values = [_parse_timestamp(value) if value else None for value in values]
+        elif pa.types.is_floating(arrow_type) or pa.types.is_integer(arrow_type):
+            values = [_to_float(value) for value in values]
+            if pa.types.is_integer(arrow_type):
+                values = [int(value) if value is not None else None for value in values]
+        elif arrow_type == pa.string():
+            values = [value if value is None or isinstance(value, str) else json.dumps(value) for value in values]
+        arrays.append(pa.array(values, type=arrow_type))
+        fields.append(pa.field(column, arrow_type))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+class ParquetExporter:
+    """Appends new assessments to a date-partitioned Parquet directory."""
+
+    def __init__(self, root: str, rows_per_file: int, chunk_size: int, gap_ttl: float = 3600.0):
+        self.root = root
+        self.rows_per_file = max(rows_per_file, 1)
+        self.chunk_size = max(chunk_size, 1)
+        self.gap_ttl = gap_ttl
+        self._lock = asyncio.Lock()
+
+    @property
+    def watermark_path(self) -> str:
+        return os.path.join(self.root, WATERMARK_FILE)
+
+    def read_watermark(self) -> Tuple[int, Dict[int, float]]:
+        """
+        Highest assessment id already exported (0 before the first run) and
+        the unexported ids below it, with the time each gap was first seen.
+        """
+        try:
+            with open(self.watermark_path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0, {}
+        gaps = {int(row_id): seen for row_id, seen in data.get("gaps", {}).items()}
+        return int(data["last_id"]), gaps
+
+    def _flush(
+        self, partitions: Dict[date, List[Dict[str, Any]]], last_id: int, gaps: Dict[int, float]
+    ) -> List[str]:
+        """Write one file per day, then advance the watermark."""
+        pa, pq = _pyarrow()
+        written = []
+        for day, rows in sorted(partitions.items()):
+            directory = os.path.join(self.root, f"{PARTITION_FIELD}={day.isoformat()}")
+            os.makedirs(directory, exist_ok=True)
+            name = f"part-{rows[0]['id']:012d}-{rows[-1]['id']:012d}.parquet"
+            # Dot-prefixed temp files are ignored by Arrow dataset discovery
+            temp_path = os.path.join(directory, f".{name}.tmp")
+            pq.write_table(
+                _rows_to_table(pa, rows),
+                temp_path,
+                compression="zstd",
+                use_dictionary=True,
+            )
+            path = os.path.join(directory, name)
+            os.replace(temp_path, path)
+            written.append(path)
+
+        self._write_watermark(last_id, gaps)
+        return written
+
+    def _write_watermark(self, last_id: int, gaps: Dict[int, float]) -> None:
+        _write_json(self.watermark_path, {
+            "last_id": last_id,
+            "gaps": {str(row_id): seen for row_id, seen in gaps.items()},
+            "updated_at": time.time(),
+        })
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Export every assessment above the watermark. Files and the watermark
+        are written every rows_per_file rows, so an interrupted run resumes
+        close to where it stopped.
+        """
+        _pyarrow()
+        if self._lock.locked():
+            raise ExportInProgress("A Parquet export is already running")
+        async with self._lock:
+            started = time.perf_counter()
+            await asyncio.to_thread(os.makedirs, self.root, exist_ok=True)
+            last_id, gaps = await asyncio.to_thread(self.read_watermark)
+            first_id = last_id
+            now = time.time()
+            expired = [row_id for row_id, seen in gaps.items() if now - seen >= self.gap_ttl]
+            for row_id in expired:
+                del gaps[row_id]
+            if expired:
+                logger.warning("Giving up on %d assessment ids that never appeared", len(expired))
+            # Re-read from the oldest open gap; rows exported before are skipped
+            after = min(gaps) - 1 if gaps else last_id
+
+            partitions: Dict[date, List[Dict[str, Any]]] = {}
+            buffered = exported = late = 0
+            files: List[str] = []
+            async for rows in iter_assessments_after(after, chunk_size=self.chunk_size):
+                new_rows = []
+                for row in rows:
+                    row_id = row["id"]
+                    if row_id <= last_id:
+                        if gaps.pop(row_id, None) is None:
+                            continue
+                        late += 1
+                    else:
+                        if row_id - last_id <= MAX_GAP_IDS:
+                            gaps.update((missing, now) for missing in range(last_id + 1, row_id))
+                        last_id = row_id
+                    new_rows.append(row)
+                for row in new_rows:
+                    day = _parse_timestamp(row["timestamp"]).date()
+                    partitions.setdefault(day, []).append(row)
+                buffered += len(new_rows)
+                if buffered >= self.rows_per_file:
+                    files += await asyncio.to_thread(self._flush, partitions, last_id, dict(gaps))
+                    exported += buffered
+                    partitions, buffered = {}, 0
+            if partitions:
+                files += await asyncio.to_thread(self._flush, partitions, last_id, dict(gaps))
+                exported += buffered
+            elif expired:
+                await asyncio.to_thread(self._write_watermark, last_id, gaps)
+
+            logger.info(
+                "Exported %d assessments (ids %d..%d) to %d Parquet files",
+                exported, first_id + 1, last_id, len(files),
+            )
+            return {
+                "exported": exported,
+                "late_rows": late,
+                "open_gaps": len(gaps),
+                "files": files,
+                "last_id": last_id,
+                "directory": self.root,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+
+
+def open_dataset(root: Optional[str] = None):
+    """
+    Open an export directory as an Arrow dataset. Files are memory-mapped
+    and the date partition is exposed as a date32 column.
+    """
+    pa, _ = _pyarrow()
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    root = root or settings.PARQUET_EXPORT_DIR
+    filesystem = fs.LocalFileSystem(use_mmap=True)
+    partitioning = ds.partitioning(pa.schema([(PARTITION_FIELD, pa.date32())]), flavor="hive")
+    dataset = ds.dataset(root, format="parquet", partitioning=partitioning, filesystem=filesystem)
+    # Files written before a column was added lack it; unify so every column is visible
+    schemas = [fragment.physical_schema for fragment in dataset.get_fragments()]
+    if len(schemas) > 1:
+        schema = pa.unify_schemas(schemas + [dataset.partitioning.schema])
+        dataset = ds.dataset(
+            root, format="parquet", partitioning=partitioning, filesystem=filesystem, schema=schema
+        )
+    return dataset
+
+
+def write_snapshot(path: str, root: Optional[str] = None) -> int:
+    """
+    Consolidate an export directory into one Arrow IPC file that
+    load_snapshot() maps without copying. Batches are streamed, so memory
+    stays flat. Returns the number of rows written.
+    """
+    pa, _ = _pyarrow()
+    import pyarrow.compute as pc
+
+    dataset = open_dataset(root)
+    schema = dataset.schema
+    # IPC files allow one dictionary per column, so build the union first
+    dictionaries = {}
+    for column in DICTIONARY_COLUMNS:
+        if column in schema.names:
+            values = dataset.to_table(columns=[column]).column(column)
+            dictionaries[column] = pc.unique(values.cast(pa.string()).drop_null())
+
+    rows = 0
+    temp_path = f"{path}.tmp"
+    with pa.OSFile(temp_path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in dataset.to_batches():
+            columns = []
+            for name in schema.names:
+                array = batch.column(name)
+                if name in dictionaries:
+                    indices = pc.take(pc.index_in(array.dictionary, value_set=dictionaries[name]), array.indices)
+                    array = pa.DictionaryArray.from_arrays(indices.cast(pa.int32()), dictionaries[name])
+                columns.append(array)
+            writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+            rows += batch.num_rows
+    os.replace(temp_path, path)
+    return rows
+
+
+def load_snapshot(path: str):
+    """Memory-map an Arrow IPC snapshot as a zero-copy Table."""
+    pa, _ = _pyarrow()
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+# Global exporter used by the admin endpoint
+parquet_exporter = ParquetExporter(
+    root=settings.PARQUET_EXPORT_DIR,
+    rows_per_file=settings.PARQUET_EXPORT_ROWS_PER_FILE,
+    chunk_size=settings.ADMIN_EXPORT_CHUNK_SIZE,
+    gap_ttl=settings.PARQUET_EXPORT_GAP_TTL_SECONDS,
+)
@@ -0,0 +1,134 @@
+"""
+Compiled keyword lexicons shared by the triage engine and adaptive questions.
+
+Every keyword list used for scenario detection lives here. Each lexicon is
+compiled into a single trie-shaped regular expression wrapped in a lookahead,
+so one scan over the text reports every keyword occurrence (including
+overlapping ones) and returns the union of their scenario bits.
+"""
+import re
+from typing import Dict, Iterable, Optional
+
+# Symptom scenario bits
+CHEST_PAIN = 1 << 0
+CHEST = 1 << 1
+SHORTNESS_OF_BREATH = 1 << 2
+DVT = 1 << 3
+HEAD_INJURY = 1 << 4
+BLEEDING = 1 << 5
+CARDIORESPIRATORY = 1 << 6
+BREATHING_DIFFICULTY = 1 << 7
+
+# Medication bits
+BLOOD_THINNER = 1 << 0
+PAIN_MEDICATION = 1 << 1
+
+# Medical condition bits
+HEART_DISEASE = 1 << 0
+DIABETES = 1 << 1
+RESPIRATORY_DISEASE = 1 << 2
+CANCER = 1 << 3
+
+# Level of consciousness bits
+UNRESPONSIVE = 1 << 0
+ALTERED_CONSCIOUSNESS = 1 << 1
+
+# Duration bits
+RECENT_ONSET = 1 << 0
+
+
+class Lexicon:
+    """Multi-keyword matcher returning a bitmask of all hits in one pass."""
+
+    def __init__(self, vocabulary: Dict[int, Iterable[str]]):
+        bits: Dict[str, int] = {}
+        for bit, keywords in vocabulary.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                bits[keyword] = bits.get(keyword, 0) | bit
+
+        # The regex reports the longest keyword starting at each position, so
+        # fold in the bits of every keyword that is a prefix of it.
+        self._bits = {
+            keyword: _union(value for other, value in bits.items() if keyword.startswith(other))
+            for keyword in bits
+        }
+        self.keywords = tuple(sorted(bits))
+        self._pattern = re.compile("(?=(" + _trie_pattern(_build_trie(self.keywords)) + "))")
+
+    def match(self, text: Optional[str]) -> int:
+        """Return the bitmask of every keyword found in text (case-insensitive)."""
+        if not text:
+            return 0
+        hits = 0
+        bits = self._bits
+        for found in self._pattern.findall(text.lower()):
+            hits |= bits[found]
+        return hits
+
+    def match_any(self, texts: Optional[Iterable[str]]) -> int:
+        """Return the combined bitmask for a list of texts, scanned as one string."""
+        if not texts:
+            return 0
+        return self.match("\x00".join(text for text in texts if text))
+
+
+def _union(values: Iterable[int]) -> int:
+    result = 0
+    for value in values:
+        result |= value
+    return result
+
+
+def _build_trie(keywords: Iterable[str]) -> Dict[str, dict]:
+    root: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = root
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return root
+
+
+def _trie_pattern(node: Dict[str, dict]) -> str:
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        # Greedy optional group: prefer the longer keyword, fall back to this one
+        pattern = "(?:" + pattern + ")?"
+    return pattern
+
+
+SYMPTOM_LEXICON = Lexicon({
+    CHEST_PAIN: ["chest pain", "chest discomfort", "pressure"],
+    CHEST: ["chest"],
+    SHORTNESS_OF_BREATH: ["shortness of breath", "difficulty breathing", "can't breathe", "dyspnea", "sob"],
+    DVT: ["swollen leg", "leg swelling", "dvt", "swollen"],
+    HEAD_INJURY: ["head injury", "head trauma", "hit head", "concussion"],
+    BLEEDING: ["bleeding", "blood", "hemorrhage"],
+    CARDIORESPIRATORY: ["chest pain", "chest discomfort", "shortness of breath", "difficulty breathing"],
+    BREATHING_DIFFICULTY: ["shortness of breath", "difficulty breathing", "wheezing"],
+})
+
+MEDICATION_LEXICON = Lexicon({
+    BLOOD_THINNER: ["warfarin", "noak", "noac", "aspirin", "blood thinner", "blood thinners", "blodförtunnande"],
+    PAIN_MEDICATION: ["painkiller", "pain", "analgesic", "opioid", "smärtstillande"],
+})
+
+CONDITION_LEXICON = Lexicon({
+    HEART_DISEASE: ["heart", "hjärt"],
+    DIABETES: ["diabetes"],
+    RESPIRATORY_DISEASE: ["asthma", "kol", "copd", "respiratory"],
+    CANCER: ["cancer"],
+})
+
+CONSCIOUSNESS_LEXICON = Lexicon({
+    UNRESPONSIVE: ["unresponsive", "coma"],
+    ALTERED_CONSCIOUSNESS: ["confused", "unresponsive"],
+})
+
+DURATION_LEXICON = Lexicon({
+    RECENT_ONSET: ["hour", "day"],
+})
@@ -0,0 +1,327 @@
+"""
+Vectorized batch triage engine.
+
+Scores many assessments at once from columnar NumPy arrays. The compiled
+rule table (app.services.triage_rules) is evaluated with boolean masks in the
+same order as the scalar engine, so results match analyze_health exactly.
+"""
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from app.services.triage_features import (
+    DATA_QUALITY_WEIGHTS,
+    extract_features,
+    CHEST_RADIATION,
+    CHEST_SHORTNESS_BREATH,
+    CHEST_NAUSEA,
+    LEG_REDNESS,
+    LEG_WARMTH,
+    LEG_RECENT_ONSET,
+    HEAD_DIZZINESS,
+    HEAD_VOMITING,
+    HEAD_LOSS_CONSCIOUSNESS,
+    PRESENT_SYMPTOM,
+    PRESENT_TEMPERATURE,
+    PRESENT_HEART_RATE,
+    PRESENT_SPO2,
+    PRESENT_BLOOD_PRESSURE,
+    PRESENT_RESPIRATORY_RATE,
+    PRESENT_DURATION,
+    TRAUMA_NONE,
+)
+from app.services.triage_logic import (
+    LOW_CONFIDENCE_SAFETY_NOTE,
+    generate_explanation_tags,
+    triage_level_info,
+)
+from app.services.triage_rules import TRIAGE_LEVELS, RuleSet, current_rules
+
+SELF_CARE, PRIMARY_CARE, SEMI_EMERGENCY, EMERGENCY = range(4)
+
+# Input columns and their defaults. Numeric vitals use NaN for "not provided";
+# yes/no answers and flags are booleans; keyword matches are lexicon bitmasks.
+FLOAT_COLUMNS = (
+    "heart_rate", "spo2", "temperature", "systolic", "diastolic", "respiratory_rate", "pain_level",
+    # Age in years; selects the age band of vital norms
+    "age",
+)
+BOOL_COLUMNS = (
+    "has_temperature", "has_heart_rate", "has_spo2", "has_blood_pressure",
+    "has_respiratory_rate", "has_duration", "has_symptom",
+    "chest_radiation", "chest_shortness_breath", "chest_nausea",
+    "leg_redness", "leg_warmth", "leg_recent_onset",
+    "head_dizziness", "head_vomiting", "head_loss_consciousness",
+    "adaptive_answered", "medical_history_provided",
+    "has_medication_list", "has_conditions",
+    "is_pregnant", "third_trimester", "is_trauma_related",
+)
+INT_COLUMNS = (
+    "symptom_hits", "loc_hits", "medication_hits", "condition_hits", "trauma_type",
+)
+
+# Boolean columns unpacked from the feature bitmasks
+_PRESENCE_COLUMNS = (
+    ("has_temperature", PRESENT_TEMPERATURE), ("has_heart_rate", PRESENT_HEART_RATE),
+    ("has_spo2", PRESENT_SPO2), ("has_blood_pressure", PRESENT_BLOOD_PRESSURE),
+    ("has_respiratory_rate", PRESENT_RESPIRATORY_RATE), ("has_duration", PRESENT_DURATION),
+    ("has_symptom", PRESENT_SYMPTOM),
+)
+_ANSWER_COLUMNS = (
+    ("chest_radiation", CHEST_RADIATION), ("chest_shortness_breath", CHEST_SHORTNESS_BREATH),
+    ("chest_nausea", CHEST_NAUSEA), ("leg_redness", LEG_REDNESS), ("leg_warmth", LEG_WARMTH),
+    ("leg_recent_onset", LEG_RECENT_ONSET), ("head_dizziness", HEAD_DIZZINESS),
+    ("head_vomiting", HEAD_VOMITING), ("head_loss_consciousness", HEAD_LOSS_CONSCIOUSNESS),
+)
+
+
+def _nan(value: Optional[float]) -> float:
+    return np.nan if value is None else float(value)
+
+
+def columns_from_records(records: Iterable[Any]) -> Dict[str, np.ndarray]:
+    """
+    Convert HealthData-like objects (or their TriageFeatures) into the
+    columnar arrays used by analyze_health_batch. Each record is parsed once.
+    """
+    rows: Dict[str, list] = {name: [] for name in FLOAT_COLUMNS + BOOL_COLUMNS + INT_COLUMNS}
+    append = {name: rows[name].append for name in rows}
+
+    for f in map(extract_features, records):
+        answers, present = f.answers, f.present
+
+        append["heart_rate"](_nan(f.heart_rate))
+        append["spo2"](_nan(f.spo2))
+        append["temperature"](_nan(f.temperature))
+        append["systolic"](_nan(f.systolic))
+        append["diastolic"](_nan(f.diastolic))
+        append["respiratory_rate"](_nan(f.respiratory_rate))
+        append["pain_level"](_nan(f.pain_level))
+        append["age"](_nan(f.age))
+
+        for name, bit in _PRESENCE_COLUMNS:
+            append[name](bool(present & bit))
+        for name, bit in _ANSWER_COLUMNS:
+            append[name](bool(answers & bit))
+        append["adaptive_answered"](f.adaptive_answered)
+        append["medical_history_provided"](f.medical_history_provided)
+        append["has_medication_list"](f.has_medication_list)
+        append["has_conditions"](f.has_conditions)
+        append["is_pregnant"](f.is_pregnant)
+        append["third_trimester"](f.third_trimester)
+        append["is_trauma_related"](f.is_trauma_related)
+
+        append["symptom_hits"](f.symptom_hits)
+        append["loc_hits"](f.loc_hits)
+        append["medication_hits"](f.medication_hits)
+        append["condition_hits"](f.condition_hits)
+        append["trauma_type"](f.trauma_type)
+
+    columns: Dict[str, np.ndarray] = {}
+    for name in FLOAT_COLUMNS:
+        columns[name] = np.asarray(rows[name], dtype=np.float64)
+    for name in BOOL_COLUMNS:
+        columns[name] = np.asarray(rows[name], dtype=bool)
+    for name in INT_COLUMNS:
+        columns[name] = np.asarray(rows[name], dtype=np.int64)
+    return columns
+
+
+class BatchResult:
+    """Columnar triage results produced by analyze_health_batch."""
+
+    def __init__(self, **arrays: np.ndarray):
+        self.level: np.ndarray = arrays["level"]
+        self.risk_score: np.ndarray = arrays["risk_score"]
+        self.confidence: np.ndarray = arrays["confidence"]
+        self.data_quality: np.ndarray = arrays["data_quality"]
+        self.low_confidence_warning: np.ndarray = arrays["low_confidence_warning"]
+        self.low_confidence_fallback: np.ndarray = arrays["low_confidence_fallback"]
+        self.emergency_override: np.ndarray = arrays["emergency_override"]
+        self.factors: np.ndarray = arrays["factors"]
+        self.vital_risk: np.ndarray = arrays["vital_risk"]
+        self.scenario_risk: Dict[str, np.ndarray] = arrays["scenario_risk"]
+        self.temperature: np.ndarray = arrays["temperature"]
+        self.heart_rate: np.ndarray = arrays["heart_rate"]
+        self.spo2: np.ndarray = arrays["spo2"]
+        # The rule set the batch was scored with (factor names, overrides)
+        self.rules: RuleSet = arrays["rules"]
+
+    def __len__(self) -> int:
+        return len(self.level)
+
+    def key_factors(self, index: int) -> List[str]:
+        """Key factors for one row, in the same order as analyze_health."""
+        override = int(self.emergency_override[index])
+        if override >= 0:
+            return list(self.rules.overrides[override].key_factors)
+        factors = self.rules.factors
+        return [factors[column] for column in np.flatnonzero(self.factors[index])]
+
+    def factor_ids(self, index: int) -> Tuple[int, ...]:
+        """Rule table ids of the key factors for one row (see TriageOutcome.factor_ids)."""
+        override = int(self.emergency_override[index])
+        if override >= 0:
+            return self.rules.overrides[override].key_factor_ids
+        factor_ids = self.rules.factor_ids
+        return tuple(factor_ids[column] for column in np.flatnonzero(self.factors[index]))
+
+    def to_result(self, index: int) -> Dict[str, Any]:
+        """Expand one row into the same dict analyze_health returns."""
+        key_factors = self.key_factors(index)
+        triage_info = triage_level_info(TRIAGE_LEVELS[int(self.level[index])])
+        confidence = float(self.confidence[index])
+        data_quality = float(self.data_quality[index])
+
+        if int(self.emergency_override[index]) >= 0:
+            return {
+                **triage_info,
+                "confidence": confidence,
+                "key_factors": key_factors,
+                "explanation_tags": [
+                    {"factor": f, "weight": 0.3, "category": "emergency", "impact": "increased_risk"}
+                    for f in key_factors
+                ],
+                "data_quality": data_quality,
+                "low_confidence_warning": confidence < 0.7,
+                "ai_enabled": False,
+            }
+
+        if self.low_confidence_fallback[index]:
+            triage_info["safety_note"] = LOW_CONFIDENCE_SAFETY_NOTE
+
+        vital_risk = float(self.vital_risk[index])
+        temperature = float(self.temperature[index])
+        heart_rate = float(self.heart_rate[index])
+        spo2 = float(self.spo2[index])
+        has_temperature = not np.isnan(temperature)
+        has_heart_rate = not np.isnan(heart_rate)
+        has_spo2 = not np.isnan(spo2)
+        vital_assessments = {
+            "temperature": {"abnormal": "Abnormal temperature" in key_factors, "description": "Abnormal temperature", "risk_contribution": vital_risk * 0.2 if has_temperature else 0},
+            "heart_rate": {"abnormal": "Abnormal heart rate" in key_factors, "description": "Abnormal heart rate", "risk_contribution": vital_risk * 0.2 if has_heart_rate else 0},
+            "spo2": {"abnormal": has_spo2 and spo2 < 95, "description": "Low oxygen saturation", "risk_contribution": vital_risk * 0.3 if has_spo2 else 0},
+        }
+        scenario_assessments = {
+            "chest_pain": {"risk_contribution": float(self.scenario_risk["chest_pain"][index]), "description": "Chest pain assessment"},
+            "dvt": {"risk_contribution": float(self.scenario_risk["dvt"][index]), "description": "DVT risk assessment"},
+            "sob": {"risk_contribution": float(self.scenario_risk["sob"][index]), "description": "Respiratory assessment"},
+            "head_injury": {"risk_contribution": float(self.scenario_risk["head_injury"][index]), "description": "Head injury assessment"},
+        }
+        explanation_tags = generate_explanation_tags(
+            float(self.risk_score[index]), key_factors, vital_assessments, scenario_assessments
+        )
+
+        return {
+            **triage_info,
+            "confidence": round(confidence, 2),
+            "key_factors": key_factors,
+            "explanation_tags": explanation_tags,
+            "data_quality": round(data_quality, 2),
+            "low_confidence_warning": bool(self.low_confidence_warning[index]),
+            "ai_enabled": False,
+        }
+
+    def to_results(self) -> List[Dict[str, Any]]:
+        """Expand every row into analyze_health-style dicts."""
+        return [self.to_result(index) for index in range(len(self))]
+
+
+def _column(columns: Mapping[str, np.ndarray], name: str, n: int, dtype) -> np.ndarray:
+    if name in columns:
+        return np.asarray(columns[name], dtype=dtype)
+    if dtype is np.float64:
+        return np.full(n, np.nan)
+    if name == "trauma_type":
+        return np.full(n, TRAUMA_NONE, dtype=np.int64)
+    return np.zeros(n, dtype=dtype)
+
+
+def analyze_health_batch(columns: Mapping[str, np.ndarray], rules: Optional[RuleSet] = None) -> BatchResult:
+    """
+    Score a batch of assessments given as columnar arrays.
+
+    Missing columns default to "not provided". Use columns_from_records to
+    build the arrays from HealthData objects. rules defaults to the active
+    rule set.
+    """
+    rules = rules or current_rules()
+    n = len(next(iter(columns.values()))) if columns else 0
+    c = {name: _column(columns, name, n, np.float64) for name in FLOAT_COLUMNS}
+    c.update({name: _column(columns, name, n, bool) for name in BOOL_COLUMNS})
+    c.update({name: _column(columns, name, n, np.int64) for name in INT_COLUMNS})
+    # The rules read yes/no answers as one bitmask, like TriageFeatures.answers
+    answers = np.zeros(n, dtype=np.int64)
+    for name, bit in _ANSWER_COLUMNS:
+        answers |= np.where(c[name], bit, 0)
+    c["answers"] = answers
+
+    # 1-2. Emergency overrides (first match wins), then the scenario, vital
+    #      sign and medical history rules
+    emergency_override, group_risks, factors = rules.evaluate_batch(c, n)
+    is_emergency = emergency_override >= 0
+    vital_risk, chest_risk, dvt_risk, breath_risk, head_risk, _ = group_risks
+
+    # 3. Combined risk (same summation order as analyze_health)
+    zeros = np.zeros(n)
+    risk_score = zeros
+    for group_risk in group_risks:
+        risk_score = risk_score + group_risk
+    risk_score = np.maximum(0.0, np.minimum(1.0, risk_score))
+
+    # 4. Data quality (same accumulation order as calculate_data_quality)
+    data_quality = zeros.copy()
+    for field, _, weight in DATA_QUALITY_WEIGHTS:
+        data_quality = data_quality + np.where(c[f"has_{field}"], weight, 0.0)
+    data_quality = np.minimum(1.0, data_quality)
+
+    # 5. Confidence
+    factor_count = factors.sum(axis=1)
+    emergency_factor_count = np.array([len(override.key_factors) for override in rules.overrides] or [0])
+    factor_count = np.where(is_emergency, emergency_factor_count[np.maximum(emergency_override, 0)], factor_count)
+    risk_for_confidence = np.where(is_emergency, 0.9, risk_score)
+    answered = ~is_emergency & (c["adaptive_answered"] | c["medical_history_provided"])
+
+    confidence = np.full(n, 0.5)
+    confidence = confidence + data_quality * 0.3
+    confidence = confidence + np.minimum(factor_count / 5.0, 1.0) * 0.15
+    confidence = confidence + np.where(answered, 0.05, 0.0)
+    certainty = np.where(
+        (risk_for_confidence < 0.2) | (risk_for_confidence > 0.8), 0.1,
+        np.where((risk_for_confidence < 0.3) | (risk_for_confidence > 0.7), 0.05, 0.0),
+    )
+    confidence = confidence + certainty
+    confidence = np.maximum(0.5, np.minimum(0.95, confidence))
+
+    # 6. Triage level
+    indicator = np.zeros(n, dtype=bool)
+    for index in rules.emergency_factor_indexes:
+        indicator |= factors[:, index]
+    level = np.select(
+        [indicator] + [risk_score < below for below, _ in rules.levels],
+        [EMERGENCY] + [TRIAGE_LEVELS.index(name) for _, name in rules.levels],
+        default=TRIAGE_LEVELS.index(rules.default_level),
+    ).astype(np.int8)
+
+    # 7. Low confidence fallback
+    low_confidence = confidence < 0.7
+    fallback = ~is_emergency & low_confidence & (level == SELF_CARE)
+    level[fallback] = PRIMARY_CARE
+    level[is_emergency] = EMERGENCY
+
+    return BatchResult(
+        level=level,
+        risk_score=np.where(is_emergency, 0.9, risk_score),
+        confidence=confidence,
+        data_quality=data_quality,
+        low_confidence_warning=low_confidence,
+        low_confidence_fallback=fallback,
+        emergency_override=emergency_override,
+        factors=factors,
+        vital_risk=vital_risk,
+        scenario_risk={"chest_pain": chest_risk, "dvt": dvt_risk, "sob": breath_risk, "head_injury": head_risk},
+        temperature=c["temperature"],
+        heart_rate=c["heart_rate"],
+        spo2=c["spo2"],
+        rules=rules,
+    )
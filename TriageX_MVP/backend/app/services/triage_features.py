@@ -0,0 +1,198 @@
+"""
+Normalized triage features.
+
+A HealthData request is reduced once to a compact TriageFeatures record:
+vitals as numbers, yes/no answers and presence flags as bitmasks, and free
+text as lexicon bitmasks. The scalar assessors, the cache key and the batch
+engine all read this record instead of re-parsing the request.
+"""
+import math
+import re
+from typing import Any, Optional
+
+from app.services.symptom_lexicon import (
+    SYMPTOM_LEXICON,
+    MEDICATION_LEXICON,
+    CONDITION_LEXICON,
+    CONSCIOUSNESS_LEXICON,
+    DURATION_LEXICON,
+    RECENT_ONSET,
+)
+
+# Yes/no answer bits
+CHEST_RADIATION = 1 << 0
+CHEST_SHORTNESS_BREATH = 1 << 1
+CHEST_NAUSEA = 1 << 2
+LEG_REDNESS = 1 << 3
+LEG_WARMTH = 1 << 4
+HEAD_DIZZINESS = 1 << 5
+HEAD_VOMITING = 1 << 6
+HEAD_LOSS_CONSCIOUSNESS = 1 << 7
+# Not a yes/no answer, but read alongside them
+LEG_RECENT_ONSET = 1 << 8
+
+_ANSWER_FIELDS = (
+    ("chest_radiation", CHEST_RADIATION),
+    ("chest_shortness_breath", CHEST_SHORTNESS_BREATH),
+    ("chest_nausea", CHEST_NAUSEA),
+    ("leg_redness", LEG_REDNESS),
+    ("leg_warmth", LEG_WARMTH),
+    ("head_dizziness", HEAD_DIZZINESS),
+    ("head_vomiting", HEAD_VOMITING),
+    ("head_loss_consciousness", HEAD_LOSS_CONSCIOUSNESS),
+)
+_ADAPTIVE_FIELDS = (
+    "leg_redness", "leg_warmth", "leg_duration",
+    "head_dizziness", "head_vomiting", "head_loss_consciousness",
+    "chest_radiation", "chest_shortness_breath", "chest_nausea",
+)
+_YES = frozenset(("yes", "y"))
+
+# Presence bits for the data quality score, with their weights
+PRESENT_SYMPTOM = 1 << 0
+PRESENT_TEMPERATURE = 1 << 1
+PRESENT_HEART_RATE = 1 << 2
+PRESENT_SPO2 = 1 << 3
+PRESENT_BLOOD_PRESSURE = 1 << 4
+PRESENT_RESPIRATORY_RATE = 1 << 5
+PRESENT_DURATION = 1 << 6
+
+DATA_QUALITY_WEIGHTS = (
+    ("symptom", PRESENT_SYMPTOM, 0.3),  # 30% weight - most important
+    ("temperature", PRESENT_TEMPERATURE, 0.15),
+    ("heart_rate", PRESENT_HEART_RATE, 0.15),
+    ("spo2", PRESENT_SPO2, 0.15),
+    ("blood_pressure", PRESENT_BLOOD_PRESSURE, 0.1),
+    ("respiratory_rate", PRESENT_RESPIRATORY_RATE, 0.1),
+    ("duration", PRESENT_DURATION, 0.05),
+)
+
+# Trauma type codes
+TRAUMA_NONE, TRAUMA_OTHER, TRAUMA_HEAD, TRAUMA_CHEST, TRAUMA_ABDOMEN, TRAUMA_BACK = -1, 0, 1, 2, 3, 4
+TRAUMA_CODES = {"head": TRAUMA_HEAD, "chest": TRAUMA_CHEST, "abdomen": TRAUMA_ABDOMEN, "back": TRAUMA_BACK}
+
+
+# Age units, as the number of that unit in a year
+_AGE_PATTERN = re.compile(r"\s*(\d+(?:\.\d+)?)\s*([a-z]*)\s*")
+_AGE_UNITS = {
+    "": 1.0, "y": 1.0, "yr": 1.0, "yrs": 1.0, "year": 1.0, "years": 1.0,
+    "m": 12.0, "mo": 12.0, "mos": 12.0, "month": 12.0, "months": 12.0,
+    "w": 52.18, "wk": 52.18, "wks": 52.18, "week": 52.18, "weeks": 52.18,
+    "d": 365.25, "day": 365.25, "days": 365.25,
+}
+# The intake form collects whole years, so a bare "0" only says "under a
+# year". It is read as an infant: neonate norms need the age in days, weeks
+# or months.
+_UNDER_ONE_YEAR = 0.5
+
+
+def _parse_age(value: Any) -> Optional[float]:
+    """Age in years from "33", "6 months", "10 days" etc.; None when unreadable."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number, unit = float(value), ""
+    else:
+        match = _AGE_PATTERN.fullmatch(str(value).lower())
+        if match is None or match.group(2) not in _AGE_UNITS:
+            return None
+        number, unit = float(match.group(1)), match.group(2)
+    if not 0 <= number < math.inf:
+        return None
+    if number == 0 and _AGE_UNITS[unit] == 1.0:
+        return _UNDER_ONE_YEAR
+    return number / _AGE_UNITS[unit]
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+class TriageFeatures:
+    """Everything the triage rules read from one request, parsed once."""
+
+    __slots__ = (
+        # Vitals; None when not provided
+        "temperature", "heart_rate", "spo2", "respiratory_rate", "pain_level",
+        "systolic", "diastolic",
+        # Age in years (selects the age band of vital norms); None when unknown
+        "age",
+        # Bitmasks
+        "answers", "present",
+        "symptom_hits", "loc_hits", "medication_hits", "condition_hits",
+        # Medical history
+        "adaptive_answered", "medical_history_provided",
+        "has_medication_list", "has_conditions",
+        "is_pregnant", "third_trimester", "is_trauma_related", "trauma_type",
+    )
+
+    def __init__(self, data):
+        # Falsy vitals count as "not provided", as in the original rules
+        self.temperature = data.temperature or None
+        self.heart_rate = data.heart_rate or None
+        self.spo2 = data.spo2 or None
+        self.respiratory_rate = _parse_int(data.respiratory_rate)
+        self.pain_level = _parse_int(data.pain_level)
+        self.age = _parse_age(data.age)
+
+        self.systolic = self.diastolic = None
+        blood_pressure = data.blood_pressure
+        if blood_pressure:
+            parts = blood_pressure.split('/')
+            if len(parts) == 2:
+                try:
+                    self.systolic, self.diastolic = int(parts[0]), int(parts[1])
+                except ValueError:
+                    pass
+
+        answers = 0
+        for field, bit in _ANSWER_FIELDS:
+            value = getattr(data, field)
+            if value and value.lower() in _YES:
+                answers |= bit
+        if DURATION_LEXICON.match(data.leg_duration) & RECENT_ONSET:
+            answers |= LEG_RECENT_ONSET
+        self.answers = answers
+
+        present = 0
+        for field, bit, _ in DATA_QUALITY_WEIGHTS:
+            value = getattr(data, field, None)
+            if value is not None and value != "":
+                present |= bit
+        self.present = present
+
+        medications = data.medications if isinstance(data.medications, list) else None
+        conditions = data.medical_conditions
+        self.symptom_hits = SYMPTOM_LEXICON.match(data.symptom)
+        self.loc_hits = CONSCIOUSNESS_LEXICON.match(data.level_of_consciousness)
+        self.medication_hits = MEDICATION_LEXICON.match_any(medications)
+        self.condition_hits = CONDITION_LEXICON.match_any(conditions)
+
+        self.adaptive_answered = any(getattr(data, field) for field in _ADAPTIVE_FIELDS)
+        self.medical_history_provided = bool(
+            data.has_medical_conditions or data.has_medications
+            or data.is_pregnant or data.is_trauma_related
+        )
+        self.has_medication_list = bool(medications)
+        self.has_conditions = data.has_medical_conditions is True and bool(conditions)
+        self.is_pregnant = data.is_pregnant is True
+        self.third_trimester = data.pregnancy_trimester == "third"
+        self.is_trauma_related = data.is_trauma_related is True
+        trauma_type = getattr(data, "trauma_type", None)
+        self.trauma_type = TRAUMA_CODES.get(trauma_type.lower(), TRAUMA_OTHER) if trauma_type else TRAUMA_NONE
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"TriageFeatures({fields})"
+
+
+def extract_features(data: Any) -> TriageFeatures:
+    """Return the feature record for a HealthData-like object (or pass one through)."""
+    if isinstance(data, TriageFeatures):
+        return data
+    return TriageFeatures(data)
@@ -0,0 +1,950 @@
+"""
+Declarative triage rules.
+
+Weights, thresholds and emergency overrides live in a JSON table
+(triage_rules.json) instead of nested if chains. At load time every
+condition is compiled into two closures, a predicate over one feature record
+for the scalar engine and a vectorized predicate over feature columns for
+the batch engine, and the rules are flattened into a program both engines
+walk. The loaded RuleSet is immutable; RuleStore compiles a changed file in
+the background and swaps the new one in.
+
+Vitals are scored through lookup tables built at compile time. For each
+vital, a table indexed by value (temperature in 0.1 °C steps) holds the
+outcome of every comparison the rules make on it as a bitmask, and for
+runs of top-level rules that only test that vital (the vital sign rules)
+also the risk contribution and factor id. The scalar and batch engines
+read the same tables; values outside a table or off its grid fall back to
+direct comparisons.
+
+Normal ranges depend on age: a vital threshold may name a norm ("$hr_high")
+from the table's "norms", and each of the "age_bands" (neonate to elderly)
+overrides some of them. The rules are compiled once per distinct set of
+norms and a request is scored by the band its age falls in.
+
+Every factor has a stable small id in the table's "factor_ids" registry.
+Results carry these ids and are expanded to names only at the API boundary,
+so ids are never reused once assessments have been logged with them.
+
+Condition grammar (a rule's "when" list is ANDed):
+    [fact, op, arg] | {"any": [cond, ...]} | {"not": cond}
+Number facts take < <= > >= == != with a number or "$norm" (a missing vital
+never matches), bit facts take "has" with a list of lexicon names, flags
+take "is" true/false and trauma_type takes == / != with a trauma name.
+"""
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import math
+import operator
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from app.core.config import settings
+from app.services import symptom_lexicon, triage_features
+from app.services.triage_features import TRAUMA_CODES, TRAUMA_NONE, TRAUMA_OTHER
+
+logger = logging.getLogger(__name__)
+
+# Factor ids are stored in a SMALLINT[] column (add_factor_ids_column.sql)
+MAX_FACTOR_ID = 32767
+
+# Rule groups, in the order their risks are summed
+GROUPS = ("vital_signs", "chest_pain", "dvt", "sob", "head_injury", "medical_history")
+TRIAGE_LEVELS = ("self_care", "primary_care", "semi_emergency", "emergency")
+
+NUMBER_FACTS = ("temperature", "heart_rate", "spo2", "respiratory_rate", "pain_level", "systolic", "diastolic")
+FLAG_FACTS = ("is_pregnant", "third_trimester", "is_trauma_related", "has_medication_list", "has_conditions")
+
+# Lookup table domain per vital: (lowest, highest, steps per unit). Heart
+# rate, SpO2 and temperature follow the HealthData bounds.
+VITAL_DOMAINS: Dict[str, Tuple[float, float, int]] = {
+    "temperature": (35.0, 45.0, 10),
+    "heart_rate": (30, 220, 1),
+    "spo2": (70, 100, 1),
+    "respiratory_rate": (0, 80, 1),
+    "pain_level": (0, 10, 1),
+    "systolic": (50, 260, 1),
+    "diastolic": (30, 160, 1),
+}
+
+
+def _bit_names(module: Any, names: Tuple[str, ...]) -> Dict[str, int]:
+    return {name.lower(): getattr(module, name) for name in names}
+
+
+# Names accepted by "has", per bitmask fact
+BIT_FACTS: Dict[str, Dict[str, int]] = {
+    "symptom_hits": _bit_names(symptom_lexicon, (
+        "CHEST_PAIN", "CHEST", "SHORTNESS_OF_BREATH", "DVT", "HEAD_INJURY",
+        "BLEEDING", "CARDIORESPIRATORY", "BREATHING_DIFFICULTY",
+    )),
+    "medication_hits": _bit_names(symptom_lexicon, ("BLOOD_THINNER", "PAIN_MEDICATION")),
+    "condition_hits": _bit_names(symptom_lexicon, ("HEART_DISEASE", "DIABETES", "RESPIRATORY_DISEASE", "CANCER")),
+    "loc_hits": _bit_names(symptom_lexicon, ("UNRESPONSIVE", "ALTERED_CONSCIOUSNESS")),
+    "answers": _bit_names(triage_features, (
+        "CHEST_RADIATION", "CHEST_SHORTNESS_BREATH", "CHEST_NAUSEA", "LEG_REDNESS", "LEG_WARMTH",
+        "HEAD_DIZZINESS", "HEAD_VOMITING", "HEAD_LOSS_CONSCIOUSNESS", "LEG_RECENT_ONSET",
+    )),
+}
+TRAUMA_NAMES = {"none": TRAUMA_NONE, "other": TRAUMA_OTHER, **TRAUMA_CODES}
+
+_COMPARISONS = {
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "==": operator.eq, "!=": operator.ne,
+}
+
+# The scalar engine reads every fact of a record into one list, with vitals
+# replaced by their outcome bitmasks; FACT_SLOTS gives each fact's position
+FACTS = tuple(BIT_FACTS) + FLAG_FACTS + ("trauma_type",) + NUMBER_FACTS
+FACT_SLOTS: Dict[str, int] = {fact: slot for slot, fact in enumerate(FACTS)}
+_read_facts = operator.attrgetter(*FACTS)
+
+# (fact values by FACT_SLOTS) -> matched
+ScalarPredicate = Callable[[List[Any]], bool]
+VectorPredicate = Callable[[Dict[str, np.ndarray]], np.ndarray]
+
+
+class Override(NamedTuple):
+    """An emergency override: the first one that matches decides the result."""
+    reason: str
+    confidence: float
+    message: str
+    key_factors: Tuple[str, ...]
+    key_factor_ids: Tuple[int, ...]
+    predicate: ScalarPredicate
+    vector: VectorPredicate
+
+
+class Rule(NamedTuple):
+    """One step of the flat program evaluated by evaluate and evaluate_batch."""
+    predicate: ScalarPredicate
+    vector: VectorPredicate
+    # Canonical text of the condition; equal conditions share one mask per batch
+    key: str
+    group: int
+    factor: int
+    weight: float
+    # Nesting depth; a rule only applies where its ancestors matched
+    depth: int
+    # Vitals the condition reads, and whether the rule has nested rules
+    facts: FrozenSet[str]
+    has_children: bool
+
+
+class VitalRun(NamedTuple):
+    """Consecutive top-level rules on one vital, scored by its lookup table."""
+    fact: str
+    group: int
+    factors: Tuple[int, ...]
+
+
+class VitalTable:
+    """
+    Precomputed scoring of one vital over its domain.
+
+    comparisons lists the distinct (op, threshold) pairs the rules apply to
+    the vital; bit i of an outcome is comparisons[i]. Tables have one slot
+    per grid value plus a final slot for "not provided".
+    """
+
+    def __init__(self, fact: str, comparisons: List[Tuple[str, float]]):
+        lowest, highest, scale = VITAL_DOMAINS[fact]
+        self.fact = fact
+        self.scale = scale
+        self.first = round(lowest * scale)
+        self.last = round(highest * scale)
+        self.comparisons: Tuple[Tuple[str, float], ...] = tuple(comparisons)
+        self.values = [k if scale == 1 else k / scale for k in range(self.first, self.last + 1)]
+        self.outcomes: Tuple[int, ...] = tuple(self.outcome(value) for value in self.values) + (0,)
+        # Filled in by score_run when rules are scored from this table
+        self.run: Optional[VitalRun] = None
+        self.by_outcome: Dict[int, Tuple[float, int]] = {}
+        self.scores: Tuple[Tuple[int, float, int], ...] = ()
+        self._arrays = None
+
+    def outcome(self, value: float) -> int:
+        bits = 0
+        for bit, (op, arg) in enumerate(self.comparisons):
+            if _COMPARISONS[op](value, arg):
+                bits |= 1 << bit
+        return bits
+
+    def reachable_outcomes(self) -> List[int]:
+        """Every outcome any real value (or a missing one) can produce."""
+        points = sorted({arg for _, arg in self.comparisons})
+        probes = [points[0] - 1, points[-1] + 1] + points
+        probes += [(a + b) / 2 for a, b in zip(points, points[1:])]
+        return sorted({0} | {self.outcome(value) for value in probes})
+
+    def lookup(self, value: Optional[float]) -> int:
+        """Outcome bitmask of one value: read from the table on its grid, compared directly off it."""
+        if value is None:
+            return self.outcomes[-1]
+        if self.scale == 1:
+            k = int(value)
+            if self.first <= k <= self.last and k == value:
+                return self.outcomes[k - self.first]
+        else:
+            k = round(value * self.scale)
+            if self.first <= k <= self.last and k / self.scale == value:
+                return self.outcomes[k - self.first]
+        return self.outcome(value)
+
+    def score_run(self, run: VitalRun, rules: List[Rule]) -> bool:
+        """
+        Precompute (weight, factor) for a run of rules. Only possible when at
+        most one rule of the run can match any value; returns False otherwise.
+        """
+        by_outcome = {}
+        # The run's rules only read this vital
+        facts = [0] * len(FACTS)
+        for bits in self.reachable_outcomes():
+            facts[FACT_SLOTS[self.fact]] = bits
+            matched = [rule for rule in rules if rule.predicate(facts)]
+            if len(matched) > 1:
+                return False
+            by_outcome[bits] = (matched[0].weight, matched[0].factor) if matched else (0.0, -1)
+        self.run = run
+        self.by_outcome = by_outcome
+        self.scores = tuple((bits,) + by_outcome[bits] for bits in self.outcomes)
+        return True
+
+    def arrays(self) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+        """The tables as NumPy arrays for the batch engine: outcomes, weights, factors."""
+        if self._arrays is None:
+            outcomes = np.array(self.outcomes, dtype=np.min_scalar_type(max(self.outcomes)))
+            if self.run is None:
+                self._arrays = (outcomes, None, None)
+            else:
+                self._arrays = (
+                    outcomes,
+                    np.array([weight for _, weight, _ in self.scores], dtype=np.float64),
+                    np.array([factor for _, _, factor in self.scores], dtype=np.int16),
+                )
+        return self._arrays
+
+    def lookup_batch(self, values: np.ndarray):
+        """Table index per row (missing and off-grid rows get the last slot) and the off-grid mask."""
+        if self.scale == 1:
+            k = values
+            on_grid = (values >= self.first) & (values <= self.last) & (values == np.floor(values))
+        else:
+            k = np.rint(values * self.scale)
+            on_grid = (k >= self.first) & (k <= self.last) & (k / self.scale == values)
+        index = np.where(on_grid, k - self.first, len(self.outcomes) - 1).astype(np.intp)
+        return index, ~on_grid & ~np.isnan(values)
+
+    def outcome_batch(self, values: np.ndarray) -> np.ndarray:
+        bits = np.zeros(len(values), dtype=self.arrays()[0].dtype)
+        for bit, (op, arg) in enumerate(self.comparisons):
+            bits[_COMPARISONS[op](values, arg)] |= 1 << bit
+        return bits
+
+
+class _Compiler:
+    """
+    Turns JSON conditions into a scalar predicate, a vectorized predicate and
+    a canonical text key. Vital comparisons become tests on the vital's
+    outcome bitmask.
+    """
+
+    def __init__(self, norms: Dict[str, float]):
+        self.norms = norms
+        # Distinct comparisons per vital, in order of first use (= bit order)
+        self.comparisons: Dict[str, Dict[Tuple[str, float], int]] = {fact: {} for fact in NUMBER_FACTS}
+        self.facts: set = set()
+
+    def condition(self, cond: Any, where: str) -> Tuple[str, ScalarPredicate, VectorPredicate]:
+        if isinstance(cond, dict):
+            if set(cond) == {"any"} and isinstance(cond["any"], list) and cond["any"]:
+                parts = [self.condition(c, f"{where}.any[{i}]") for i, c in enumerate(cond["any"])]
+                return (
+                    "(" + " or ".join(k for k, _, _ in parts) + ")",
+                    _scalar_any([p for _, p, _ in parts]),
+                    _vector_any([v for _, _, v in parts]),
+                )
+            if set(cond) == {"not"}:
+                key, predicate, vector = self.condition(cond["not"], f"{where}.not")
+                return f"(not {key})", (lambda b: not predicate(b)), (lambda c: ~vector(c))
+            raise ValueError(f"{where}: expected {{'any': [...]}} or {{'not': ...}}")
+        if not isinstance(cond, list) or len(cond) != 3:
+            raise ValueError(f"{where}: expected [fact, op, arg]")
+
+        fact, op, arg = cond
+        if fact in NUMBER_FACTS:
+            if op not in _COMPARISONS:
+                raise ValueError(f"{where}: {fact} needs one of {sorted(_COMPARISONS)}")
+            if isinstance(arg, str) and arg.startswith("$"):
+                if arg[1:] not in self.norms:
+                    raise ValueError(f"{where}: unknown norm {arg!r}")
+                arg = self.norms[arg[1:]]
+            arg = _number(arg, f"{where} threshold")
+            comparisons = self.comparisons[fact]
+            bit = 1 << comparisons.setdefault((op, arg), len(comparisons))
+            self.facts.add(fact)
+            column, slot = f"{fact}_bits", FACT_SLOTS[fact]
+            return (
+                f"({column} & {bit} != 0)",
+                (lambda b: b[slot] & bit != 0),
+                (lambda c: (c[column] & bit) != 0),
+            )
+        self.facts.add(fact)
+        slot = FACT_SLOTS.get(fact)
+        if fact in BIT_FACTS:
+            names = BIT_FACTS[fact]
+            if op != "has" or not isinstance(arg, list) or not arg:
+                raise ValueError(f"{where}: {fact} needs 'has' with a list of names")
+            unknown = [name for name in arg if name not in names]
+            if unknown:
+                raise ValueError(f"{where}: unknown {fact} names {unknown}")
+            mask = 0
+            for name in arg:
+                mask |= names[name]
+            return f"({fact} & {mask} != 0)", (lambda b: b[slot] & mask != 0), (lambda c: (c[fact] & mask) != 0)
+        if fact in FLAG_FACTS:
+            if op != "is" or not isinstance(arg, bool):
+                raise ValueError(f"{where}: {fact} needs 'is' with true or false")
+            if arg:
+                return fact, (lambda b: b[slot]), (lambda c: c[fact])
+            return f"(not {fact})", (lambda b: not b[slot]), (lambda c: ~c[fact])
+        if fact == "trauma_type":
+            if op not in ("==", "!=") or arg not in TRAUMA_NAMES:
+                raise ValueError(f"{where}: trauma_type needs == or != with one of {sorted(TRAUMA_NAMES)}")
+            code, compare = TRAUMA_NAMES[arg], _COMPARISONS[op]
+            return (
+                f"(trauma_type {op} {code})",
+                (lambda b: compare(b[slot], code)),
+                (lambda c: compare(c["trauma_type"], code)),
+            )
+        raise ValueError(f"{where}: unknown fact {fact!r}")
+
+    def when(self, conds: Any, where: str) -> Tuple[str, ScalarPredicate, VectorPredicate, FrozenSet[str]]:
+        if not isinstance(conds, list) or not conds:
+            raise ValueError(f"{where}: 'when' must be a non-empty list")
+        self.facts = set()
+        parts = [self.condition(c, f"{where}.when[{i}]") for i, c in enumerate(conds)]
+        return (
+            " and ".join(k for k, _, _ in parts),
+            _scalar_all([p for _, p, _ in parts]),
+            _vector_all([v for _, _, v in parts]),
+            frozenset(self.facts),
+        )
+
+
+def _scalar_all(predicates: List[ScalarPredicate]) -> ScalarPredicate:
+    if len(predicates) == 1:
+        return predicates[0]
+
+    def predicate(b):
+        for p in predicates:
+            if not p(b):
+                return False
+        return True
+    return predicate
+
+
+def _scalar_any(predicates: List[ScalarPredicate]) -> ScalarPredicate:
+    if len(predicates) == 1:
+        return predicates[0]
+
+    def predicate(b):
+        for p in predicates:
+            if p(b):
+                return True
+        return False
+    return predicate
+
+
+def _vector_all(vectors: List[VectorPredicate]) -> VectorPredicate:
+    if len(vectors) == 1:
+        return vectors[0]
+
+    def vector(c):
+        mask = vectors[0](c)
+        for v in vectors[1:]:
+            mask = mask & v(c)
+        return mask
+    return vector
+
+
+def _vector_any(vectors: List[VectorPredicate]) -> VectorPredicate:
+    if len(vectors) == 1:
+        return vectors[0]
+
+    def vector(c):
+        mask = vectors[0](c)
+        for v in vectors[1:]:
+            mask = mask | v(c)
+        return mask
+    return vector
+
+
+def _number(value: Any, where: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{where}: expected a finite number")
+    return value
+
+
+class AgeBand(NamedTuple):
+    """An age band of the rule table: the vital norms for ages below its bound."""
+    name: str
+    # Upper bound in years (exclusive); inf for the oldest band
+    below: float
+    norms: Dict[str, float]
+
+
+class BandRules:
+    """
+    The rule table compiled with one set of vital norms.
+
+    Both engines walk the same flat program: the scalar engine with the
+    depth up to which ancestors matched, the batch engine with one boolean
+    mask per nesting level. Both score vitals from the same VitalTables.
+    """
+
+    def __init__(self, table: Dict[str, Any], norms: Dict[str, float], index: int, factor_ids: Dict[str, int]):
+        compiler = _Compiler(norms)
+        self.norms = norms
+        # Position among the rule set's compiled bands (part of the cache key)
+        self.index = index
+
+        overrides = []
+        for i, override in enumerate(table.get("overrides", [])):
+            where = f"overrides[{i}]"
+            if not isinstance(override, dict):
+                raise ValueError(f"{where}: expected an object")
+            key_factors = override.get("key_factors")
+            if not isinstance(key_factors, list) or not all(isinstance(f, str) for f in key_factors):
+                raise ValueError(f"{where}: key_factors must be a list of strings")
+            _check_factor_ids(key_factors, factor_ids, f"{where}.key_factors")
+            _, predicate, vector, _ = compiler.when(override.get("when"), where)
+            overrides.append(Override(
+                reason=str(override.get("reason", where)),
+                confidence=float(_number(override.get("confidence", 0.9), f"{where}.confidence")),
+                message=str(override.get("message", "")),
+                key_factors=tuple(key_factors),
+                key_factor_ids=tuple(factor_ids[factor] for factor in key_factors),
+                predicate=predicate,
+                vector=vector,
+            ))
+        self.overrides: Tuple[Override, ...] = tuple(overrides)
+
+        factors: List[str] = []
+        factor_index: Dict[str, int] = {}
+        rules: List[Rule] = []
+
+        def add(rule: Any, where: str, group: Optional[str], depth: int) -> None:
+            if not isinstance(rule, dict):
+                raise ValueError(f"{where}: expected an object")
+            group = rule.get("group", group)
+            if group not in GROUPS:
+                raise ValueError(f"{where}: group must be one of {GROUPS}")
+            factor = rule.get("factor")
+            if not isinstance(factor, str) or not factor:
+                raise ValueError(f"{where}: missing factor")
+            if factor not in factor_index:
+                _check_factor_ids([factor], factor_ids, where)
+                factor_index[factor] = len(factors)
+                factors.append(factor)
+            weight = float(_number(rule.get("weight", 0.0), f"{where}.weight"))
+            key, predicate, vector, facts = compiler.when(rule.get("when"), where)
+            children = rule.get("rules", [])
+            rules.append(Rule(
+                predicate, vector, key, GROUPS.index(group), factor_index[factor], weight, depth, facts,
+                bool(children),
+            ))
+            for i, child in enumerate(children):
+                add(child, f"{where}.rules[{i}]", group, depth + 1)
+
+        for i, rule in enumerate(table.get("rules", [])):
+            add(rule, f"rules[{i}]", None, 0)
+        # Key factors are reported in the order they first appear in the table
+        self.factors: Tuple[str, ...] = tuple(factors)
+        self.factor_rank: Dict[str, int] = factor_index
+        self.factor_ids: Tuple[int, ...] = tuple(factor_ids[factor] for factor in factors)
+
+        self.vital_tables: Dict[str, VitalTable] = {
+            fact: VitalTable(fact, list(comparisons))
+            for fact, comparisons in compiler.comparisons.items() if comparisons
+        }
+        self.program: Tuple[Union[Rule, VitalRun], ...] = self._score_vital_runs(rules)
+        self._lookups = tuple((FACT_SLOTS[fact], table) for fact, table in self.vital_tables.items())
+        # The program as plain tuples for the scalar engine: (predicate, depth,
+        # group, weight, factor) per rule and (None, slot, group, by_outcome, -1)
+        # per vital run
+        self._steps = tuple(
+            (None, FACT_SLOTS[step.fact], step.group, self.vital_tables[step.fact].by_outcome, -1)
+            if isinstance(step, VitalRun)
+            else (step.predicate, step.depth, step.group, step.weight, step.factor)
+            for step in self.program
+        )
+
+    def _score_vital_runs(self, rules: List[Rule]) -> Tuple[Union[Rule, VitalRun], ...]:
+        """Replace each vital's first run of single-vital top-level rules by a table lookup."""
+        program: List[Union[Rule, VitalRun]] = []
+        i = 0
+        while i < len(rules):
+            rule = rules[i]
+            fact = next(iter(rule.facts)) if len(rule.facts) == 1 else None
+            table = self.vital_tables.get(fact)
+            if table is None or table.run is not None or rule.depth or rule.has_children:
+                program.append(rule)
+                i += 1
+                continue
+            end = i
+            while (
+                end < len(rules) and rules[end].facts == rule.facts and rules[end].group == rule.group
+                and not rules[end].depth and not rules[end].has_children
+            ):
+                end += 1
+            run_rules = rules[i:end]
+            run = VitalRun(fact, rule.group, tuple(dict.fromkeys(r.factor for r in run_rules)))
+            if table.score_run(run, run_rules):
+                program.append(run)
+            else:
+                program.extend(run_rules)
+            i = end
+        return tuple(program)
+
+    def read_facts(self, f) -> List[Any]:
+        """A feature record's facts by FACT_SLOTS, with each vital replaced by its outcome bitmask."""
+        facts = list(_read_facts(f))
+        for slot, table in self._lookups:
+            facts[slot] = table.lookup(facts[slot])
+        return facts
+
+    def match_override(self, f, facts: Optional[List[Any]] = None) -> int:
+        """Index of the first emergency override matching the record, or -1."""
+        if facts is None:
+            facts = self.read_facts(f)
+        for index, override in enumerate(self.overrides):
+            if override.predicate(facts):
+                return index
+        return -1
+
+    def evaluate(self, f) -> Tuple[int, Optional[List[float]], Optional[List[int]]]:
+        """Run the table on one feature record; see RuleSet.evaluate."""
+        facts = self.read_facts(f)
+        override = self.match_override(f, facts)
+        if override >= 0:
+            return override, None, None
+
+        risks = [0.0] * len(GROUPS)
+        hits: List[int] = []
+        # Rules nested deeper than this are skipped: one of their ancestors did not match
+        open_depth = 0
+        for predicate, depth, group, weight, factor in self._steps:
+            if predicate is None:
+                # Vital run: depth is the vital's slot and weight its scores by outcome
+                weight, factor = weight[facts[depth]]
+                if factor >= 0:
+                    risks[group] += weight
+                    hits.append(factor)
+            elif depth > open_depth:
+                continue
+            elif predicate(facts):
+                if weight:
+                    risks[group] += weight
+                hits.append(factor)
+                open_depth = depth + 1
+            else:
+                open_depth = depth
+        return -1, risks, hits
+
+    def quantize_vitals(self, f) -> Tuple[int, ...]:
+        """Outcome bitmask of each vital that has a table, used to quantize cache keys."""
+        facts = _read_facts(f)
+        return tuple(table.lookup(facts[slot]) for slot, table in self._lookups)
+
+    def evaluate_batch(
+        self, columns: Dict[str, np.ndarray], n: int
+    ) -> Tuple[np.ndarray, List[np.ndarray], np.ndarray]:
+        """Run the table on columnar features; see RuleSet.evaluate_batch."""
+        c = dict(columns)
+        scores: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for fact, table in self.vital_tables.items():
+            values = np.asarray(c[fact], dtype=np.float64)
+            outcomes, weights, factors_ = table.arrays()
+            index, off_grid = table.lookup_batch(values)
+            bits = outcomes[index]
+            any_off_grid = bool(off_grid.any())
+            if any_off_grid:
+                bits[off_grid] = table.outcome_batch(values[off_grid])
+            c[f"{fact}_bits"] = bits
+            if weights is not None:
+                weight, factor = weights[index], factors_[index]
+                if any_off_grid:
+                    for outcome, (w, x) in table.by_outcome.items():
+                        rows = off_grid & (bits == outcome)
+                        weight[rows], factor[rows] = w, x
+                scores[fact] = (weight, factor)
+
+        emergency_override = np.full(n, -1, dtype=np.int8)
+        for code in range(len(self.overrides) - 1, -1, -1):
+            emergency_override[self.overrides[code].vector(c)] = code
+
+        zeros = np.zeros(n)
+        risks = [zeros] * len(GROUPS)
+        factor_masks: List[Optional[np.ndarray]] = [None] * len(self.factors)
+
+        def mark(index: int, mask: np.ndarray) -> None:
+            previous = factor_masks[index]
+            factor_masks[index] = mask if previous is None else previous | mask
+
+        # masks[d] holds the rows whose ancestors at depth < d all matched
+        masks: List[Optional[np.ndarray]] = [None]
+        conditions: Dict[str, np.ndarray] = {}
+        for step in self.program:
+            if isinstance(step, VitalRun):
+                weight, factor = scores[step.fact]
+                risks[step.group] = risks[step.group] + weight
+                for index in step.factors:
+                    mark(index, factor == index)
+                continue
+            condition = conditions.get(step.key)
+            if condition is None:
+                condition = conditions[step.key] = step.vector(c)
+            del masks[step.depth + 1:]
+            mask = masks[step.depth] & condition if step.depth else condition
+            masks.append(mask)
+            mark(step.factor, mask)
+            if step.weight:
+                risks[step.group] = risks[step.group] + np.where(mask, step.weight, 0.0)
+
+        factors = np.zeros((n, len(self.factors)), dtype=bool)
+        for index, mask in enumerate(factor_masks):
+            if mask is not None:
+                factors[:, index] = mask
+        return emergency_override, risks, factors
+
+    def describe_vitals(self) -> Dict[str, Any]:
+        """The comparisons behind each vital table and the factors it scores."""
+        return {
+            fact: {
+                "comparisons": [f"{op} {arg}" for op, arg in table.comparisons],
+                "domain": list(VITAL_DOMAINS[fact]),
+                "scores": [self.factors[index] for index in table.run.factors] if table.run else [],
+            }
+            for fact, table in self.vital_tables.items()
+        }
+
+
+def _factor_registry(registry: Any) -> Dict[str, int]:
+    """Validate the table's factor_ids: unique small positive ids per factor name."""
+    if not isinstance(registry, dict):
+        raise ValueError("factor_ids: expected an object mapping factor names to ids")
+    ids: Dict[int, str] = {}
+    for name, factor_id in registry.items():
+        if isinstance(factor_id, bool) or not isinstance(factor_id, int) or not 0 < factor_id <= MAX_FACTOR_ID:
+            raise ValueError(f"factor_ids.{name}: expected an integer id from 1 to {MAX_FACTOR_ID}")
+        if factor_id in ids:
+            raise ValueError(f"factor_ids.{name}: id {factor_id} is already used by {ids[factor_id]!r}")
+        ids[factor_id] = name
+    return registry
+
+
+def _check_factor_ids(factors: List[str], factor_ids: Dict[str, int], where: str) -> None:
+    missing = [factor for factor in factors if factor not in factor_ids]
+    if missing:
+        raise ValueError(f"{where}: no factor_ids entry for {missing}")
+
+
+def _norms(norms: Any, where: str, known: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    if not isinstance(norms, dict):
+        raise ValueError(f"{where}: expected an object")
+    if known is not None:
+        unknown = sorted(set(norms) - set(known))
+        if unknown:
+            raise ValueError(f"{where}: unknown norms {unknown}")
+    return {name: _number(value, f"{where}.{name}") for name, value in norms.items()}
+
+
+class RuleSet:
+    """
+    A compiled, immutable triage rule table.
+
+    Vital thresholds may name a norm ("$hr_high") instead of a number. The
+    table's age bands override norms for their ages, and the rules are
+    compiled once per distinct set of norms (BandRules). Each request is
+    scored by the band its age falls in, found by bisecting the band bounds;
+    a missing age gets the default band.
+    """
+
+    def __init__(self, table: Dict[str, Any], digest: str = ""):
+        if not isinstance(table, dict):
+            raise ValueError("rule table must be a JSON object")
+        self.version = f"{table.get('version', '0')}+{digest[:8]}" if digest else str(table.get("version", "0"))
+
+        norms = _norms(table.get("norms", {}), "norms")
+        factor_ids = _factor_registry(table.get("factor_ids", {}))
+        # Tables without bands score every age with the base norms
+        bands = table.get("age_bands") or [{"band": "adult"}]
+        if not isinstance(bands, list):
+            raise ValueError("age_bands: expected a list")
+        age_bands: List[AgeBand] = []
+        compiled: Dict[Tuple[Tuple[str, float], ...], BandRules] = {}
+        band_rules: List[BandRules] = []
+        for i, band in enumerate(bands):
+            where = f"age_bands[{i}]"
+            if not isinstance(band, dict) or not isinstance(band.get("band"), str):
+                raise ValueError(f"{where}: expected an object with a band name")
+            last = i == len(bands) - 1
+            if last:
+                if "below" in band:
+                    raise ValueError(f"{where}: the oldest band must not have an upper bound")
+                below = math.inf
+            else:
+                below = float(_number(band.get("below"), f"{where}.below"))
+                if age_bands and below <= age_bands[-1].below:
+                    raise ValueError("age_bands: bounds must be ascending")
+            resolved = {**norms, **_norms(band.get("norms", {}), f"{where}.norms", norms)}
+            age_bands.append(AgeBand(band["band"], below, resolved))
+            # Bands with the same norms share one compiled rule set
+            key = tuple(sorted(resolved.items()))
+            if key not in compiled:
+                compiled[key] = BandRules(table, resolved, len(compiled), factor_ids)
+            band_rules.append(compiled[key])
+        self.age_bands: Tuple[AgeBand, ...] = tuple(age_bands)
+        self.band_rules: Tuple[BandRules, ...] = tuple(band_rules)
+        self._band_bounds = [band.below for band in age_bands[:-1]]
+        self._band_rule_index = np.array([rules.index for rules in band_rules], dtype=np.intp)
+        self._compiled: Tuple[BandRules, ...] = tuple(compiled.values())
+
+        names = [band.name for band in age_bands]
+        default_band = table.get("default_band", "adult")
+        if default_band not in names:
+            raise ValueError(f"default_band must be one of {names}")
+        self.default_band: int = names.index(default_band)
+
+        # Every band compiles the same rules, so overrides and factors agree
+        default = band_rules[self.default_band]
+        self.overrides: Tuple[Override, ...] = default.overrides
+        self.factors: Tuple[str, ...] = default.factors
+        self.factor_rank: Dict[str, int] = default.factor_rank
+        self.factor_ids: Tuple[int, ...] = default.factor_ids
+        # Every registered factor by id, for expanding compact results
+        self.factor_names: Dict[int, str] = {factor_id: name for name, factor_id in factor_ids.items()}
+        self.program = default.program
+
+        self.emergency_factors: Tuple[str, ...] = tuple(table.get("emergency_factors", []))
+        unknown = [factor for factor in self.emergency_factors if factor not in self.factor_rank]
+        if unknown:
+            raise ValueError(f"emergency_factors: unknown factors {unknown}")
+        self.emergency_factor_indexes = tuple(self.factor_rank[factor] for factor in self.emergency_factors)
+
+        levels = []
+        for i, entry in enumerate(table.get("levels", [])):
+            if not isinstance(entry, dict) or entry.get("level") not in TRIAGE_LEVELS:
+                raise ValueError(f"levels[{i}]: level must be one of {TRIAGE_LEVELS}")
+            levels.append((float(_number(entry.get("below"), f"levels[{i}].below")), entry["level"]))
+        if [below for below, _ in levels] != sorted(below for below, _ in levels):
+            raise ValueError("levels: thresholds must be ascending")
+        self.levels: Tuple[Tuple[float, str], ...] = tuple(levels)
+        self.default_level: str = table.get("default_level", "emergency")
+        if self.default_level not in TRIAGE_LEVELS:
+            raise ValueError(f"default_level must be one of {TRIAGE_LEVELS}")
+
+    def band_for(self, age: Optional[float]) -> int:
+        """Index of the age band for an age in years (the default band when unknown)."""
+        if age is None:
+            return self.default_band
+        return bisect.bisect_right(self._band_bounds, age)
+
+    def rules_for(self, age: Optional[float]) -> BandRules:
+        """The compiled rules that score a patient of this age."""
+        return self.band_rules[self.band_for(age)]
+
+    def check_overrides(self, f) -> Optional[Override]:
+        """Return the first emergency override matching the features, if any."""
+        index = self.rules_for(f.age).match_override(f)
+        return self.overrides[index] if index >= 0 else None
+
+    def evaluate(self, f) -> Tuple[int, Optional[List[float]], Optional[List[int]]]:
+        """
+        Run the table on one feature record. Returns the index of the
+        matching emergency override (risks and hits are then None), or -1
+        with the risk per group and the matched factor indexes.
+        """
+        return self.rules_for(f.age).evaluate(f)
+
+    def evaluate_batch(
+        self, columns: Dict[str, np.ndarray], n: int
+    ) -> Tuple[np.ndarray, List[np.ndarray], np.ndarray]:
+        """
+        Run the table on columnar features. Returns the override index per
+        row (-1 for none), the risk arrays per group and an n x factors
+        boolean matrix of matched factors. Rows are scored by the band of
+        their "age" column (NaN for unknown).
+        """
+        ages = columns.get("age")
+        if len(self._compiled) == 1 or ages is None:
+            return self.band_rules[self.default_band].evaluate_batch(columns, n)
+        ages = np.asarray(ages, dtype=np.float64)
+        band = np.searchsorted(self._band_bounds, ages, side="right")
+        band[np.isnan(ages)] = self.default_band
+        compiled = self._band_rule_index[band]
+        used = np.unique(compiled)
+        if len(used) == 1:
+            return self._compiled[used[0]].evaluate_batch(columns, n)
+
+        emergency_override = np.empty(n, dtype=np.int8)
+        risks = [np.empty(n) for _ in GROUPS]
+        factors = np.empty((n, len(self.factors)), dtype=bool)
+        for index in used:
+            rows = np.flatnonzero(compiled == index)
+            subset = {name: column[rows] for name, column in columns.items()}
+            band_override, band_risks, band_factors = self._compiled[index].evaluate_batch(subset, len(rows))
+            emergency_override[rows] = band_override
+            for risk, band_risk in zip(risks, band_risks):
+                risk[rows] = band_risk
+            factors[rows] = band_factors
+        return emergency_override, risks, factors
+
+    def level_for(self, risk_score: float) -> str:
+        for below, level in self.levels:
+            if risk_score < below:
+                return level
+        return self.default_level
+
+    def describe_vitals(self) -> Dict[str, Any]:
+        """The vital tables of the default band."""
+        return self.band_rules[self.default_band].describe_vitals()
+
+    def describe_bands(self) -> List[Dict[str, Any]]:
+        """Each age band with its upper bound in years and resolved norms."""
+        return [
+            {"band": band.name, "below": band.below if band.below != math.inf else None, "norms": band.norms}
+            for band in self.age_bands
+        ]
+
+    def quantize_vitals(self, f) -> Tuple[int, ...]:
+        """
+        The compiled band scoring the record, then the outcome bitmask of
+        every vital's comparisons (0 for a missing vital).
+        """
+        rules = self.rules_for(f.age)
+        return (rules.index,) + rules.quantize_vitals(f)
+
+
+def load_rules(path: str) -> RuleSet:
+    """Read and compile a rule table; raises OSError or ValueError."""
+    with open(path, "rb") as f:
+        content = f.read()
+    return RuleSet(json.loads(content), hashlib.sha256(content).hexdigest())
+
+
+class RuleStore:
+    """
+    Holds the active RuleSet and reloads it when the file changes.
+
+    current() only returns the active rules, so the request path never
+    touches the file. A background task stats the file every check_interval;
+    a changed table is read and compiled in a worker thread and swapped in
+    with one assignment, so requests keep the rules they started with. A
+    table that fails to compile is logged and ignored, so a bad edit never
+    takes the old rules down.
+    """
+
+    def __init__(self, path: str, check_interval: float):
+        self.path = path
+        # 0 disables hot reload
+        self.check_interval = check_interval
+        self.reloads = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._worker: Optional[asyncio.Task] = None
+        self._mtime = os.stat(path).st_mtime_ns
+        self._rules = load_rules(path)
+        self._loaded_at = time.time()
+
+    def current(self) -> RuleSet:
+        return self._rules
+
+    def check(self) -> bool:
+        """
+        Reload the rules if the file changed. Returns True when they were
+        swapped. Blocking; the reload task runs it in a worker thread.
+        """
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError as exc:
+                self._record_error(exc)
+                return False
+            if mtime == self._mtime:
+                return False
+            # Remember the mtime either way so a broken file is not recompiled on every check
+            self._mtime = mtime
+            try:
+                rules = load_rules(self.path)
+            except (OSError, ValueError) as exc:
+                self._record_error(exc)
+                return False
+            previous, self._rules = self._rules, rules
+            self._loaded_at = time.time()
+            self.reloads += 1
+            logger.info("Reloaded triage rules %s -> %s", previous.version, rules.version)
+            return True
+        finally:
+            self._lock.release()
+
+    async def start(self) -> None:
+        """Start watching the rules file (no-op when hot reload is disabled)."""
+        if self.check_interval > 0 and (self._worker is None or self._worker.done()):
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await asyncio.to_thread(self.check)
+            except Exception as exc:
+                self._record_error(exc)
+
+    def _record_error(self, exc: Exception) -> None:
+        self.errors += 1
+        self.last_error = str(exc)
+        logger.error("Failed to reload triage rules from %s, keeping %s: %s", self.path, self._rules.version, exc)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self._rules.version,
+            "path": self.path,
+            "rules": len(self._rules.program),
+            "overrides": len(self._rules.overrides),
+            "vital_tables": self._rules.describe_vitals(),
+            "age_bands": self._rules.describe_bands(),
+            "loaded_at": self._loaded_at,
+            "reloads": self.reloads,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "watching": self._worker is not None and not self._worker.done(),
+        }
+
+
+# Global rule store shared by the scalar engine, the batch engine and cache keys
+rule_store = RuleStore(settings.TRIAGE_RULES_PATH, settings.TRIAGE_RULES_RELOAD_INTERVAL)
+
+
+def current_rules() -> RuleSet:
+    """The active rule set (hot-reloaded when the rules file changes)."""
+    return rule_store.current()
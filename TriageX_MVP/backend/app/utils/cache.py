@@ -1,20 +1,140 @@
-"""Simple in-memory cache for API responses."""
+"""Bounded in-memory LRU cache with per-entry TTL for API responses."""
 import hashlib
 import json
+import threading
 import time
-from typing import Any, Dict, Optional
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 
-# In-memory cache with TTL
-_cache: Dict[str, Dict[str, Any]] = {}
-CACHE_TTL_SECONDS = 3600  # 1 hour cache
+from app.core.config import settings
+
+CACHE_TTL_SECONDS = settings.CACHE_TTL_SECONDS
+
+
+def _estimate_size(value: Any) -> int:
+    """Approximate the memory cost of a cached value in bytes."""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, tuple):
+        return sum(_estimate_size(item) for item in value)
+    return len(json.dumps(value, default=str))
+
+
+class LRUCache:
+    """
+    Ordered LRU cache with per-entry TTL on a monotonic clock.
+
+    get/set/evict are O(1). Expired entries are dropped lazily when read or
+    when they reach the LRU end. Capacity is bounded by both entry count and
+    an approximate byte budget.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, default_ttl: Optional[float] = None):
+        self.max_entries = max(max_entries, 1)
+        self.max_bytes = max(max_bytes, 1)
+        self.default_ttl = default_ttl
+        # key -> (expires_at or None, size, value)
+        self._entries: "OrderedDict[str, Tuple[Optional[float], int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, size: Optional[int] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        size = _estimate_size(value) if size is None else size
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self._bytes > self.max_bytes and len(self._entries) > 1
+            ):
+                _, (old_expires_at, old_size, _) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                if old_expires_at is not None and time.monotonic() >= old_expires_at:
+                    self.expirations += 1
+                else:
+                    self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_entries,
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.default_ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+# Global response cache
+_cache = LRUCache(
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    max_bytes=settings.CACHE_MAX_BYTES,
+    default_ttl=CACHE_TTL_SECONDS,
+)
+
+# Shadow set of legacy (full-payload MD5) keys, used only to report the hit
+# rate the old keying scheme would have achieved on the same traffic.
+# Entries are sized by their 32-character hex digest.
+LEGACY_KEY_BYTES = 32
+
+_legacy_keys = LRUCache(
+    max_entries=settings.CACHE_SHADOW_LEGACY_MAX_ENTRIES,
+    max_bytes=settings.CACHE_SHADOW_LEGACY_MAX_ENTRIES * LEGACY_KEY_BYTES,
+    default_ttl=CACHE_TTL_SECONDS,
+)
 
 
 def generate_cache_key(data: Dict[str, Any]) -> str:
-    """Generate a cache key from input data."""
+    """Generate a legacy cache key from the full input payload."""
     # Normalize the data by sorting keys and removing None values
     normalized = {
-        k: v for k, v in sorted(data.items()) 
+        k: v for k, v in sorted(data.items())
         if v is not None and k not in ['timestamp', 'created_at']
     }
     # Create a hash of the normalized data
@@ -24,56 +144,33 @@ def generate_cache_key(data: Dict[str, Any]) -> str:
 
 def get_cached(key: str) -> Optional[Dict[str, Any]]:
     """Get cached result if it exists and hasn't expired."""
-    if key not in _cache:
-        return None
-    
-    cached_item = _cache[key]
-    expires_at = cached_item.get('expires_at')
-    
-    # Check if cache has expired
-    if expires_at and datetime.now() > expires_at:
-        del _cache[key]
-        return None
-    
-    return cached_item.get('data')
+    return _cache.get(key)
 
 
 def set_cached(key: str, data: Dict[str, Any], ttl: int = CACHE_TTL_SECONDS) -> None:
     """Store data in cache with TTL."""
-    expires_at = datetime.now() + timedelta(seconds=ttl)
-    _cache[key] = {
-        'data': data,
-        'expires_at': expires_at,
-        'created_at': datetime.now()
-    }
-    
-    # Clean up expired entries periodically (simple cleanup)
-    if len(_cache) > 1000:  # Prevent memory bloat
-        _cleanup_expired()
+    _cache.set(key, data, ttl)
 
 
-def _cleanup_expired() -> None:
-    """Remove expired cache entries."""
-    now = datetime.now()
-    expired_keys = [
-        key for key, value in _cache.items()
-        if value.get('expires_at') and now > value['expires_at']
-    ]
-    for key in expired_keys:
-        del _cache[key]
+def track_legacy_key(key: str) -> None:
+    """Record a lookup under the legacy keying scheme for hit-rate comparison."""
+    if _legacy_keys.get(key) is None:
+        _legacy_keys.set(key, True, size=LEGACY_KEY_BYTES)
 
 
 def clear_cache() -> None:
     """Clear all cache entries (useful for testing)."""
     _cache.clear()
+    _legacy_keys.clear()
 
 
 def get_cache_stats() -> Dict[str, Any]:
-    """Get cache statistics."""
-    _cleanup_expired()
-    return {
-        'size': len(_cache),
-        'max_size': 1000,
-        'ttl_seconds': CACHE_TTL_SECONDS
-    }
-
+    """Get cache statistics, including the legacy-key hit-rate comparison."""
+    stats = _cache.stats()
+    legacy = _legacy_keys.stats()
+    if legacy['hits'] + legacy['misses']:
+        stats['legacy_key_hit_rate'] = legacy['hit_rate']
+        stats['hit_rate_gain'] = (
+            round(stats['hit_rate'] - legacy['hit_rate'], 4) if stats['hit_rate'] is not None else None
+        )
+    return stats
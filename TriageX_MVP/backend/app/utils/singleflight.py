@@ -0,0 +1,74 @@
+"""Single-flight de-duplication of concurrent identical work."""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class _Flight:
+    __slots__ = ("task", "duplicates", "orphaned")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.duplicates = 0
+        # Set when the leader was cancelled; the next follower takes its place
+        self.orphaned = False
+
+
+class SingleFlight:
+    """
+    Run at most one computation per key at a time.
+
+    The first caller for a key runs the computation; callers that arrive while
+    it is still running await the same result instead of repeating the work.
+    The computation runs in its own task, so it finishes for the callers that
+    joined it even if the caller that started it is cancelled.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool, int]:
+        """
+        Run fn for key, or join the computation already in flight.
+
+        Returns (result, shared, duplicates): shared is True for callers that
+        joined another caller's computation; for the caller that ran it,
+        duplicates is how many others joined. If that caller is cancelled, the
+        first caller that joined is reported as the leader instead.
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            flight.duplicates += 1
+            self.coalesced += 1
+            # Shield so a cancelled follower does not cancel the shared result
+            result = await asyncio.shield(flight.task)
+            if flight.orphaned:
+                flight.orphaned = False
+                return result, False, flight.duplicates - 1
+            return result, True, 0
+
+        flight = _Flight(asyncio.ensure_future(fn()))
+        self._flights[key] = flight
+        flight.task.add_done_callback(lambda task: self._finish(key, flight))
+        self.leaders += 1
+        try:
+            # Shielded like a follower: a cancelled leader leaves the work running
+            return await asyncio.shield(flight.task), False, flight.duplicates
+        except asyncio.CancelledError:
+            flight.orphaned = True
+            raise
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Mark the exception as retrieved even when nobody is waiting any more
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
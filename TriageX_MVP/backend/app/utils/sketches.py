@@ -0,0 +1,163 @@
+"""Fixed-memory streaming sketches for live analytics."""
+import heapq
+import itertools
+import math
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy hitters (Metwally et al.) over at most `capacity` counters.
+
+    Any item whose true frequency exceeds total / capacity is guaranteed to
+    be tracked; each reported count overestimates the truth by at most the
+    stored error.
+
+    The smallest counter is found through a min-heap of (count, seq, item)
+    entries. Entries go stale when a count grows and are skipped when
+    popped; the heap is rebuilt once stale entries outnumber live ones, so
+    eviction is amortized O(log capacity).
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(capacity, 1)
+        # item -> [count, error]
+        self._counters: Dict[Hashable, List[int]] = {}
+        self._heap: List[Tuple[int, int, Hashable]] = []
+        self._seq = itertools.count()
+        self.total = 0
+
+    def add(self, item: Hashable, count: int = 1) -> None:
+        self.total += count
+        counter = self._counters.get(item)
+        if counter is not None:
+            counter[0] += count
+        elif len(self._counters) < self.capacity:
+            counter = self._counters[item] = [count, 0]
+        else:
+            # Evict the smallest counter; the newcomer inherits its count as error
+            floor = self._counters.pop(self._pop_min())[0]
+            counter = self._counters[item] = [floor + count, floor]
+        heapq.heappush(self._heap, (counter[0], next(self._seq), item))
+        if len(self._heap) > 2 * self.capacity:
+            self._rebuild()
+
+    def _pop_min(self) -> Hashable:
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            counter = self._counters.get(item)
+            if counter is not None and counter[0] == count:
+                return item
+
+    def _rebuild(self) -> None:
+        self._heap = [(counter[0], next(self._seq), item) for item, counter in self._counters.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, k: int) -> List[Tuple[Hashable, int, int]]:
+        """The k most frequent items as (item, count, max_overestimate)."""
+        ranked = sorted(self._counters.items(), key=lambda entry: entry[1][0], reverse=True)
+        return [(item, count, error) for item, (count, error) in ranked[:k]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "total": self.total,
+            "counters": [[item, count, error] for item, (count, error) in self._counters.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], capacity: Optional[int] = None) -> "SpaceSaving":
+        sketch = cls(capacity or data["capacity"])
+        sketch.total = data["total"]
+        counters = sorted(data["counters"], key=lambda entry: entry[1], reverse=True)
+        sketch._counters = {item: [count, error] for item, count, error in counters[:sketch.capacity]}
+        sketch._rebuild()
+        return sketch
+
+
+class DDSketch:
+    """
+    DDSketch quantile sketch (Masson et al.) with relative-error guarantees.
+
+    Values are counted in logarithmic buckets so every quantile is within
+    `relative_accuracy` of the true value. When more than `max_bins` buckets
+    are used, the lowest buckets are merged, keeping memory fixed while
+    preserving accuracy for the upper quantiles.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max(max_bins, 1)
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._bins: Dict[int, int] = {}
+        self._zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        if not math.isfinite(value):
+            # NaN and infinities have no bucket and would poison sum/min/max
+            return
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value <= 0:
+            # Triage inputs are non-negative; clamp anything else to zero
+            self._zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self._bins[index] = self._bins.get(index, 0) + 1
+        if len(self._bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        indexes = sorted(self._bins)
+        overflow = len(indexes) - self.max_bins
+        merged = sum(self._bins.pop(index) for index in indexes[:overflow])
+        target = indexes[overflow]
+        self._bins[target] += merged
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self._zero_count
+        if rank < seen:
+            return min(self.min, 0.0)
+        for index in sorted(self._bins):
+            seen += self._bins[index]
+            if seen > rank:
+                value = 2 * self._gamma ** index / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "bins": [[index, count] for index, count in self._bins.items()],
+            "zero_count": self._zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], max_bins: int = 2048) -> "DDSketch":
+        sketch = cls(data["relative_accuracy"], max_bins)
+        sketch._bins = {index: count for index, count in data["bins"]}
+        sketch._zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if sketch.count:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        while len(sketch._bins) > sketch.max_bins:
+            sketch._collapse()
+        return sketch
@@ -0,0 +1,69 @@
+"""
+Rebuild the analytics rollup tables from the assessments table.
+
+Run once after create_analytics_rollups.sql, or for any range whose rollups
+need repairing:
+
+    python backfill_rollups.py
+    python backfill_rollups.py --start 2024-01-01 --end 2024-03-31 --chunk-days 7
+"""
+import argparse
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from app.core.logging_config import setup_logging
+from app.db.database import ASSESSMENTS_TABLE, _ensure_client, backfill_rollups, close_database
+
+logger = logging.getLogger("backfill_rollups")
+
+
+async def _oldest_assessment_day() -> Optional[date]:
+    client = _ensure_client()
+    response = await client.select(
+        ASSESSMENTS_TABLE,
+        {"select": "timestamp", "order": "timestamp.asc", "limit": 1},
+        action="find oldest assessment",
+    )
+    rows = response.json()
+    if not rows:
+        return None
+    return datetime.fromisoformat(rows[0]["timestamp"]).astimezone(timezone.utc).date()
+
+
+async def run(start: Optional[date], end: Optional[date], chunk_days: int) -> None:
+    try:
+        start = start or await _oldest_assessment_day()
+        if start is None:
+            logger.info("No assessments to roll up")
+            return
+        end = end or datetime.now(timezone.utc).date()
+
+        total = 0
+        chunk_start = start
+        # Backfill a few days per call so each transaction stays short
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+            processed = await backfill_rollups(chunk_start.isoformat(), chunk_end.isoformat())
+            logger.info("Rolled up %s .. %s: %d assessments", chunk_start, chunk_end, processed)
+            total += processed
+            chunk_start = chunk_end + timedelta(days=1)
+        logger.info("Backfill complete: %d assessments", total)
+    finally:
+        await close_database()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild TriageX analytics rollups.")
+    parser.add_argument("--start", type=date.fromisoformat, help="First UTC day (default: oldest assessment)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last UTC day (default: today)")
+    parser.add_argument("--chunk-days", type=int, default=7, help="Days rebuilt per call (default: 7)")
+    args = parser.parse_args()
+
+    setup_logging()
+    asyncio.run(run(args.start, args.end, max(args.chunk_days, 1)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Split blood_pressure into bp_systolic/bp_diastolic for existing assessments.
+
+Run after migrate_typed_columns.sql; safe to re-run or interrupt:
+
+    python backfill_typed_columns.py
+    python backfill_typed_columns.py --batch-size 2000
+"""
+import argparse
+import asyncio
+import logging
+
+from app.core.logging_config import setup_logging
+from app.db.database import backfill_blood_pressure, close_database
+
+logger = logging.getLogger("backfill_typed_columns")
+
+
+async def run(batch_size: int) -> None:
+    try:
+        total = 0
+        # Small batches keep each UPDATE transaction (and its row locks) short
+        while True:
+            updated = await backfill_blood_pressure(batch_size)
+            if not updated:
+                break
+            total += updated
+            logger.info("Backfilled blood pressure for %d assessments (%d total)", updated, total)
+        logger.info("Backfill complete: %d assessments", total)
+    finally:
+        await close_database()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill TriageX typed blood pressure columns.")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows updated per call (default: 5000)")
+    args = parser.parse_args()
+
+    setup_logging()
+    asyncio.run(run(max(args.batch_size, 1)))
+
+
+if __name__ == "__main__":
+    main()
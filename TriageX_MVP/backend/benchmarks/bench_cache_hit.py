@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark the /analyze cache-hit path.
+
+Compares the previous hit path (rebuild ExplanationTag objects, re-validate
+HealthResponse, let FastAPI encode it) with the current one (look up the
+pre-encoded JSON bytes and wrap them in a raw Response).
+
+Run from the backend directory:  python benchmarks/bench_cache_hit.py
+"""
+import copy
+import sys
+import timeit
+
+sys.path.insert(0, '.')
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from app.schemas.health import ExplanationTag, HealthData, HealthResponse
+from app.services.triage_logic import analyze_health
+from app.api.v1.endpoints.analyze import JSON_MEDIA_TYPE, encode_health_response
+from app.utils.cache import LRUCache
+
+ITERATIONS = 20000
+
+data = HealthData(
+    symptom="chest pain radiating to left arm",
+    heart_rate=112,
+    temperature=37.8,
+    spo2=96,
+    blood_pressure="150/95",
+    chest_radiation="yes",
+)
+result = analyze_health(data)
+
+legacy_cache = LRUCache(max_entries=100, max_bytes=10 ** 7)
+legacy_cache.set("key", result)
+bytes_cache = LRUCache(max_entries=100, max_bytes=10 ** 7)
+bytes_cache.set("key", encode_health_response(result))
+
+
+def legacy_hit() -> bytes:
+    # Copy so the in-place mutation of the old code path does not skew later runs
+    cached_result = copy.copy(legacy_cache.get("key"))
+    cached_result["explanation_tags"] = [ExplanationTag(**tag) for tag in cached_result["explanation_tags"]]
+    response = HealthResponse(**cached_result)
+    # FastAPI re-validates against response_model and encodes the result
+    validated = HealthResponse.model_validate(response.model_dump())
+    return JSONResponse(content=jsonable_encoder(validated)).body
+
+
+def bytes_hit() -> bytes:
+    return Response(content=bytes_cache.get("key"), media_type=JSON_MEDIA_TYPE).body
+
+
+def main():
+    for name, fn in (("before (revalidate + encode)", legacy_hit), ("after (pre-encoded bytes)", bytes_hit)):
+        best = min(timeit.repeat(fn, number=ITERATIONS, repeat=5)) / ITERATIONS
+        print(f"{name:32s} {best * 1e6:8.2f} us/hit")
+
+
+if __name__ == "__main__":
+    main()
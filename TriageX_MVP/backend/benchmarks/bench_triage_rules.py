@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiled triage rule table.
+
+Times the scalar rules (emergency overrides + scenario rules) on
+precomputed TriageFeatures, the compact assess_health outcome, a full
+analyze_health call (outcome expanded to the response dict), and the batch
+engine on 10,000 rows (mixed age bands). The rule table is compiled into
+closures over a record's facts read once into a list, so the per-rule cost
+is a closure call rather than an interpreted rule lookup.
+
+Run from the backend directory:  python benchmarks/bench_triage_rules.py
+"""
+import sys
+import timeit
+
+sys.path.insert(0, '.')
+
+from app.schemas.health import HealthData
+from app.services.triage_features import extract_features
+from app.services.triage_logic import analyze_health
+from app.services.triage_batch import analyze_health_batch, columns_from_records
+
+ITERATIONS = 5000
+BATCH_ROWS = 10000
+
+REQUESTS = [
+    HealthData(
+        symptom="chest pain radiating to left arm", age="58",
+        heart_rate=112, temperature=37.8, spo2=96, blood_pressure="150/95",
+        respiratory_rate="22", pain_level="6",
+        chest_radiation="yes", chest_shortness_breath="Yes", chest_nausea="no",
+    ),
+    HealthData(
+        symptom="swollen leg", age="71", heart_rate=88, temperature=37.1, duration="2 days",
+        leg_redness="y", leg_warmth="yes", leg_duration="36 hours", pain_level="8",
+        has_medications="yes", medications=["warfarin", "paracetamol"],
+    ),
+    HealthData(
+        symptom="shortness of breath and wheezing", spo2=91, respiratory_rate="28",
+        has_medical_conditions="yes", medical_conditions=["asthma", "diabetes"],
+        is_pregnant="yes", pregnancy_trimester="third",
+        is_trauma_related="yes", trauma_type="chest",
+    ),
+    HealthData(symptom="mild headache", age="8 months", heart_rate=150, temperature=36.9),
+]
+FEATURES = [extract_features(data) for data in REQUESTS]
+
+
+def per_request(fn) -> float:
+    fn()
+    return min(timeit.repeat(fn, number=ITERATIONS, repeat=7)) / (ITERATIONS * len(FEATURES)) * 1e6
+
+
+def main():
+    try:
+        from app.services.triage_rules import current_rules
+    except ImportError:  # older trees: hardcoded assessors
+        rules = None
+    else:
+        rules = current_rules()
+
+    if rules is not None:
+        def scalar_rules():
+            for f in FEATURES:
+                rules.evaluate(f)
+        print(f"rules per request         {per_request(scalar_rules):8.2f} us")
+
+    try:
+        from app.services.triage_logic import assess_health
+    except ImportError:  # older trees: no compact outcomes
+        pass
+    else:
+        def compact():
+            for f in FEATURES:
+                assess_health(f)
+        print(f"assess_health per request  {per_request(compact):8.2f} us")
+
+    def engine():
+        for f in FEATURES:
+            analyze_health(f)
+    print(f"analyze_health per request {per_request(engine):8.2f} us")
+
+    columns = columns_from_records(REQUESTS * (BATCH_ROWS // len(REQUESTS)))
+    best = min(timeit.repeat(lambda: analyze_health_batch(columns), number=5, repeat=5)) / 5
+    print(f"batch of {BATCH_ROWS} rows        {best * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+-- Analytics Aggregation Function
+-- Run this in Supabase SQL Editor
+-- Computes the admin dashboard summary in Postgres over the full date range.
+-- Called by the backend as POST /rest/v1/rpc/assessment_analytics.
+-- Rows are weighted by repeat_count: a coalesced row stands for that many
+-- identical assessments (ANALYZE_COALESCE_LOG_REPEATS).
+
+-- Same as add_repeat_count_column.sql
+ALTER TABLE assessments ADD COLUMN IF NOT EXISTS repeat_count INTEGER NOT NULL DEFAULT 1;
+
+CREATE OR REPLACE FUNCTION assessment_analytics(
+    start_ts TIMESTAMPTZ DEFAULT NULL,
+    end_ts TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    WITH filtered AS (
+        SELECT triage_level, symptom, age, confidence, timestamp, COALESCE(repeat_count, 1) AS weight
+        FROM assessments
+        WHERE (start_ts IS NULL OR timestamp >= start_ts)
+          AND (end_ts IS NULL OR timestamp <= end_ts)
+    ),
+    levels AS (
+        SELECT COALESCE(jsonb_object_agg(triage_level, n), '{}'::jsonb) AS count_by_level
+        FROM (
+            SELECT triage_level, SUM(weight) AS n
+            FROM filtered
+            GROUP BY triage_level
+        ) AS l
+    ),
+    symptoms AS (
+        SELECT COALESCE(
+            jsonb_agg(jsonb_build_object('symptom', symptom, 'count', n) ORDER BY n DESC, latest DESC),
+            '[]'::jsonb
+        ) AS top_symptoms
+        FROM (
+            SELECT btrim(symptom) AS symptom, SUM(weight) AS n, MAX(timestamp) AS latest
+            FROM filtered
+            WHERE btrim(COALESCE(symptom, '')) <> ''
+            GROUP BY btrim(symptom)
+            ORDER BY n DESC, latest DESC
+            LIMIT 10
+        ) AS s
+    ),
+    totals AS (
+        SELECT
+            COALESCE(SUM(weight), 0) AS total_assessments,
+            -- age may still be free text; only numeric values count towards the average
+            SUM(btrim(age::TEXT)::NUMERIC * weight) FILTER (
+                WHERE btrim(age::TEXT) ~ '^[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)$'
+            ) / NULLIF(SUM(weight) FILTER (
+                WHERE btrim(age::TEXT) ~ '^[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)$'
+            ), 0) AS average_age,
+            SUM(confidence * weight) / NULLIF(SUM(weight) FILTER (WHERE confidence IS NOT NULL), 0)
+                AS average_confidence
+        FROM filtered
+    )
+    SELECT jsonb_build_object(
+        'total_assessments', totals.total_assessments,
+        'count_by_level', levels.count_by_level,
+        'top_symptoms', symptoms.top_symptoms,
+        'average_age', totals.average_age,
+        'average_confidence', totals.average_confidence
+    )
+    FROM totals, levels, symptoms;
+$$;
+
+-- Used by the analytics range scan
+CREATE INDEX IF NOT EXISTS idx_assessments_timestamp ON assessments(timestamp DESC);
+
+GRANT EXECUTE ON FUNCTION assessment_analytics(TIMESTAMPTZ, TIMESTAMPTZ) TO service_role;
@@ -0,0 +1,411 @@
+-- Analytics Rollups Migration
+-- Run this in Supabase SQL Editor (after create_analytics_function.sql)
+-- Keeps hourly and daily pre-aggregates of the assessments table up to date
+-- on every insert, and rewrites assessment_analytics to read them. Dashboard
+-- cost then depends on the number of hours/days in the range, not the number
+-- of assessments. Buckets are UTC.
+--
+-- After running this once (or re-running it after an upgrade that adds
+-- rollup columns), backfill existing data:
+--   python backfill_rollups.py
+--
+-- A row logged with repeat_count = n (ANALYZE_COALESCE_LOG_REPEATS) stands
+-- for n identical assessments, so every aggregate weights rows by it.
+
+-- Same as add_repeat_count_column.sql; the rollups read it
+ALTER TABLE assessments ADD COLUMN IF NOT EXISTS repeat_count INTEGER NOT NULL DEFAULT 1;
+
+-- Per-level counts and sums
+CREATE TABLE IF NOT EXISTS assessment_rollups_hourly (
+    bucket TIMESTAMPTZ NOT NULL,
+    triage_level TEXT NOT NULL,
+    assessments BIGINT NOT NULL DEFAULT 0,
+    confidence_sum NUMERIC NOT NULL DEFAULT 0,
+    confidence_count BIGINT NOT NULL DEFAULT 0,
+    age_sum NUMERIC NOT NULL DEFAULT 0,
+    age_count BIGINT NOT NULL DEFAULT 0,
+    low_confidence_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, triage_level)
+);
+
+-- Added after the first release of this migration
+ALTER TABLE assessment_rollups_hourly
+    ADD COLUMN IF NOT EXISTS low_confidence_count BIGINT NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS assessment_rollups_daily (
+    LIKE assessment_rollups_hourly INCLUDING ALL
+);
+
+ALTER TABLE assessment_rollups_daily
+    ADD COLUMN IF NOT EXISTS low_confidence_count BIGINT NOT NULL DEFAULT 0;
+
+-- Per-symptom counts (symptoms are trimmed; empty symptoms are skipped).
+-- Symptoms are free text, so each bucket keeps only its top 50 symptoms and
+-- folds the rest into one '(other)' row; see prune_symptom_rollups below.
+CREATE TABLE IF NOT EXISTS assessment_symptom_rollups_hourly (
+    bucket TIMESTAMPTZ NOT NULL,
+    symptom TEXT NOT NULL,
+    assessments BIGINT NOT NULL DEFAULT 0,
+    last_seen TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (bucket, symptom)
+);
+
+CREATE TABLE IF NOT EXISTS assessment_symptom_rollups_daily (
+    LIKE assessment_symptom_rollups_hourly INCLUDING ALL
+);
+
+ALTER TABLE assessment_rollups_hourly ENABLE ROW LEVEL SECURITY;
+ALTER TABLE assessment_rollups_daily ENABLE ROW LEVEL SECURITY;
+ALTER TABLE assessment_symptom_rollups_hourly ENABLE ROW LEVEL SECURITY;
+ALTER TABLE assessment_symptom_rollups_daily ENABLE ROW LEVEL SECURITY;
+
+
+-- age is free text; only numeric values count towards the average
+CREATE OR REPLACE FUNCTION assessment_numeric_age(age TEXT)
+RETURNS NUMERIC
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT CASE
+        WHEN btrim(age) ~ '^[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)$' THEN btrim(age)::NUMERIC
+    END;
+$$;
+
+-- Same helper once age is NUMERIC (create_table.sql / migrate_typed_columns.sql)
+CREATE OR REPLACE FUNCTION assessment_numeric_age(age NUMERIC)
+RETURNS NUMERIC
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT age;
+$$;
+
+
+-- Keep the top 50 symptoms per bucket; evicted counts move to '(other)'.
+-- Counts of a symptom evicted earlier restart from zero if it comes back, as
+-- in a Space-Saving sketch, so the dashboard top list stays approximate but
+-- the table grows with the number of buckets, not with assessments.
+CREATE OR REPLACE FUNCTION prune_symptom_rollups(rollup_table TEXT, buckets TIMESTAMPTZ[])
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    EXECUTE format($sql$
+        WITH ranked AS (
+            SELECT bucket, symptom,
+                   row_number() OVER (PARTITION BY bucket ORDER BY assessments DESC, last_seen DESC) AS rank
+            FROM %1$I
+            WHERE bucket = ANY($1) AND symptom <> '(other)'
+        ),
+        evicted AS (
+            DELETE FROM %1$I r
+            USING ranked
+            WHERE ranked.rank > 50 AND r.bucket = ranked.bucket AND r.symptom = ranked.symptom
+            RETURNING r.bucket, r.assessments, r.last_seen
+        )
+        INSERT INTO %1$I AS r (bucket, symptom, assessments, last_seen)
+        SELECT bucket, '(other)', SUM(assessments), MAX(last_seen)
+        FROM evicted
+        GROUP BY bucket
+        ON CONFLICT (bucket, symptom) DO UPDATE SET
+            assessments = r.assessments + EXCLUDED.assessments,
+            last_seen = GREATEST(r.last_seen, EXCLUDED.last_seen)
+    $sql$, rollup_table) USING buckets;
+END;
+$$;
+
+
+-- Statement-level trigger: one upsert per bucket for each multi-row insert
+CREATE OR REPLACE FUNCTION assessment_rollups_on_insert()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO assessment_rollups_hourly AS r
+        (bucket, triage_level, assessments, confidence_sum, confidence_count, age_sum, age_count,
+         low_confidence_count)
+    SELECT
+        date_trunc('hour', timestamp, 'UTC'), triage_level, SUM(weight),
+        COALESCE(SUM(confidence * weight), 0),
+        COALESCE(SUM(weight) FILTER (WHERE confidence IS NOT NULL), 0),
+        COALESCE(SUM(assessment_numeric_age(age) * weight), 0),
+        COALESCE(SUM(weight) FILTER (WHERE assessment_numeric_age(age) IS NOT NULL), 0),
+        COALESCE(SUM(weight) FILTER (WHERE low_confidence_warning), 0)
+    FROM (SELECT *, COALESCE(repeat_count, 1) AS weight FROM new_rows) AS n
+    GROUP BY 1, 2
+    ON CONFLICT (bucket, triage_level) DO UPDATE SET
+        assessments = r.assessments + EXCLUDED.assessments,
+        confidence_sum = r.confidence_sum + EXCLUDED.confidence_sum,
+        confidence_count = r.confidence_count + EXCLUDED.confidence_count,
+        age_sum = r.age_sum + EXCLUDED.age_sum,
+        age_count = r.age_count + EXCLUDED.age_count,
+        low_confidence_count = r.low_confidence_count + EXCLUDED.low_confidence_count;
+
+    INSERT INTO assessment_rollups_daily AS r
+        (bucket, triage_level, assessments, confidence_sum, confidence_count, age_sum, age_count,
+         low_confidence_count)
+    SELECT
+        date_trunc('day', timestamp, 'UTC'), triage_level, SUM(weight),
+        COALESCE(SUM(confidence * weight), 0),
+        COALESCE(SUM(weight) FILTER (WHERE confidence IS NOT NULL), 0),
+        COALESCE(SUM(assessment_numeric_age(age) * weight), 0),
+        COALESCE(SUM(weight) FILTER (WHERE assessment_numeric_age(age) IS NOT NULL), 0),
+        COALESCE(SUM(weight) FILTER (WHERE low_confidence_warning), 0)
+    FROM (SELECT *, COALESCE(repeat_count, 1) AS weight FROM new_rows) AS n
+    GROUP BY 1, 2
+    ON CONFLICT (bucket, triage_level) DO UPDATE SET
+        assessments = r.assessments + EXCLUDED.assessments,
+        confidence_sum = r.confidence_sum + EXCLUDED.confidence_sum,
+        confidence_count = r.confidence_count + EXCLUDED.confidence_count,
+        age_sum = r.age_sum + EXCLUDED.age_sum,
+        age_count = r.age_count + EXCLUDED.age_count,
+        low_confidence_count = r.low_confidence_count + EXCLUDED.low_confidence_count;
+
+    INSERT INTO assessment_symptom_rollups_hourly AS r (bucket, symptom, assessments, last_seen)
+    SELECT date_trunc('hour', timestamp, 'UTC'), btrim(symptom), SUM(COALESCE(repeat_count, 1)), MAX(timestamp)
+    FROM new_rows
+    WHERE btrim(COALESCE(symptom, '')) <> ''
+    GROUP BY 1, 2
+    ON CONFLICT (bucket, symptom) DO UPDATE SET
+        assessments = r.assessments + EXCLUDED.assessments,
+        last_seen = GREATEST(r.last_seen, EXCLUDED.last_seen);
+
+    INSERT INTO assessment_symptom_rollups_daily AS r (bucket, symptom, assessments, last_seen)
+    SELECT date_trunc('day', timestamp, 'UTC'), btrim(symptom), SUM(COALESCE(repeat_count, 1)), MAX(timestamp)
+    FROM new_rows
+    WHERE btrim(COALESCE(symptom, '')) <> ''
+    GROUP BY 1, 2
+    ON CONFLICT (bucket, symptom) DO UPDATE SET
+        assessments = r.assessments + EXCLUDED.assessments,
+        last_seen = GREATEST(r.last_seen, EXCLUDED.last_seen);
+
+    PERFORM prune_symptom_rollups(
+        'assessment_symptom_rollups_hourly',
+        ARRAY(SELECT DISTINCT date_trunc('hour', timestamp, 'UTC') FROM new_rows)
+    );
+    PERFORM prune_symptom_rollups(
+        'assessment_symptom_rollups_daily',
+        ARRAY(SELECT DISTINCT date_trunc('day', timestamp, 'UTC') FROM new_rows)
+    );
+
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS assessments_rollup_insert ON assessments;
+CREATE TRIGGER assessments_rollup_insert
+    AFTER INSERT ON assessments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION assessment_rollups_on_insert();
+
+
+-- Rebuild the rollups for whole UTC days overlapping [start_ts, end_ts]
+-- (NULL = unbounded). Inserts are blocked while it runs so the trigger and
+-- the rebuild never double count. Returns the number of assessments rolled up.
+CREATE OR REPLACE FUNCTION backfill_assessment_rollups(
+    start_ts TIMESTAMPTZ DEFAULT NULL,
+    end_ts TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    lo TIMESTAMPTZ := COALESCE(date_trunc('day', start_ts, 'UTC'), '-infinity');
+    hi TIMESTAMPTZ := COALESCE(date_trunc('day', end_ts, 'UTC') + INTERVAL '1 day', 'infinity');
+    processed BIGINT;
+BEGIN
+    LOCK TABLE assessments IN SHARE MODE;
+
+    DELETE FROM assessment_rollups_hourly WHERE bucket >= lo AND bucket < hi;
+    DELETE FROM assessment_rollups_daily WHERE bucket >= lo AND bucket < hi;
+    DELETE FROM assessment_symptom_rollups_hourly WHERE bucket >= lo AND bucket < hi;
+    DELETE FROM assessment_symptom_rollups_daily WHERE bucket >= lo AND bucket < hi;
+
+    INSERT INTO assessment_rollups_hourly
+        (bucket, triage_level, assessments, confidence_sum, confidence_count, age_sum, age_count,
+         low_confidence_count)
+    SELECT
+        date_trunc('hour', timestamp, 'UTC'), triage_level, SUM(weight),
+        COALESCE(SUM(confidence * weight), 0),
+        COALESCE(SUM(weight) FILTER (WHERE confidence IS NOT NULL), 0),
+        COALESCE(SUM(assessment_numeric_age(age) * weight), 0),
+        COALESCE(SUM(weight) FILTER (WHERE assessment_numeric_age(age) IS NOT NULL), 0),
+        COALESCE(SUM(weight) FILTER (WHERE low_confidence_warning), 0)
+    FROM (SELECT *, COALESCE(repeat_count, 1) AS weight FROM assessments) AS a
+    WHERE timestamp >= lo AND timestamp < hi
+    GROUP BY 1, 2;
+
+    -- Days are summed from the hours just rebuilt
+    INSERT INTO assessment_rollups_daily
+        (bucket, triage_level, assessments, confidence_sum, confidence_count, age_sum, age_count,
+         low_confidence_count)
+    SELECT
+        date_trunc('day', bucket, 'UTC'), triage_level, SUM(assessments),
+        SUM(confidence_sum), SUM(confidence_count), SUM(age_sum), SUM(age_count),
+        SUM(low_confidence_count)
+    FROM assessment_rollups_hourly
+    WHERE bucket >= lo AND bucket < hi
+    GROUP BY 1, 2;
+
+    INSERT INTO assessment_symptom_rollups_hourly (bucket, symptom, assessments, last_seen)
+    SELECT date_trunc('hour', timestamp, 'UTC'), btrim(symptom), SUM(COALESCE(repeat_count, 1)), MAX(timestamp)
+    FROM assessments
+    WHERE timestamp >= lo AND timestamp < hi
+      AND btrim(COALESCE(symptom, '')) <> ''
+    GROUP BY 1, 2;
+
+    PERFORM prune_symptom_rollups(
+        'assessment_symptom_rollups_hourly',
+        ARRAY(SELECT DISTINCT bucket FROM assessment_symptom_rollups_hourly WHERE bucket >= lo AND bucket < hi)
+    );
+
+    -- Days are summed from the pruned hours, so the daily tops are rebuilt
+    -- from each hour's top symptoms
+    INSERT INTO assessment_symptom_rollups_daily (bucket, symptom, assessments, last_seen)
+    SELECT date_trunc('day', bucket, 'UTC'), symptom, SUM(assessments), MAX(last_seen)
+    FROM assessment_symptom_rollups_hourly
+    WHERE bucket >= lo AND bucket < hi
+    GROUP BY 1, 2;
+
+    PERFORM prune_symptom_rollups(
+        'assessment_symptom_rollups_daily',
+        ARRAY(SELECT DISTINCT bucket FROM assessment_symptom_rollups_daily WHERE bucket >= lo AND bucket < hi)
+    );
+
+    SELECT COALESCE(SUM(assessments), 0) INTO processed
+    FROM assessment_rollups_daily
+    WHERE bucket >= lo AND bucket < hi;
+    RETURN processed;
+END;
+$$;
+
+
+-- Dashboard summary from the rollups. Whole days come from the daily table,
+-- whole hours at the edges from the hourly table, and the partial hours at
+-- either end from assessments itself, so the result stays exact for any range.
+CREATE OR REPLACE FUNCTION assessment_analytics(
+    start_ts TIMESTAMPTZ DEFAULT NULL,
+    end_ts TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    WITH raw_bounds AS (
+        SELECT
+            COALESCE(start_ts, '-infinity'::TIMESTAMPTZ) AS lo,
+            COALESCE(end_ts, 'infinity'::TIMESTAMPTZ) AS hi
+    ),
+    first_hours AS (
+        SELECT
+            lo,
+            hi,
+            -- First hour boundary at or after lo
+            CASE WHEN date_trunc('hour', lo, 'UTC') = lo THEN lo
+                 ELSE date_trunc('hour', lo, 'UTC') + INTERVAL '1 hour' END AS hour_lo,
+            -- end_ts is inclusive, so the hour containing it is read raw
+            CASE WHEN end_ts IS NULL THEN hi
+                 ELSE date_trunc('hour', hi, 'UTC') END AS hour_hi
+        FROM raw_bounds
+    ),
+    hour_bounds AS (
+        -- A range inside a single hour is read entirely from assessments
+        SELECT
+            lo,
+            hi,
+            CASE WHEN hour_lo < hour_hi THEN hour_lo ELSE lo END AS hour_lo,
+            CASE WHEN hour_lo < hour_hi THEN hour_hi ELSE lo END AS hour_hi
+        FROM first_hours
+    ),
+    bounds AS (
+        SELECT
+            lo,
+            hi,
+            hour_lo,
+            hour_hi,
+            CASE WHEN date_trunc('day', hour_lo, 'UTC') = hour_lo THEN hour_lo
+                 ELSE date_trunc('day', hour_lo, 'UTC') + INTERVAL '1 day' END AS day_lo,
+            CASE WHEN hour_hi = 'infinity'::TIMESTAMPTZ THEN hour_hi
+                 ELSE date_trunc('day', hour_hi, 'UTC') END AS day_hi
+        FROM hour_bounds
+    ),
+    edge_rows AS (
+        SELECT a.triage_level, a.symptom, a.age, a.confidence, a.timestamp, COALESCE(a.repeat_count, 1) AS weight
+        FROM assessments a, bounds b
+        WHERE a.timestamp >= b.lo AND a.timestamp < b.hour_lo
+        UNION ALL
+        SELECT a.triage_level, a.symptom, a.age, a.confidence, a.timestamp, COALESCE(a.repeat_count, 1) AS weight
+        FROM assessments a, bounds b
+        WHERE a.timestamp >= b.hour_hi AND a.timestamp <= b.hi
+    ),
+    level_rows AS (
+        SELECT r.triage_level, r.assessments, r.confidence_sum, r.confidence_count, r.age_sum, r.age_count
+        FROM assessment_rollups_daily r, bounds b
+        WHERE r.bucket >= b.day_lo AND r.bucket < b.day_hi
+        UNION ALL
+        SELECT r.triage_level, r.assessments, r.confidence_sum, r.confidence_count, r.age_sum, r.age_count
+        FROM assessment_rollups_hourly r, bounds b
+        WHERE r.bucket >= b.hour_lo AND r.bucket < b.hour_hi
+          AND NOT (r.bucket >= b.day_lo AND r.bucket < b.day_hi)
+        UNION ALL
+        SELECT
+            triage_level, weight, COALESCE(confidence * weight, 0), (confidence IS NOT NULL)::INT * weight,
+            COALESCE(assessment_numeric_age(age) * weight, 0), (assessment_numeric_age(age) IS NOT NULL)::INT * weight
+        FROM edge_rows
+    ),
+    symptom_rows AS (
+        SELECT r.symptom, r.assessments, r.last_seen
+        FROM assessment_symptom_rollups_daily r, bounds b
+        WHERE r.bucket >= b.day_lo AND r.bucket < b.day_hi
+        UNION ALL
+        SELECT r.symptom, r.assessments, r.last_seen
+        FROM assessment_symptom_rollups_hourly r, bounds b
+        WHERE r.bucket >= b.hour_lo AND r.bucket < b.hour_hi
+          AND NOT (r.bucket >= b.day_lo AND r.bucket < b.day_hi)
+        UNION ALL
+        SELECT btrim(symptom), weight, timestamp
+        FROM edge_rows
+        WHERE btrim(COALESCE(symptom, '')) <> ''
+    ),
+    levels AS (
+        SELECT COALESCE(jsonb_object_agg(triage_level, n), '{}'::jsonb) AS count_by_level
+        FROM (
+            SELECT triage_level, SUM(assessments) AS n
+            FROM level_rows
+            GROUP BY triage_level
+        ) AS l
+    ),
+    symptoms AS (
+        SELECT COALESCE(
+            jsonb_agg(jsonb_build_object('symptom', symptom, 'count', n) ORDER BY n DESC, latest DESC),
+            '[]'::jsonb
+        ) AS top_symptoms
+        FROM (
+            SELECT symptom, SUM(assessments) AS n, MAX(last_seen) AS latest
+            FROM symptom_rows
+            WHERE symptom <> '(other)'
+            GROUP BY symptom
+            ORDER BY n DESC, latest DESC
+            LIMIT 10
+        ) AS s
+    ),
+    totals AS (
+        SELECT
+            COALESCE(SUM(assessments), 0) AS total_assessments,
+            SUM(age_sum) / NULLIF(SUM(age_count), 0) AS average_age,
+            SUM(confidence_sum) / NULLIF(SUM(confidence_count), 0) AS average_confidence
+        FROM level_rows
+    )
+    SELECT jsonb_build_object(
+        'total_assessments', totals.total_assessments,
+        'count_by_level', levels.count_by_level,
+        'top_symptoms', symptoms.top_symptoms,
+        'average_age', totals.average_age,
+        'average_confidence', totals.average_confidence
+    )
+    FROM totals, levels, symptoms;
+$$;
+
+GRANT EXECUTE ON FUNCTION assessment_analytics(TIMESTAMPTZ, TIMESTAMPTZ) TO service_role;
+GRANT EXECUTE ON FUNCTION backfill_assessment_rollups(TIMESTAMPTZ, TIMESTAMPTZ) TO service_role;
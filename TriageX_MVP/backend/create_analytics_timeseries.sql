@@ -0,0 +1,97 @@
+-- Analytics Timeseries Function
+-- Run this in Supabase SQL Editor (after create_analytics_rollups.sql)
+-- Per-bucket volume and acuity for the admin dashboard, read from the rollup
+-- tables. Called by the backend as POST /rest/v1/rpc/assessment_timeseries.
+--
+-- Buckets are whole UTC hours, days or ISO weeks (starting Monday); the
+-- first and last bucket cover their full period even when start_ts/end_ts
+-- fall inside it. Buckets without assessments are returned with zero counts.
+
+CREATE OR REPLACE FUNCTION assessment_timeseries(
+    bucket_size TEXT,
+    start_ts TIMESTAMPTZ DEFAULT NULL,
+    end_ts TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    step INTERVAL;
+    lo TIMESTAMPTZ;
+    hi TIMESTAMPTZ;
+    result JSONB;
+BEGIN
+    IF bucket_size NOT IN ('hour', 'day', 'week') THEN
+        RAISE EXCEPTION 'bucket_size must be hour, day or week' USING ERRCODE = '22023';
+    END IF;
+    step := ('1 ' || bucket_size)::INTERVAL;
+
+    IF start_ts IS NOT NULL THEN
+        lo := date_trunc(bucket_size, start_ts, 'UTC');
+    ELSIF bucket_size = 'hour' THEN
+        lo := date_trunc(bucket_size, (SELECT MIN(bucket) FROM assessment_rollups_hourly), 'UTC');
+    ELSE
+        lo := date_trunc(bucket_size, (SELECT MIN(bucket) FROM assessment_rollups_daily), 'UTC');
+    END IF;
+    hi := date_trunc(bucket_size, COALESCE(end_ts, NOW()), 'UTC');
+
+    IF lo IS NULL OR lo > hi THEN
+        RETURN '[]'::JSONB;
+    END IF;
+    IF EXTRACT(EPOCH FROM hi - lo) / EXTRACT(EPOCH FROM step) >= 10000 THEN
+        RAISE EXCEPTION 'Range too large for % buckets (max 10000)', bucket_size USING ERRCODE = '22023';
+    END IF;
+
+    WITH source AS (
+        SELECT
+            date_trunc(bucket_size, r.bucket, 'UTC') AS bucket, r.triage_level, r.assessments,
+            r.confidence_sum, r.confidence_count, r.low_confidence_count
+        FROM assessment_rollups_hourly r
+        WHERE bucket_size = 'hour' AND r.bucket >= lo AND r.bucket < hi + step
+        UNION ALL
+        SELECT
+            date_trunc(bucket_size, r.bucket, 'UTC'), r.triage_level, r.assessments,
+            r.confidence_sum, r.confidence_count, r.low_confidence_count
+        FROM assessment_rollups_daily r
+        WHERE bucket_size <> 'hour' AND r.bucket >= lo AND r.bucket < hi + step
+    ),
+    per_level AS (
+        SELECT
+            bucket, triage_level, SUM(assessments) AS n, SUM(confidence_sum) AS confidence_sum,
+            SUM(confidence_count) AS confidence_count, SUM(low_confidence_count) AS low_confidence
+        FROM source
+        GROUP BY bucket, triage_level
+    ),
+    per_bucket AS (
+        SELECT
+            bucket,
+            jsonb_object_agg(triage_level, n) AS count_by_level,
+            SUM(n) AS total,
+            SUM(confidence_sum) / NULLIF(SUM(confidence_count), 0) AS mean_confidence,
+            SUM(low_confidence)::NUMERIC / NULLIF(SUM(n), 0) AS low_confidence_rate
+        FROM per_level
+        GROUP BY bucket
+    )
+    SELECT COALESCE(
+        jsonb_agg(
+            jsonb_build_object(
+                'bucket', series.bucket,
+                'total', COALESCE(p.total, 0),
+                'count_by_level', COALESCE(p.count_by_level, '{}'::JSONB),
+                'mean_confidence', p.mean_confidence,
+                'low_confidence_rate', p.low_confidence_rate
+            )
+            ORDER BY series.bucket
+        ),
+        '[]'::JSONB
+    )
+    INTO result
+    FROM generate_series(lo, hi, step) AS series(bucket)
+    LEFT JOIN per_bucket p ON p.bucket = series.bucket;
+
+    RETURN result;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION assessment_timeseries(TEXT, TIMESTAMPTZ, TIMESTAMPTZ) TO service_role;
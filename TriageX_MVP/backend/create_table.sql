@@ -7,7 +7,7 @@ CREATE TABLE IF NOT EXISTS assessments (
     timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     
     -- User demographics
-    age TEXT,
+    age NUMERIC,
     gender TEXT,
     
     -- Symptoms
@@ -16,15 +16,17 @@ CREATE TABLE IF NOT EXISTS assessments (
     -- Vital signs
     temperature NUMERIC,
     heart_rate INTEGER,
-    respiratory_rate TEXT,
+    respiratory_rate INTEGER,
     blood_pressure TEXT,
+    bp_systolic SMALLINT,
+    bp_diastolic SMALLINT,
     spo2 INTEGER,
     level_of_consciousness TEXT,
     
     -- Additional info
     duration TEXT,
     onset TEXT,
-    pain_level TEXT,
+    pain_level INTEGER,
     
     -- Adaptive questions
     leg_redness TEXT,
@@ -40,9 +42,9 @@ CREATE TABLE IF NOT EXISTS assessments (
     -- Triage results
     triage_level TEXT NOT NULL,
     confidence NUMERIC NOT NULL,
-    recommendations TEXT, -- JSON string
-    key_factors TEXT, -- JSON string
-    explanation_tags TEXT, -- JSON string
+    recommendations JSONB,
+    key_factors JSONB,
+    explanation_tags JSONB,
     data_quality NUMERIC,
     low_confidence_warning BOOLEAN DEFAULT FALSE,
     ai_enabled BOOLEAN DEFAULT FALSE,
@@ -0,0 +1,57 @@
+"""
+Export assessments to date-partitioned Parquet files for offline analysis.
+
+Each run appends only assessments newer than the last exported id:
+
+    python export_parquet.py
+    python export_parquet.py --dir exports/assessments --snapshot exports/assessments.arrow
+
+The directory opens as a memory-mapped Arrow dataset with
+app.services.parquet_export.open_dataset(); --snapshot also consolidates it
+into one Arrow IPC file for load_snapshot().
+"""
+import argparse
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.logging_config import setup_logging
+from app.db.database import close_database
+from app.services.parquet_export import ParquetExporter, write_snapshot
+
+logger = logging.getLogger("export_parquet")
+
+
+async def run(directory: str, rows_per_file: int, snapshot: str) -> None:
+    try:
+        exporter = ParquetExporter(
+            directory, rows_per_file, settings.ADMIN_EXPORT_CHUNK_SIZE, settings.PARQUET_EXPORT_GAP_TTL_SECONDS
+        )
+        result = await exporter.run()
+        logger.info(
+            "Export complete: %d assessments in %d files (watermark %d)",
+            result["exported"], len(result["files"]), result["last_id"],
+        )
+        if snapshot:
+            rows = await asyncio.to_thread(write_snapshot, snapshot, directory)
+            logger.info("Wrote Arrow snapshot %s (%d assessments)", snapshot, rows)
+    finally:
+        await close_database()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Incrementally export TriageX assessments to Parquet.")
+    parser.add_argument("--dir", default=settings.PARQUET_EXPORT_DIR, help="Dataset directory")
+    parser.add_argument(
+        "--rows-per-file", type=int, default=settings.PARQUET_EXPORT_ROWS_PER_FILE,
+        help="Rows buffered before files and the watermark are written",
+    )
+    parser.add_argument("--snapshot", help="Also write a consolidated Arrow IPC file to this path")
+    args = parser.parse_args()
+
+    setup_logging()
+    asyncio.run(run(args.dir, max(args.rows_per_file, 1), args.snapshot))
+
+
+if __name__ == "__main__":
+    main()
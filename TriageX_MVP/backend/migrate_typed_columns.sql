@@ -0,0 +1,122 @@
+-- Typed Columns Migration
+-- Run this in Supabase SQL Editor (after create_analytics_rollups.sql, if used)
+-- Converts free-text and JSON-text columns of assessments to native types:
+--   age               TEXT -> NUMERIC
+--   respiratory_rate  TEXT -> INTEGER
+--   pain_level        TEXT -> INTEGER
+--   recommendations, key_factors, explanation_tags  TEXT (JSON) -> JSONB
+-- and adds bp_systolic / bp_diastolic next to the blood_pressure string.
+--
+-- Values that cannot be converted are copied to assessment_legacy_values
+-- before the conversion sets them to NULL (or [] for JSON columns).
+--
+-- Deploy the backend version that writes native types right after running
+-- this, then fill the blood pressure columns for existing rows:
+--   python backfill_typed_columns.py
+
+-- Conversion helpers (NULL when the text is not a clean number)
+CREATE OR REPLACE FUNCTION triagex_to_numeric(value TEXT)
+RETURNS NUMERIC
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT CASE
+        WHEN btrim(value) ~ '^[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)$' THEN btrim(value)::NUMERIC
+    END;
+$$;
+
+CREATE OR REPLACE FUNCTION triagex_to_int(value TEXT)
+RETURNS INTEGER
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT CASE
+        WHEN btrim(value) ~ '^[-+]?[0-9]{1,9}$' THEN btrim(value)::INTEGER
+    END;
+$$;
+
+CREATE OR REPLACE FUNCTION triagex_to_jsonb(value TEXT)
+RETURNS JSONB
+LANGUAGE plpgsql
+IMMUTABLE
+AS $$
+BEGIN
+    IF value IS NULL THEN
+        RETURN NULL;
+    END IF;
+    RETURN value::JSONB;
+EXCEPTION WHEN invalid_text_representation THEN
+    RETURN '[]'::JSONB;
+END;
+$$;
+
+-- Rollup and analytics functions call assessment_numeric_age(age); this
+-- overload keeps them working once age is NUMERIC
+CREATE OR REPLACE FUNCTION assessment_numeric_age(age NUMERIC)
+RETURNS NUMERIC
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT age;
+$$;
+
+-- Original text of values that did not survive the conversion
+CREATE TABLE IF NOT EXISTS assessment_legacy_values (
+    assessment_id BIGINT NOT NULL REFERENCES assessments(id) ON DELETE CASCADE,
+    column_name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (assessment_id, column_name)
+);
+ALTER TABLE assessment_legacy_values ENABLE ROW LEVEL SECURITY;
+
+BEGIN;
+
+INSERT INTO assessment_legacy_values (assessment_id, column_name, value)
+SELECT id, 'age', age FROM assessments
+WHERE btrim(COALESCE(age, '')) <> '' AND triagex_to_numeric(age) IS NULL
+UNION ALL
+SELECT id, 'respiratory_rate', respiratory_rate FROM assessments
+WHERE btrim(COALESCE(respiratory_rate, '')) <> '' AND triagex_to_int(respiratory_rate) IS NULL
+UNION ALL
+SELECT id, 'pain_level', pain_level FROM assessments
+WHERE btrim(COALESCE(pain_level, '')) <> '' AND triagex_to_int(pain_level) IS NULL
+ON CONFLICT DO NOTHING;
+
+ALTER TABLE assessments
+    ALTER COLUMN age TYPE NUMERIC USING triagex_to_numeric(age),
+    ALTER COLUMN respiratory_rate TYPE INTEGER USING triagex_to_int(respiratory_rate),
+    ALTER COLUMN pain_level TYPE INTEGER USING triagex_to_int(pain_level),
+    ALTER COLUMN recommendations TYPE JSONB USING triagex_to_jsonb(recommendations),
+    ALTER COLUMN key_factors TYPE JSONB USING triagex_to_jsonb(key_factors),
+    ALTER COLUMN explanation_tags TYPE JSONB USING triagex_to_jsonb(explanation_tags),
+    ADD COLUMN IF NOT EXISTS bp_systolic SMALLINT,
+    ADD COLUMN IF NOT EXISTS bp_diastolic SMALLINT;
+
+COMMIT;
+
+-- Blood pressure split for existing rows, one batch per call.
+-- Returns the number of rows updated; call until it returns 0.
+CREATE OR REPLACE FUNCTION backfill_blood_pressure(batch_size INTEGER DEFAULT 5000)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH batch AS (
+        SELECT id
+        FROM assessments
+        WHERE bp_systolic IS NULL
+          AND blood_pressure ~ '^\s*[0-9]{2,3}\s*/\s*[0-9]{2,3}\s*$'
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    ),
+    updated AS (
+        UPDATE assessments a
+        SET bp_systolic = btrim(split_part(a.blood_pressure, '/', 1))::SMALLINT,
+            bp_diastolic = btrim(split_part(a.blood_pressure, '/', 2))::SMALLINT
+        FROM batch
+        WHERE a.id = batch.id
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM updated;
+$$;
+
+GRANT EXECUTE ON FUNCTION backfill_blood_pressure(INTEGER) TO service_role;
@@ -0,0 +1,70 @@
+"""
+Shared fixtures for the backend tests.
+
+Run from the backend directory:  python -m pytest -q tests
+"""
+import os
+import random
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.schemas.health import HealthData  # noqa: E402
+
+SYMPTOMS = [
+    "chest pain", "Chest pressure and sweating", "shortness of breath and wheezing",
+    "swollen leg", "hit head, bleeding", "headache", "fever", "blood in stool", "dyspnea",
+    "concussion", "SOB since morning", "leg swelling", "can't breathe", "chest discomfort",
+    "cough", "DVT?", "coughing blood, difficulty breathing",
+]
+ANSWERS = ["", "yes", "Yes", "y", "YES", "no", "N", "maybe"]
+ANSWER_FIELDS = [
+    "chest_radiation", "chest_shortness_breath", "chest_nausea",
+    "leg_redness", "leg_warmth", "head_dizziness", "head_vomiting", "head_loss_consciousness",
+]
+# Values on and around every threshold, off the lookup-table grid and (where
+# the schema allows) outside its domain
+FIELD_CHOICES = {
+    "age": ["", "abc", "0", "0.05", "0.5", "2", "11.9", "12", "16", "30", "64", "65", "80", "104"],
+    "heart_rate": [30, 45, 50, 55, 59, 60, 80, 90, 100, 101, 105, 120, 121, 130, 150, 160, 180, 220],
+    "temperature": [35.0, 35.5, 35.95, 36.0, 36.04, 36.2, 37.0, 37.5, 37.55, 37.8, 38.0, 38.5, 38.51, 39.0, 41.23, 45.0],
+    "spo2": [70, 80, 84, 85, 88, 89, 90, 92, 93, 94, 95, 98, 100],
+    "blood_pressure": [
+        "120/80", "190/100", "85/60", "150/125", "300/200", "40/20", "90/120",
+        "180/121", "89/121", "181/80", "250/90", "40/100",
+    ],
+    "respiratory_rate": ["", "abc", "0", "8", "11", "12", "16", "24", "25", "30", "40", "90", "12.0"],
+    "pain_level": ["", "x", "0", "3", "6", "7", "8", "10", "11"],
+    "level_of_consciousness": ["alert", "confused", "Unresponsive", "coma", "drowsy"],
+    "duration": ["", "2 days", "3 hours", "a week"],
+    "leg_duration": ["3 hours", "2 weeks"],
+    "has_medical_conditions": [True, False],
+    "medical_conditions": [[], ["heart disease"], ["asthma", "diabetes"], ["cancer"], ["KOL"]],
+    "has_medications": [True, False],
+    "medications": [[], ["warfarin"], ["painkiller"], ["aspirin", "opioid"], ["Blodförtunnande"]],
+    "is_pregnant": [True, False],
+    "pregnancy_trimester": ["third", "first"],
+    "is_trauma_related": [True, False],
+    "trauma_type": ["Head", "chest", "abdomen", "back", "arm"],
+}
+
+
+def random_request(rnd: random.Random) -> HealthData:
+    """A HealthData request with a random subset of fields filled in."""
+    data = {"symptom": rnd.choice(SYMPTOMS)}
+    for field, choices in FIELD_CHOICES.items():
+        if rnd.random() < 0.35:
+            data[field] = rnd.choice(choices)
+    for field in ANSWER_FIELDS:
+        if rnd.random() < 0.3:
+            data[field] = rnd.choice(ANSWERS)
+    return HealthData(**data)
+
+
+@pytest.fixture(scope="session")
+def health_corpus():
+    rnd = random.Random(20240611)
+    return [random_request(rnd) for _ in range(1500)]
@@ -0,0 +1,71 @@
+"""The /analyze/batch endpoint: HealthResponse lines and logging of every scored record."""
+import asyncio
+import json
+
+from starlette.requests import Request
+
+from app.api.v1.endpoints import analyze_batch
+from app.api.v1.endpoints.analyze import encode_health_response
+from app.core.config import settings
+from app.schemas.health import HealthData
+from app.services.triage_logic import analyze_health
+
+RECORDS = [
+    {"symptom": "chest pain", "heart_rate": 125, "chest_radiation": "yes"},
+    {"symptom": "headache", "temperature": 37.2},
+    {"symptom": "swollen leg", "leg_redness": "yes", "leg_warmth": "yes"},
+    {"symptom": "fever", "heart_rate": 80},
+    {"symptom": "cough", "spo2": 88, "age": "70"},
+]
+
+
+def _request(body: bytes) -> Request:
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {
+        "type": "http", "method": "POST", "path": "/api/v1/analyze/batch",
+        "headers": [(b"content-type", b"application/x-ndjson")],
+    }
+    return Request(scope, receive)
+
+
+def _post(monkeypatch, records, chunk_size, lines_to_read=None):
+    """Run the endpoint, reading lines_to_read lines (all when None) before the client goes away."""
+    logged = []
+    monkeypatch.setattr(settings, "ANALYZE_BATCH_CHUNK_SIZE", chunk_size)
+    monkeypatch.setattr(analyze_batch.assessment_log, "enqueue_many", logged.extend)
+    monkeypatch.setattr(analyze_batch, "_record_live", lambda data, result: None)
+    body = "\n".join(json.dumps(record) for record in records).encode()
+
+    async def run():
+        response = await analyze_batch.analyze_health_batch_endpoint(_request(body))
+        lines = []
+        async for line in response.body_iterator:
+            lines.append(line)
+            if lines_to_read is not None and len(lines) == lines_to_read:
+                # What Starlette does when the client disconnects mid-stream
+                await response.body_iterator.aclose()
+                break
+        return lines
+
+    return asyncio.run(run()), logged
+
+
+def test_result_lines_are_health_responses(monkeypatch):
+    lines, logged = _post(monkeypatch, RECORDS + [{"spo2": 20}, "not an object"], chunk_size=3)
+    assert len(lines) == len(RECORDS) + 3
+    for index, record in enumerate(RECORDS):
+        expected = encode_health_response(analyze_health(HealthData(**record)))
+        assert lines[index] == b'{"index":%d,"result":%s}\n' % (index, expected)
+    assert "error" in json.loads(lines[len(RECORDS)]) and "error" in json.loads(lines[len(RECORDS) + 1])
+    assert json.loads(lines[-1])["summary"] == {"total": len(RECORDS) + 2, "succeeded": len(RECORDS), "failed": 2}
+    assert len(logged) == len(RECORDS)
+
+
+def test_disconnect_mid_stream_keeps_scored_records_logged(monkeypatch):
+    lines, logged = _post(monkeypatch, RECORDS, chunk_size=2, lines_to_read=1)
+    assert len(lines) == 1
+    # The first chunk was scored and logged before any of it was sent
+    assert len(logged) == 2
+    assert [row["symptom"] for row in logged] == ["chest pain", "headache"]
@@ -0,0 +1,52 @@
+"""Canonical cache keys: equivalent requests share a key and a key never spans two outcomes."""
+import pytest
+
+from app.schemas.health import HealthData
+from app.services.cache_keys import canonical_cache_key
+from app.services.triage_features import extract_features
+from app.services.triage_logic import analyze_health
+
+BASE = dict(
+    symptom="chest pain", age="58", heart_rate=112, temperature=37.8, spo2=96,
+    blood_pressure="150/95", respiratory_rate="22", chest_radiation="yes",
+)
+
+
+def test_same_key_means_same_result(health_corpus):
+    results = {}
+    for data in health_corpus:
+        key = canonical_cache_key(data)
+        result = analyze_health(data)
+        assert results.setdefault(key, result) == result, data
+    # The corpus is not collapsed into a handful of keys
+    assert len(results) > len(health_corpus) // 4
+
+
+def test_features_and_request_share_a_key(health_corpus):
+    for data in health_corpus[:200]:
+        assert canonical_cache_key(extract_features(data)) == canonical_cache_key(data)
+
+
+@pytest.mark.parametrize("change", [
+    {"symptom": "CHEST PAIN"},
+    {"symptom": "chest pain since this morning"},
+    {"chest_radiation": "Yes"},
+    {"gender": "female"},
+    {"onset": None},
+])
+def test_equivalent_requests_share_a_key(change):
+    assert canonical_cache_key(HealthData(**{**BASE, **change})) == canonical_cache_key(HealthData(**BASE))
+
+
+@pytest.mark.parametrize("change", [
+    {"symptom": "headache"},
+    {"spo2": 88},
+    {"heart_rate": None},
+    {"chest_radiation": "no"},
+    {"age": "8"},
+    {"has_medications": True, "medications": ["warfarin"]},
+])
+def test_different_requests_get_different_keys(change):
+    data = HealthData(**{**BASE, **change})
+    assert analyze_health(data) != analyze_health(HealthData(**BASE))
+    assert canonical_cache_key(data) != canonical_cache_key(HealthData(**BASE))
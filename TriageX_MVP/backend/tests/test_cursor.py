@@ -0,0 +1,45 @@
+"""Keyset cursors for /admin/assessments."""
+import base64
+import json
+
+import pytest
+
+from app.db.database import decode_cursor, encode_cursor
+
+
+def _raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("row", [
+    {"timestamp": "2024-05-01T12:30:00", "id": 1},
+    {"timestamp": "2024-05-01T12:30:00.123456+00:00", "id": 987654321},
+    {"timestamp": "2024-12-31T23:59:59.5+02:00", "id": 0},
+])
+def test_cursor_round_trip(row):
+    cursor = encode_cursor(row)
+    assert "=" not in cursor
+    timestamp, row_id = decode_cursor(cursor)
+    assert row_id == row["id"]
+    assert timestamp == row["timestamp"].replace(".5+", ".500000+")
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not a cursor",
+    "%%%",
+    _raw_cursor({"timestamp": "2024-05-01T12:30:00", "id": 1}),
+    _raw_cursor(["2024-05-01T12:30:00"]),
+    _raw_cursor(["2024-05-01T12:30:00", 1, 2]),
+    _raw_cursor(["2024-05-01T12:30:00", "1"]),
+    _raw_cursor(["2024-05-01T12:30:00", 1.5]),
+    _raw_cursor(["2024-05-01T12:30:00", True]),
+    _raw_cursor([None, 1]),
+    _raw_cursor(["yesterday", 1]),
+    # PostgREST filter injection through the timestamp
+    _raw_cursor(["2024-05-01T12:30:00,id.gt.0)", 1]),
+    _raw_cursor(["2024-05-01T12:30:00),or(id.gt.0", 1]),
+])
+def test_malformed_cursor_raises(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
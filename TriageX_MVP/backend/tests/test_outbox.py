@@ -0,0 +1,185 @@
+"""Assessment outbox: replay, retry, dead-lettering of rejected rows and shutdown."""
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.db.outbox import AssessmentOutbox, is_permanent_error
+from app.db.postgrest import PostgrestError
+
+
+class FakeSink:
+    """Records inserted rows; rejects rows marked bad, or every call while down."""
+
+    def __init__(self):
+        self.rows = []
+        self.calls = 0
+        self.down = False
+
+    async def __call__(self, rows):
+        self.calls += 1
+        if self.down:
+            raise PostgrestError("service unavailable", 503)
+        if any(row.get("bad") for row in rows):
+            raise PostgrestError('invalid input syntax for type integer: "abc"', 400, "22P02")
+        self.rows.extend(rows)
+
+
+def make_outbox(path, sink, batch_size=4):
+    return AssessmentOutbox(
+        path=str(path), sink=sink, batch_size=batch_size,
+        poll_interval=0.01, backoff_base=0.01, backoff_max=0.02,
+    )
+
+
+def dead_letter_ids(path):
+    with sqlite3.connect(str(path)) as conn:
+        return [row[0] for row in conn.execute("SELECT id FROM dead_letter ORDER BY id")]
+
+
+def test_permanent_errors():
+    assert is_permanent_error(PostgrestError("bad row", 400))
+    assert is_permanent_error(PostgrestError("conflict", 409))
+    for status in (401, 403, 404, 408, 429, 500, 503):
+        assert not is_permanent_error(PostgrestError("retry", status))
+    assert not is_permanent_error(ConnectionError("reset"))
+
+
+def test_replays_rows_in_order(tmp_path):
+    sink = FakeSink()
+    outbox = make_outbox(tmp_path / "outbox.db", sink)
+    outbox.append([{"n": i} for i in range(10)])
+    assert outbox.stats()["pending"] == 10
+
+    async def run():
+        await outbox.start()
+        for _ in range(200):
+            if not outbox.stats()["pending"]:
+                break
+            await asyncio.sleep(0.01)
+        await outbox.stop()
+
+    asyncio.run(run())
+    assert sink.rows == [{"n": i} for i in range(10)]
+    stats = outbox.stats()
+    assert (stats["pending"], stats["replayed"], stats["dead_letter"]) == (0, 10, 0)
+    assert not stats["running"]
+
+
+def test_transient_errors_keep_rows_pending(tmp_path):
+    sink = FakeSink()
+    sink.down = True
+    outbox = make_outbox(tmp_path / "outbox.db", sink)
+    outbox.append([{"n": i} for i in range(3)])
+
+    async def run():
+        await outbox.start()
+        for _ in range(200):
+            if outbox.stats()["failures"] >= 2:
+                break
+            await asyncio.sleep(0.01)
+        stats = outbox.stats()
+        assert stats["pending"] == 3 and stats["consecutive_failures"] >= 2
+        assert "service unavailable" in stats["last_error"]
+
+        sink.down = False
+        for _ in range(200):
+            if not outbox.stats()["pending"]:
+                break
+            await asyncio.sleep(0.01)
+        await outbox.stop()
+
+    asyncio.run(run())
+    assert sink.rows == [{"n": i} for i in range(3)]
+    assert outbox.stats()["consecutive_failures"] == 0
+
+
+def test_poison_rows_are_dead_lettered(tmp_path):
+    sink = FakeSink()
+    path = tmp_path / "outbox.db"
+    outbox = make_outbox(path, sink, batch_size=8)
+    outbox.append([{"n": i, "bad": i in (2, 5)} for i in range(8)])
+
+    asyncio.run(outbox._replay_batch())
+
+    assert [row["n"] for row in sink.rows] == [0, 1, 3, 4, 6, 7]
+    stats = outbox.stats()
+    assert (stats["pending"], stats["replayed"], stats["dead_letter"]) == (0, 6, 2)
+    # Bisection isolates the two bad rows in a handful of inserts
+    assert sink.calls < 16
+    assert dead_letter_ids(path) == [3, 6]
+
+    # The dead-letter count survives a restart
+    asyncio.run(outbox.stop())
+    reopened = make_outbox(path, FakeSink())
+    reopened._connect()
+    assert reopened.stats()["dead_letter"] == 2
+
+
+def test_stop_drains_and_keeps_unsent_rows(tmp_path):
+    path = tmp_path / "outbox.db"
+    sink = FakeSink()
+    outbox = make_outbox(path, sink, batch_size=2)
+
+    async def drain():
+        await outbox.start()
+        outbox.append([{"n": i} for i in range(5)])
+        await outbox.stop()
+
+    asyncio.run(drain())
+    assert sink.rows == [{"n": i} for i in range(5)]
+
+    # Supabase down at shutdown: rows stay on disk for the next process
+    down = FakeSink()
+    down.down = True
+    outbox = make_outbox(path, down)
+    outbox.append([{"n": "late"}])
+    asyncio.run(outbox.stop())
+
+    sink = FakeSink()
+    restarted = make_outbox(path, sink)
+    asyncio.run(restarted.stop())
+    assert sink.rows == [{"n": "late"}]
+
+
+class Worker:
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+def _lifespan_without_supabase(monkeypatch, outbox, error):
+    from app import main
+
+    async def init_database():
+        raise error
+
+    monkeypatch.setattr(main, "init_database", init_database)
+    monkeypatch.setattr(main, "close_database", Worker().stop)
+    monkeypatch.setattr(main, "assessment_outbox", outbox)
+    for name in ("assessment_log", "live_analytics", "rule_store"):
+        monkeypatch.setattr(main, name, Worker())
+
+    async def run():
+        async with main.lifespan(main.app):
+            return outbox is not None and outbox.stats()["running"]
+
+    return asyncio.run(run())
+
+
+def test_starts_while_supabase_is_down(tmp_path, monkeypatch):
+    outbox = make_outbox(tmp_path / "outbox.db", FakeSink())
+    assert _lifespan_without_supabase(monkeypatch, outbox, ConnectionError("connection refused"))
+    assert not outbox.stats()["running"]
+
+
+def test_startup_fails_without_supabase_or_outbox(tmp_path, monkeypatch):
+    from app.db.database import SupabaseNotConfigured
+
+    with pytest.raises(ConnectionError):
+        _lifespan_without_supabase(monkeypatch, None, ConnectionError("connection refused"))
+    outbox = make_outbox(tmp_path / "outbox.db", FakeSink())
+    with pytest.raises(SupabaseNotConfigured):
+        _lifespan_without_supabase(monkeypatch, outbox, SupabaseNotConfigured("SUPABASE_URL is not set"))
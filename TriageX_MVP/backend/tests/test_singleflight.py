@@ -0,0 +1,110 @@
+"""Single-flight coalescing of concurrent identical computations."""
+import asyncio
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+
+
+def _slow(result, started=None, release=None, calls=None):
+    async def fn():
+        if calls is not None:
+            calls.append(1)
+        if started is not None:
+            started.set()
+        if release is not None:
+            await release.wait()
+        return result
+    return fn
+
+
+def test_duplicates_share_one_computation():
+    async def run():
+        flights = SingleFlight()
+        release = asyncio.Event()
+        calls = []
+        tasks = [asyncio.create_task(flights.do("k", _slow("r", release=release, calls=calls))) for _ in range(4)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*tasks), calls, flights.stats()
+
+    results, calls, stats = asyncio.run(run())
+    assert calls == [1]
+    assert results == [("r", False, 3)] + [("r", True, 0)] * 3
+    assert stats == {"in_flight": 0, "leaders": 1, "coalesced": 3}
+
+
+def test_cancelled_leader_does_not_abort_followers():
+    async def run():
+        flights = SingleFlight()
+        started, release = asyncio.Event(), asyncio.Event()
+        leader = asyncio.create_task(flights.do("k", _slow("r", started, release)))
+        await started.wait()
+        followers = [asyncio.create_task(flights.do("k", _slow("other"))) for _ in range(2)]
+        await asyncio.sleep(0)
+        # The leader's client disconnects while the computation is running
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*followers)
+        return leader, results, flights.stats()
+
+    leader, results, stats = asyncio.run(run())
+    assert leader.cancelled()
+    # The first follower takes the leader's place, so the group is still logged once
+    assert results == [("r", False, 1), ("r", True, 0)]
+    assert stats["in_flight"] == 0
+
+
+def test_cancelled_follower_does_not_abort_leader():
+    async def run():
+        flights = SingleFlight()
+        started, release = asyncio.Event(), asyncio.Event()
+        leader = asyncio.create_task(flights.do("k", _slow("r", started, release)))
+        await started.wait()
+        follower = asyncio.create_task(flights.do("k", _slow("other")))
+        await asyncio.sleep(0)
+        follower.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await leader, follower
+
+    result, follower = asyncio.run(run())
+    assert follower.cancelled()
+    assert result == ("r", False, 1)
+
+
+def test_errors_reach_every_caller_and_clear_the_key():
+    async def run():
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def fail():
+            await release.wait()
+            raise ValueError("boom")
+
+        tasks = [asyncio.create_task(flights.do("k", fail)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        return outcomes, await flights.do("k", _slow("again"))
+
+    outcomes, retry = asyncio.run(run())
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert retry == ("again", False, 0)
+
+
+def test_leader_cancelled_alone_finishes_quietly():
+    async def run():
+        flights = SingleFlight()
+        started, release = asyncio.Event(), asyncio.Event()
+        leader = asyncio.create_task(flights.do("k", _slow("r", started, release)))
+        await started.wait()
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        release.set()
+        await asyncio.sleep(0.01)
+        return flights.stats()
+
+    assert asyncio.run(run())["in_flight"] == 0
@@ -0,0 +1,80 @@
+"""The trie-regex lexicons must report exactly the keywords a substring scan finds."""
+import random
+
+import pytest
+
+from app.services.symptom_lexicon import (
+    CONDITION_LEXICON,
+    CONSCIOUSNESS_LEXICON,
+    DURATION_LEXICON,
+    MEDICATION_LEXICON,
+    SYMPTOM_LEXICON,
+    Lexicon,
+)
+
+LEXICONS = {
+    "symptom": SYMPTOM_LEXICON,
+    "medication": MEDICATION_LEXICON,
+    "condition": CONDITION_LEXICON,
+    "consciousness": CONSCIOUSNESS_LEXICON,
+    "duration": DURATION_LEXICON,
+}
+
+
+def reference_match(lexicon: Lexicon, text):
+    """The matcher the lexicons replaced: one substring test per keyword."""
+    if not text:
+        return 0
+    text = text.lower()
+    hits = 0
+    for keyword in lexicon.keywords:
+        if keyword in text:
+            hits |= lexicon._bits[keyword]
+    return hits
+
+
+def random_texts(lexicon: Lexicon, rnd: random.Random, count: int):
+    """Keywords, keyword fragments and filler run together in random case."""
+    pieces = list(lexicon.keywords) + [keyword[: len(keyword) // 2] for keyword in lexicon.keywords]
+    pieces += ["", " ", "and", "no", "x", "ä", "-", "\n", "today"]
+    for _ in range(count):
+        text = "".join(rnd.choice(pieces) + rnd.choice(["", " ", ","]) for _ in range(rnd.randint(0, 6)))
+        yield "".join(char.upper() if rnd.random() < 0.3 else char for char in text)
+
+
+@pytest.mark.parametrize("name", sorted(LEXICONS))
+def test_match_equals_substring_scan(name):
+    lexicon = LEXICONS[name]
+    rnd = random.Random(name)
+    for text in random_texts(lexicon, rnd, 3000):
+        assert lexicon.match(text) == reference_match(lexicon, text), text
+
+
+@pytest.mark.parametrize("name", sorted(LEXICONS))
+def test_every_keyword_matches_alone(name):
+    lexicon = LEXICONS[name]
+    for keyword in lexicon.keywords:
+        assert lexicon.match(keyword.upper()) == reference_match(lexicon, keyword) != 0, keyword
+
+
+@pytest.mark.parametrize("name", sorted(LEXICONS))
+def test_match_any_equals_per_item_union(name):
+    lexicon = LEXICONS[name]
+    rnd = random.Random(name + "-any")
+    texts = list(random_texts(lexicon, rnd, 2000))
+    for _ in range(500):
+        items = rnd.sample(texts, rnd.randint(0, 4))
+        expected = 0
+        for item in items:
+            expected |= reference_match(lexicon, item)
+        assert lexicon.match_any(items) == expected, items
+
+
+def test_overlapping_keywords():
+    # "chest pain" also contains "chest" and "pain" starts "painkiller"
+    assert SYMPTOM_LEXICON.match("Chest Pain") == reference_match(SYMPTOM_LEXICON, "chest pain")
+    assert MEDICATION_LEXICON.match("painkillers") == reference_match(MEDICATION_LEXICON, "painkillers")
+    assert MEDICATION_LEXICON.match("blood thinners") == reference_match(MEDICATION_LEXICON, "blood thinners")
+    # Keywords may not span list items
+    assert MEDICATION_LEXICON.match_any(["blood", "thinner"]) == 0
+    assert SYMPTOM_LEXICON.match(None) == SYMPTOM_LEXICON.match_any(None) == SYMPTOM_LEXICON.match_any([]) == 0
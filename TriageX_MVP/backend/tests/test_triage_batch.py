@@ -0,0 +1,16 @@
+"""The vectorized batch engine must score every record exactly like analyze_health."""
+from app.services.triage_batch import analyze_health_batch, columns_from_records
+from app.services.triage_logic import analyze_health, assess_health
+
+
+def test_batch_matches_scalar(health_corpus):
+    batch = analyze_health_batch(columns_from_records(health_corpus))
+    assert len(batch) == len(health_corpus)
+    for i, (data, result) in enumerate(zip(health_corpus, batch.to_results())):
+        assert result == analyze_health(data), data
+        assert batch.factor_ids(i) == assess_health(data).factor_ids, data
+
+
+def test_batch_of_one_matches_scalar(health_corpus):
+    for data in health_corpus[:50]:
+        assert analyze_health_batch(columns_from_records([data])).to_result(0) == analyze_health(data)
@@ -0,0 +1,118 @@
+"""
+The compiled triage rule table.
+
+legacy_triage_cases.json holds results recorded from the hard-coded rules
+that triage_rules.json replaced, for ages scored with the adult norms.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.schemas.health import HealthData
+from app.services.triage_batch import analyze_health_batch, columns_from_records
+from app.services.triage_features import extract_features
+from app.services.triage_logic import analyze_health, assess_health
+from app.services.triage_rules import VITAL_DOMAINS, current_rules
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def test_json_rules_match_legacy_rules():
+    with open(os.path.join(FIXTURES, "legacy_triage_cases.json"), encoding="utf-8") as fh:
+        cases = json.load(fh)
+    assert cases
+    for case in cases:
+        result = analyze_health(HealthData(**case["input"]))
+        assert {key: result[key] for key in case["expected"]} == case["expected"], case["input"]
+
+
+def test_assess_health_accepts_features(health_corpus):
+    for data in health_corpus[:200]:
+        assert assess_health(extract_features(data)) == assess_health(data)
+
+
+def _probe_values(fact):
+    lowest, highest, scale = VITAL_DOMAINS[fact]
+    step = 1 / scale
+    grid = np.arange(round(lowest * scale), round(highest * scale) + 1) / scale
+    # Off the grid: between grid points and just outside the domain
+    off_grid = np.concatenate([grid[:-1] + step / 3, [lowest - step, highest + step, lowest - 50, highest + 50]])
+    return grid, off_grid
+
+
+@pytest.mark.parametrize("band", range(len(current_rules().band_rules)))
+def test_vital_tables_match_comparisons(band):
+    tables = current_rules().band_rules[band].vital_tables
+    assert tables
+    for fact, table in tables.items():
+        grid, off_grid = _probe_values(fact)
+        values = np.concatenate([grid, off_grid])
+        expected = [table.outcome(float(value)) for value in values]
+        assert [table.lookup(float(value)) for value in values] == expected, fact
+        if table.scale == 1:
+            assert [table.lookup(int(value)) for value in grid] == expected[:len(grid)], fact
+        assert table.lookup(None) == 0
+
+        index, off = table.lookup_batch(np.append(values, np.nan))
+        outcomes = table.arrays()[0][index]
+        outcomes[off] = table.outcome_batch(np.append(values, np.nan)[off])
+        assert outcomes.tolist() == expected + [0], fact
+
+
+def _band(age):
+    rules = current_rules()
+    return rules.age_bands[rules.band_for(extract_features(HealthData(symptom="fever", age=age)).age)].name
+
+
+@pytest.mark.parametrize("age, band", [
+    # Bare whole years: "0" only says "under a year"
+    ("0", "infant"), ("1", "child"), ("11", "child"), ("12", "adolescent"), ("17", "adolescent"),
+    ("18", "adult"), ("64", "adult"), ("65", "elderly"), ("104", "elderly"),
+    # Each band's upper bound belongs to the next band
+    ("0.0766", "neonate"), ("0.0767", "infant"), ("0.99", "infant"), ("11.99", "child"),
+    ("17.99", "adolescent"), ("64.99", "adult"),
+    # Unit-suffixed ages
+    ("10 days", "neonate"), ("28 days", "neonate"), ("29 days", "infant"), ("4 weeks", "neonate"),
+    ("5 wks", "infant"), ("6 months", "infant"), ("11 mo", "infant"), ("12 months", "child"),
+    ("18 months", "child"), ("2 years", "child"), ("12y", "adolescent"), ("65 Years", "elderly"),
+    # Unknown ages are scored as adults
+    (None, "adult"), ("", "adult"), ("abc", "adult"), ("6 fortnights", "adult"), ("-3", "adult"),
+])
+def test_age_bands(age, band):
+    assert _band(age) == band
+
+
+@pytest.mark.parametrize("age, vitals, key_factors", [
+    # An infant's heart beats faster: 150 is normal, 90 is too slow
+    ("30", {"heart_rate": 150}, ["Abnormal heart rate"]),
+    ("6 months", {"heart_rate": 150}, []),
+    ("0", {"heart_rate": 150}, []),
+    ("6 months", {"heart_rate": 90}, ["Elevated heart rate"]),
+    ("8", {"heart_rate": 150}, ["Elevated heart rate"]),
+    # Children breathe faster
+    ("30", {"respiratory_rate": "30"}, ["Abnormal respiratory rate"]),
+    ("8", {"respiratory_rate": "30"}, []),
+    # Neonates have a lower fever threshold
+    ("30", {"temperature": 38.2}, ["Slightly abnormal temperature"]),
+    ("10 days", {"temperature": 38.2}, ["Abnormal temperature"]),
+    # So do the elderly (temp_high 37.2, temp_critical_high 37.8)
+    ("64", {"temperature": 37.4}, []),
+    ("65", {"temperature": 37.4}, ["Slightly abnormal temperature"]),
+    ("64", {"temperature": 37.9}, ["Slightly abnormal temperature"]),
+    ("70", {"temperature": 37.9}, ["Abnormal temperature"]),
+])
+def test_vitals_are_scored_against_the_age_band(age, vitals, key_factors):
+    data = HealthData(symptom="fever", age=age, **vitals)
+    assert analyze_health(data)["key_factors"] == key_factors
+    batch = analyze_health_batch(columns_from_records([data, HealthData(symptom="fever", **vitals)]))
+    assert batch.to_result(0) == analyze_health(data)
+
+
+def test_band_boundaries_in_batch():
+    ages = ["0", "10 days", "0.0767", "1", "12", "18", "65", None, "abc", "6 months"]
+    records = [HealthData(symptom="fever", age=age, heart_rate=150, temperature=37.9) for age in ages]
+    assert analyze_health_batch(columns_from_records(records)).to_results() == [
+        analyze_health(data) for data in records
+    ]
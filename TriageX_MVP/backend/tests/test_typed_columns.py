@@ -0,0 +1,20 @@
+"""Parsing free-text request fields into the typed assessment columns."""
+import pytest
+
+from app.db.database import _to_int, _to_number
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None), (True, None), (7, 7), (7.0, 7), (7.5, None), ("12", 12), (" 12 ", 12),
+    ("12.0", None), ("abc", None), ("", None), ("nan", None), (float("nan"), None), (float("inf"), None),
+])
+def test_to_int(value, expected):
+    assert _to_int(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None), (False, None), (7, 7), (36.6, 36.6), ("36.6", 36.6), (" 5 ", 5.0),
+    ("abc", None), ("", None), ("nan", None), ("inf", None), (float("nan"), None), (float("-inf"), None),
+])
+def test_to_number(value, expected):
+    assert _to_number(value) == expected